@@ -0,0 +1,32 @@
+"""Add updated_at to products
+
+Revision ID: 3b7d2c9e4f10
+Revises: fa1489732000
+Create Date: 2026-10-18 10:12:31.402918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7d2c9e4f10'
+down_revision: Union[str, Sequence[str], None] = 'fa1489732000'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    # Las filas existentes toman la fecha de creación como última modificación
+    op.execute("UPDATE products SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+    op.create_index(op.f('ix_products_updated_at'), 'products', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_products_updated_at'), table_name='products')
+    op.drop_column('products', 'updated_at')
@@ -0,0 +1,46 @@
+"""Add indexes for product filters
+
+Revision ID: 8e41c6a0d2b5
+Revises: 3b7d2c9e4f10
+Create Date: 2026-10-18 11:40:05.118244
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e41c6a0d2b5'
+down_revision: Union[str, Sequence[str], None] = '3b7d2c9e4f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Debe coincidir con app.db.LOW_STOCK_INDEX_THRESHOLD
+LOW_STOCK_INDEX_THRESHOLD = 10
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Índices de expresión para las búsquedas case-insensitive (lower(col) = lower(:valor))
+    op.create_index('ix_products_nombre_lower', 'products', [sa.text('lower(nombre)')], unique=False)
+    op.create_index('ix_products_categoria_lower', 'products', [sa.text('lower(categoria)')], unique=False)
+    op.create_index('ix_products_precio', 'products', ['precio'], unique=False)
+    # Índice parcial para /productos/low_stock
+    op.create_index(
+        'ix_products_stock_bajo',
+        'products',
+        ['stock'],
+        unique=False,
+        postgresql_where=sa.text(f'stock <= {LOW_STOCK_INDEX_THRESHOLD}'),
+        sqlite_where=sa.text(f'stock <= {LOW_STOCK_INDEX_THRESHOLD}'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_stock_bajo', table_name='products')
+    op.drop_index('ix_products_precio', table_name='products')
+    op.drop_index('ix_products_categoria_lower', table_name='products')
+    op.drop_index('ix_products_nombre_lower', table_name='products')
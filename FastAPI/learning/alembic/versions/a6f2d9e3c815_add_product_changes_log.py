@@ -0,0 +1,75 @@
+"""Add product_changes log
+
+Revision ID: a6f2d9e3c815
+Revises: e4b9c1d7a2f3
+Create Date: 2026-10-18 18:27:03.641592
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6f2d9e3c815'
+down_revision: Union[str, Sequence[str], None] = 'e4b9c1d7a2f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'product_changes',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('eliminado', sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sqlite_autoincrement=True,
+    )
+    op.create_index('ix_product_changes_product_id_id', 'product_changes', ['product_id', 'id'])
+
+    dialecto = op.get_bind().dialect.name
+    if dialecto == "postgresql":
+        op.execute("""CREATE OR REPLACE FUNCTION products_registrar_cambio() RETURNS trigger AS $$
+        BEGIN
+            -- Trigger diferido: corre al confirmar. El lock hace que los cursores
+            -- se asignen en el orden de los commits
+            PERFORM pg_advisory_xact_lock(hashtext('product_changes'));
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO product_changes (product_id, eliminado) VALUES (OLD.id, true);
+            ELSE
+                INSERT INTO product_changes (product_id, eliminado) VALUES (NEW.id, false);
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql""")
+        op.execute("""CREATE CONSTRAINT TRIGGER products_changes AFTER INSERT OR UPDATE OR DELETE ON products
+            DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION products_registrar_cambio()""")
+    elif dialecto == "sqlite":
+        op.execute("""CREATE TRIGGER products_changes_ai AFTER INSERT ON products BEGIN
+            INSERT INTO product_changes (product_id, eliminado) VALUES (new.id, 0);
+        END""")
+        op.execute("""CREATE TRIGGER products_changes_au AFTER UPDATE ON products BEGIN
+            INSERT INTO product_changes (product_id, eliminado) VALUES (new.id, 0);
+        END""")
+        op.execute("""CREATE TRIGGER products_changes_ad AFTER DELETE ON products BEGIN
+            INSERT INTO product_changes (product_id, eliminado) VALUES (old.id, 1);
+        END""")
+    # Carga inicial: un cambio por producto existente, así since=0 es una sincronización completa
+    op.execute("INSERT INTO product_changes (product_id) SELECT id FROM products ORDER BY id")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialecto = op.get_bind().dialect.name
+    if dialecto == "postgresql":
+        op.execute("DROP TRIGGER IF EXISTS products_changes ON products")
+        op.execute("DROP FUNCTION IF EXISTS products_registrar_cambio()")
+    elif dialecto == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS products_changes_ad")
+        op.execute("DROP TRIGGER IF EXISTS products_changes_au")
+        op.execute("DROP TRIGGER IF EXISTS products_changes_ai")
+    op.drop_index('ix_product_changes_product_id_id', table_name='product_changes')
+    op.drop_table('product_changes')
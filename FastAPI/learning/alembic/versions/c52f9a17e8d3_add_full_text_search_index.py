@@ -0,0 +1,71 @@
+"""Add full text search index on nombre and descripcion
+
+Revision ID: c52f9a17e8d3
+Revises: 8e41c6a0d2b5
+Create Date: 2026-10-18 12:55:47.630112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c52f9a17e8d3'
+down_revision: Union[str, Sequence[str], None] = '8e41c6a0d2b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Debe coincidir con app.db.FTS_CONFIG_PG
+FTS_CONFIG_PG = "es_unaccent"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialecto = op.get_bind().dialect.name
+    if dialecto == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        op.execute(f"""DO $$ BEGIN
+            CREATE TEXT SEARCH CONFIGURATION {FTS_CONFIG_PG} (COPY = spanish);
+            ALTER TEXT SEARCH CONFIGURATION {FTS_CONFIG_PG}
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+        EXCEPTION WHEN unique_violation THEN NULL;
+        END $$""")
+        op.execute(f"""ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('{FTS_CONFIG_PG}', coalesce(nombre, '')), 'A') ||
+            setweight(to_tsvector('{FTS_CONFIG_PG}', coalesce(descripcion, '')), 'B')
+        ) STORED""")
+        op.execute("CREATE INDEX ix_products_search_vector ON products USING GIN (search_vector)")
+    elif dialecto == "sqlite":
+        op.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            nombre, descripcion, content='products', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )""")
+        op.execute("""CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, nombre, descripcion) VALUES (new.id, new.nombre, new.descripcion);
+        END""")
+        op.execute("""CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, nombre, descripcion)
+            VALUES ('delete', old.id, old.nombre, old.descripcion);
+        END""")
+        op.execute("""CREATE TRIGGER products_fts_au AFTER UPDATE OF nombre, descripcion ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, nombre, descripcion)
+            VALUES ('delete', old.id, old.nombre, old.descripcion);
+            INSERT INTO products_fts(rowid, nombre, descripcion) VALUES (new.id, new.nombre, new.descripcion);
+        END""")
+        # Indexar los productos que ya existen
+        op.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialecto = op.get_bind().dialect.name
+    if dialecto == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_products_search_vector")
+        op.execute("ALTER TABLE products DROP COLUMN IF EXISTS search_vector")
+        op.execute(f"DROP TEXT SEARCH CONFIGURATION IF EXISTS {FTS_CONFIG_PG}")
+    elif dialecto == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS products_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS products_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS products_fts_ai")
+        op.execute("DROP TABLE IF EXISTS products_fts")
@@ -0,0 +1,47 @@
+"""Add categoria_stats summary table
+
+Revision ID: d7a3e58b1c64
+Revises: c52f9a17e8d3
+Create Date: 2026-10-18 13:42:19.504871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3e58b1c64'
+down_revision: Union[str, Sequence[str], None] = 'c52f9a17e8d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'categoria_stats',
+        sa.Column('categoria', sa.String(length=80), nullable=False),
+        sa.Column('productos', sa.Integer(), nullable=False),
+        sa.Column('unidades', sa.Integer(), nullable=False),
+        sa.Column('valor_inventario', sa.Numeric(precision=16, scale=2), nullable=False),
+        sa.Column('suma_precios', sa.Numeric(precision=16, scale=2), nullable=False),
+        sa.Column('precio_min', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('precio_max', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.PrimaryKeyConstraint('categoria'),
+    )
+    # Carga inicial (equivale a app.estadisticas.reconstruir)
+    op.execute("""
+        INSERT INTO categoria_stats
+            (categoria, productos, unidades, valor_inventario, suma_precios, precio_min, precio_max)
+        SELECT categoria, count(*), coalesce(sum(stock), 0), coalesce(sum(precio * stock), 0),
+               coalesce(sum(precio), 0), min(precio), max(precio)
+        FROM products
+        GROUP BY categoria
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('categoria_stats')
@@ -0,0 +1,29 @@
+"""Add version to products
+
+Revision ID: e4b9c1d7a2f3
+Revises: d7a3e58b1c64
+Create Date: 2026-10-18 16:05:47.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b9c1d7a2f3'
+down_revision: Union[str, Sequence[str], None] = 'd7a3e58b1c64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Las filas existentes empiezan en la versión 1
+    op.add_column('products', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('products', 'version')
@@ -0,0 +1,167 @@
+"""Rutas async de productos.
+
+Los endpoints básicos de app/routes.py con ``async def`` y ``AsyncSession``.
+Con ASYNC_DB=True la aplicación monta ``combinar_rutas(router síncrono)``:
+las escrituras de ``ESCRITURAS_ASYNC`` se sirven desde aquí y todas las demás
+rutas siguen siendo las síncronas, así el modo async no quita endpoints. Las
+lecturas se quedan en app/routes.py porque solo ahí tienen ETag/304,
+``fields``, la cache de respuestas y las réplicas; el PATCH de stock, porque
+los productos calientes usan el write-behind síncrono (app/stock_caliente.py).
+"""
+from typing import AsyncIterator, Literal, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import CategoriaStats, Product, ProductResponse
+from app.db import ProductDB, get_async_db
+from app import async_services as services
+from app.condicional import etag_producto, versiones_if_match
+from app.replicas import marcar_escritura
+from app.services import ConflictoVersionError, StockInsuficienteError
+
+router = APIRouter()
+
+# (ruta, método) que ASYNC_DB=True sirve con las rutas de este módulo
+ESCRITURAS_ASYNC = {("/productos", "POST"), ("/productos/{id}", "PUT"), ("/productos/{id}", "DELETE")}
+
+
+def combinar_rutas(router_sincrono: APIRouter) -> APIRouter:
+    """Las rutas de ``router_sincrono``, en su orden, con las de ``ESCRITURAS_ASYNC`` reemplazadas"""
+    asincronas = {
+        (ruta.path, metodo): ruta for ruta in router.routes for metodo in ruta.methods
+        if (ruta.path, metodo) in ESCRITURAS_ASYNC
+    }
+    combinado = APIRouter()
+    for ruta in router_sincrono.routes:
+        metodos = getattr(ruta, "methods", None) or ()
+        reemplazo = next((asincronas[(ruta.path, m)] for m in metodos if (ruta.path, m) in asincronas), ruta)
+        combinado.routes.append(reemplazo)
+    return combinado
+
+# IMPORTANTE: Las rutas específicas van ANTES que las rutas con parámetros {id}
+
+async def _stream_json(productos: AsyncIterator[ProductDB]) -> AsyncIterator[bytes]:
+    """Escribir los productos como un array JSON, un elemento a la vez"""
+    yield b"["
+    primero = True
+    async for producto in productos:
+        if not primero:
+            yield b","
+        primero = False
+        yield ProductResponse.model_validate(producto).model_dump_json().encode()
+    yield b"]"
+
+async def _stream_ndjson(productos: AsyncIterator[ProductDB]) -> AsyncIterator[bytes]:
+    """Escribir los productos como NDJSON (un objeto JSON por línea)"""
+    async for producto in productos:
+        yield ProductResponse.model_validate(producto).model_dump_json().encode() + b"\n"
+
+@router.get("/productos", response_model=list[ProductResponse])
+async def obtener_todos_productos_route(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000, description="Cantidad máxima de productos por página"),
+    after: Optional[int] = Query(None, description="Cursor: ID del último producto recibido"),
+    stream: Optional[Literal["json", "ndjson"]] = Query(None, description="Enviar todo el catálogo por bloques"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Obtener productos paginados por cursor (ordenados por ID)"""
+    if stream:
+        productos = services.iterar_productos(db, after)
+        if stream == "ndjson":
+            return StreamingResponse(_stream_ndjson(productos), media_type="application/x-ndjson")
+        return StreamingResponse(_stream_json(productos), media_type="application/json")
+
+    productos = await services.obtener_productos_pagina(db, limit, after)
+    if len(productos) == limit:
+        next_cursor = productos[-1].id
+        next_url = request.url.include_query_params(after=next_cursor)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    return productos
+
+@router.get("/productos/low_stock", response_model=list[ProductResponse])
+async def obtener_productos_bajo_stock(threshold: int = 5, db: AsyncSession = Depends(get_async_db)):
+    """Obtener productos con stock bajo (por defecto <= 5)"""
+    return await services.buscar_prod_bajo_stock(db, threshold)
+
+@router.get("/productos/stats", response_model=list[CategoriaStats])
+async def estadisticas_por_categoria(db: AsyncSession = Depends(get_async_db)):
+    """Cantidad, unidades, valor del inventario y precios de cada categoría"""
+    return await services.obtener_estadisticas(db)
+
+@router.get("/productos/buscar/nombre/{nombre}", response_model=ProductResponse)
+async def obtener_producto_por_nombre(nombre: str, db: AsyncSession = Depends(get_async_db)):
+    """Buscar producto por nombre exacto"""
+    product = await services.buscar_prod_nombre(db, nombre)
+    if product:
+        return product
+    raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+@router.get("/productos/categoria/{categoria}", response_model=list[ProductResponse])
+async def obtener_productos_por_categoria(categoria: str, db: AsyncSession = Depends(get_async_db)):
+    """Obtener todos los productos de una categoría"""
+    return await services.buscar_prod_categoria(db, categoria)
+
+@router.get("/productos/rango_precio/", response_model=list[ProductResponse])
+async def obtener_productos_por_rango_precio(min_price: float, max_price: float, db: AsyncSession = Depends(get_async_db)):
+    """Buscar productos por rango de precio"""
+    return await services.buscar_prod_rango_precio(db, min_price, max_price)
+
+@router.get("/productos/{id}", response_model=ProductResponse)
+async def obtener_producto_por_id(id: int, db: AsyncSession = Depends(get_async_db)):
+    """Obtener un producto por su ID"""
+    product = await services.buscar_prod_int(db, id)
+    if product:
+        return product
+    raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+@router.get("/productos/{id}/stock", response_model=dict)
+async def verificar_stock_producto(id: int, db: AsyncSession = Depends(get_async_db)):
+    """Verificar si un producto tiene stock disponible"""
+    product = await services.buscar_prod_int(db, id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    return {"id": id, "nombre": product.nombre, "stock": product.stock, "disponible": product.stock > 0}
+
+@router.post(
+    "/productos", response_model=ProductResponse, status_code=201, dependencies=[Depends(marcar_escritura)]
+)
+async def crear_producto_route(product: Product, db: AsyncSession = Depends(get_async_db)):
+    """Crear un nuevo producto"""
+    return await services.crear_producto(db, product)
+
+@router.put("/productos/{id}", response_model=ProductResponse, dependencies=[Depends(marcar_escritura)])
+async def reemplazar_producto(
+    id: int, nuevo_producto: Product, request: Request, response: Response, db: AsyncSession = Depends(get_async_db)
+):
+    """Reemplazar un producto existente por completo (412 si no coincide If-Match, 409 si hubo otra escritura)"""
+    versiones = versiones_if_match(request, id)
+    try:
+        updated = await services.actualizar_producto(db, id, nuevo_producto, versiones)
+    except ConflictoVersionError as e:
+        raise HTTPException(status_code=409 if versiones is None else 412, detail=str(e))
+    if updated:
+        response.headers["ETag"] = etag_producto(updated.id, updated.version)
+        return updated
+    raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+@router.delete("/productos/{id}", status_code=204, dependencies=[Depends(marcar_escritura)])
+async def eliminar_producto_route(id: int, db: AsyncSession = Depends(get_async_db)):
+    """Eliminar un producto por su ID"""
+    if await services.eliminar_producto(db, id):
+        return
+    raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+@router.patch(
+    "/productos/{id}/actualizar_stock", response_model=ProductResponse, dependencies=[Depends(marcar_escritura)]
+)
+async def actualizar_stock_producto(id: int, quantity: int, db: AsyncSession = Depends(get_async_db)):
+    """Sumar o restar stock de forma atómica (409 si el stock quedaría negativo)"""
+    try:
+        updated_product = await services.actualizar_stock(db, id, quantity)
+    except StockInsuficienteError:
+        raise HTTPException(status_code=409, detail="Stock insuficiente")
+    if updated_product:
+        return updated_product
+    raise HTTPException(status_code=404, detail="Producto no encontrado")
@@ -0,0 +1,218 @@
+"""Versiones async de las funciones de app/services.py.
+
+Usan ``AsyncSession`` para que las rutas ``async def`` no ocupen un hilo
+del threadpool mientras esperan a la base de datos. Las escrituras mantienen
+lo mismo que las síncronas (cache, listados cacheados, autocompletado y
+exclusión de los productos calientes), porque con ASYNC_DB=True conviven con
+las lecturas de app/routes.py.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from app import cache
+from app.autocompletar import indice as indice_autocompletar
+from app.db import ProductDB
+from app.models import CategoriaStats, Product
+from typing import AsyncIterator, Iterable, Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from app.estadisticas import DeltaCategorias, a_respuesta, consulta_estadisticas
+from app.services import (
+    ConflictoVersionError,
+    StockInsuficienteError,
+    _cachear,
+    _invalidar_listados,
+    filtro_bajo_stock,
+    filtro_categoria,
+    filtro_nombre,
+)
+from app.stock_caliente import registro as registro_stock_caliente
+
+
+@asynccontextmanager
+async def _excluir_calientes(ids: Iterable[int]):
+    """``registro_stock_caliente.excluir`` sin bloquear el event loop (espera y vuelca en un hilo)"""
+    ids = set(ids)
+    if not any(registro_stock_caliente.es_caliente(id) for id in ids):
+        yield
+        return
+    contexto = registro_stock_caliente.excluir(ids)
+    await asyncio.to_thread(contexto.__enter__)
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(contexto.__exit__, None, None, None)
+
+
+async def buscar_prod_int(db: AsyncSession, id: int) -> Optional[ProductDB]:
+    """Buscar producto por ID en la base de datos"""
+    return await db.get(ProductDB, id)
+
+async def buscar_prod_nombre(db: AsyncSession, nombre: str) -> Optional[ProductDB]:
+    """Buscar producto por nombre exacto (case-insensitive)"""
+    result = await db.scalars(select(ProductDB).where(filtro_nombre(nombre)).limit(1))
+    return result.first()
+
+async def buscar_prod_categoria(db: AsyncSession, categoria: str) -> list[ProductDB]:
+    """Buscar productos por categoría (case-insensitive)"""
+    result = await db.scalars(select(ProductDB).where(filtro_categoria(categoria)))
+    return list(result)
+
+async def buscar_prod_rango_precio(db: AsyncSession, min_price: float, max_price: float) -> list[ProductDB]:
+    """Buscar productos por rango de precio"""
+    result = await db.scalars(select(ProductDB).where(
+        ProductDB.precio >= min_price,
+        ProductDB.precio <= max_price
+    ))
+    return list(result)
+
+async def buscar_prod_bajo_stock(db: AsyncSession, threshold: int) -> list[ProductDB]:
+    """Buscar productos con stock menor o igual al umbral"""
+    result = await db.scalars(select(ProductDB).where(*filtro_bajo_stock(threshold)))
+    return list(result)
+
+async def actualizar_stock(db: AsyncSession, id: int, quantity: int) -> Optional[ProductDB]:
+    """Actualizar el stock con un único UPDATE condicional (ver services.actualizar_stock).
+
+    Un producto caliente se excluye de los contadores en memoria durante el
+    UPDATE: con ASYNC_DB=True el PATCH lo sirve la ruta síncrona, que sí
+    usa el write-behind.
+    """
+    async with _excluir_calientes((id,)):
+        product = await _actualizar_stock(db, id, quantity)
+    if product is not None:
+        _cachear(product)
+        _invalidar_listados(product.categoria)
+    return product
+
+async def _actualizar_stock(db: AsyncSession, id: int, quantity: int) -> Optional[ProductDB]:
+    stmt = (
+        update(ProductDB)
+        .where(ProductDB.id == id, ProductDB.stock + quantity >= 0)
+        .values(stock=ProductDB.stock + quantity, version=ProductDB.version + 1)
+    )
+    if db.get_bind().dialect.update_returning:
+        result = await db.execute(
+            stmt.returning(ProductDB),
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        )
+        product = result.scalar_one_or_none()
+        if product is not None:
+            await DeltaCategorias().ajuste_stock(product.categoria, product.precio, quantity).aplicar_async(db)
+        await db.commit()
+    else:
+        result = await db.execute(stmt, execution_options={"synchronize_session": False})
+        if result.rowcount:
+            categoria, precio = (await db.execute(
+                select(ProductDB.categoria, ProductDB.precio).where(ProductDB.id == id)
+            )).one()
+            await DeltaCategorias().ajuste_stock(categoria, precio, quantity).aplicar_async(db)
+        await db.commit()
+        product = await db.get(ProductDB, id, populate_existing=True) if result.rowcount else None
+
+    if product is None:
+        if await buscar_prod_int(db, id) is None:
+            return None
+        raise StockInsuficienteError("Stock insuficiente para el ajuste solicitado")
+    return product
+
+async def obtener_productos_pagina(db: AsyncSession, limit: int, after: Optional[int] = None) -> list[ProductDB]:
+    """Obtener una página de productos ordenada por ID (paginación por cursor)"""
+    stmt = select(ProductDB)
+    if after is not None:
+        stmt = stmt.where(ProductDB.id > after)
+    result = await db.scalars(stmt.order_by(ProductDB.id).limit(limit))
+    return list(result)
+
+async def iterar_productos(db: AsyncSession, after: Optional[int] = None, chunk_size: int = 500) -> AsyncIterator[ProductDB]:
+    """Recorrer los productos por bloques sin cargar toda la tabla en memoria"""
+    stmt = select(ProductDB)
+    if after is not None:
+        stmt = stmt.where(ProductDB.id > after)
+    stmt = stmt.order_by(ProductDB.id).execution_options(yield_per=chunk_size)
+    async for product in await db.stream_scalars(stmt):
+        yield product
+
+async def crear_producto(db: AsyncSession, product: Product) -> ProductDB:
+    """Crear un nuevo producto en la base de datos"""
+    db_product = ProductDB(
+        nombre=product.nombre,
+        descripcion=product.descripcion,
+        precio=product.precio,
+        categoria=product.categoria,
+        stock=product.stock
+    )
+    try:
+        db.add(db_product)
+        await db.flush()
+        await DeltaCategorias().alta(db_product.categoria, db_product.precio, db_product.stock).aplicar_async(db)
+        await db.commit()
+        await db.refresh(db_product)
+        _cachear(db_product)
+        _invalidar_listados(db_product.categoria)
+        indice_autocompletar.agregar(db_product.id, db_product.nombre)
+        return db_product
+    except IntegrityError:
+        await db.rollback()
+        raise ValueError("Error al crear el producto.")
+
+async def eliminar_producto(db: AsyncSession, id: int) -> bool:
+    """Eliminar un producto por su ID"""
+    async with _excluir_calientes((id,)):
+        product = await buscar_prod_int(db, id)
+        if product:
+            categoria = product.categoria
+            await db.delete(product)
+            await db.flush()
+            await DeltaCategorias().baja(categoria, product.precio, product.stock).aplicar_async(db)
+            await db.commit()
+            cache.productos.delete(id)
+            _invalidar_listados(categoria)
+            indice_autocompletar.quitar(id)
+            return True
+        return False
+
+async def actualizar_producto(
+    db: AsyncSession, id: int, product: Product, versiones: Optional[set[int]] = None
+) -> Optional[ProductDB]:
+    """Actualizar un producto existente completamente (ver ``services.actualizar_producto``).
+
+    Raises:
+        ConflictoVersionError: si la versión no es una de ``versiones`` o el
+            producto cambió antes del UPDATE
+    """
+    async with _excluir_calientes((id,)):
+        db_product = await buscar_prod_int(db, id)
+        if db_product:
+            version = db_product.version
+            if versiones is not None and version not in versiones:
+                await db.rollback()
+                raise ConflictoVersionError(f"El producto {id} cambió (versión actual {version})")
+            categoria_anterior = db_product.categoria
+            estadisticas = DeltaCategorias().baja(db_product.categoria, db_product.precio, db_product.stock)
+            db_product.nombre = product.nombre
+            db_product.descripcion = product.descripcion
+            db_product.precio = product.precio
+            db_product.categoria = product.categoria
+            db_product.stock = product.stock
+            db_product.updated_at = datetime.now(timezone.utc)
+            try:
+                await db.flush()
+            except StaleDataError:
+                await db.rollback()
+                raise ConflictoVersionError(f"El producto {id} fue modificado por otra escritura")
+            await estadisticas.alta(db_product.categoria, db_product.precio, db_product.stock).aplicar_async(db)
+            await db.commit()
+            await db.refresh(db_product)
+            _cachear(db_product)
+            _invalidar_listados(categoria_anterior, db_product.categoria)
+            indice_autocompletar.agregar(db_product.id, db_product.nombre)
+            return db_product
+        return None
+
+async def obtener_estadisticas(db: AsyncSession) -> list[CategoriaStats]:
+    """Estadísticas de todas las categorías (ver app/estadisticas.py)"""
+    result = await db.scalars(consulta_estadisticas())
+    return [a_respuesta(stats) for stats in result]
@@ -0,0 +1,167 @@
+"""Índice en memoria de prefijos de nombres para autocompletar.
+
+Los nombres se normalizan (minúsculas y sin acentos) y se guardan en un
+arreglo ordenado de pares ``(clave, id)``. Cada nombre aporta una clave por
+palabra ("mouse inalambrico" y "inalambrico"), así "inal" también encuentra
+"Mouse inalámbrico". Una búsqueda es una búsqueda binaria más k pasos.
+"""
+import bisect
+import sys
+import threading
+import time
+import unicodedata
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db import ProductDB
+
+
+def plegar(texto: str) -> str:
+    """Pasar a minúsculas, quitar acentos y normalizar espacios"""
+    descompuesto = unicodedata.normalize("NFKD", texto.casefold())
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_acentos.split())
+
+def _claves(nombre: str) -> list[str]:
+    """Una clave por cada palabra del nombre (desde esa palabra hasta el final)"""
+    palabras = plegar(nombre).split(" ")
+    return list(dict.fromkeys(" ".join(palabras[i:]) for i in range(len(palabras)) if palabras[i]))
+
+
+class IndicePrefijos:
+    """Índice de prefijos seguro entre hilos.
+
+    Una sola construcción corre a la vez (``_construccion``); las peticiones
+    que llegan mientras tanto esperan a que termine. Las altas y bajas que
+    llegan durante la construcción se encolan y se aplican al reemplazar las
+    listas, así no se pierden escrituras confirmadas después de leer la base.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._construccion = threading.Lock()
+        self._claves: list[tuple[str, int]] = []
+        self._nombres: dict[int, str] = {}
+        # Altas (id, nombre) y bajas (id, None) recibidas durante una construcción
+        self._pendientes: Optional[list[tuple[int, Optional[str]]]] = None
+        self.construido = False
+        self.duracion_construccion: Optional[float] = None
+
+    def construir(self, productos: Iterable[tuple[int, str]]):
+        """Reemplazar el contenido del índice con los pares (id, nombre) dados"""
+        with self._construccion:
+            self._construir(lambda: productos)
+
+    def _construir(self, leer: Callable[[], Iterable[tuple[int, str]]]):
+        inicio = time.perf_counter()
+        # Encolar desde antes de leer: lo que se confirme después puede no estar en la lectura
+        with self._lock:
+            self._pendientes = []
+        try:
+            nombres = {id: nombre for id, nombre in leer()}
+            claves = sorted((clave, id) for id, nombre in nombres.items() for clave in _claves(nombre))
+        except BaseException:
+            with self._lock:
+                self._pendientes = None
+            raise
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, None
+            if pendientes is None:
+                # invalidar() durante la construcción: lo leído puede estar viejo
+                return
+            self._nombres = nombres
+            self._claves = claves
+            for id, nombre in pendientes:
+                if nombre is None:
+                    self._quitar(id)
+                else:
+                    self._agregar(id, nombre)
+            self.construido = True
+        self.duracion_construccion = time.perf_counter() - inicio
+
+    def asegurar_construido(self, db: Session):
+        """Construir el índice desde la base de datos si todavía no existe"""
+        if self.construido:
+            return
+        with self._construccion:
+            if not self.construido:
+                self._construir(lambda: db.execute(
+                    select(ProductDB.id, ProductDB.nombre).execution_options(yield_per=10_000)
+                ))
+
+    def invalidar(self):
+        """Vaciar el índice; se vuelve a construir en la próxima búsqueda"""
+        with self._lock:
+            self._claves = []
+            self._nombres = {}
+            self._pendientes = None
+            self.construido = False
+
+    def _quitar(self, id: int):
+        nombre = self._nombres.pop(id, None)
+        if nombre is None:
+            return
+        for clave in _claves(nombre):
+            i = bisect.bisect_left(self._claves, (clave, id))
+            if i < len(self._claves) and self._claves[i] == (clave, id):
+                del self._claves[i]
+
+    def _agregar(self, id: int, nombre: str):
+        self._quitar(id)
+        self._nombres[id] = nombre
+        for clave in _claves(nombre):
+            bisect.insort(self._claves, (clave, id))
+
+    def agregar(self, id: int, nombre: str):
+        """Agregar o renombrar un producto"""
+        with self._lock:
+            if self._pendientes is not None:
+                self._pendientes.append((id, nombre))
+            if self.construido:
+                self._agregar(id, nombre)
+
+    def quitar(self, id: int):
+        """Quitar un producto eliminado"""
+        with self._lock:
+            if self._pendientes is not None:
+                self._pendientes.append((id, None))
+            if self.construido:
+                self._quitar(id)
+
+    def buscar(self, prefijo: str, k: int = 10) -> list[tuple[int, str]]:
+        """Hasta k productos cuyo nombre (o alguna de sus palabras) empieza con el prefijo"""
+        prefijo = plegar(prefijo)
+        if not prefijo:
+            return []
+        resultados: dict[int, str] = {}
+        with self._lock:
+            i = bisect.bisect_left(self._claves, (prefijo, -1))
+            while i < len(self._claves) and len(resultados) < k:
+                clave, id = self._claves[i]
+                if not clave.startswith(prefijo):
+                    break
+                resultados.setdefault(id, self._nombres[id])
+                i += 1
+        return list(resultados.items())
+
+    def memoria(self) -> dict:
+        """Tamaño del índice y estimación de su memoria en bytes"""
+        with self._lock:
+            bytes_claves = sys.getsizeof(self._claves) + sum(
+                sys.getsizeof(par) + sys.getsizeof(par[0]) for par in self._claves
+            )
+            bytes_nombres = sys.getsizeof(self._nombres) + sum(
+                sys.getsizeof(id) + sys.getsizeof(nombre) for id, nombre in self._nombres.items()
+            )
+            return {
+                "construido": self.construido,
+                "productos": len(self._nombres),
+                "claves": len(self._claves),
+                "bytes_estimados": bytes_claves + bytes_nombres,
+                "duracion_construccion": self.duracion_construccion,
+            }
+
+
+indice = IndicePrefijos()
@@ -0,0 +1,190 @@
+"""Caches en memoria de productos y de respuestas de listados.
+
+La cache de productos es intercambiable: las funciones de app/services.py
+usan ``cache.productos`` y cualquier objeto con la interfaz de ``CacheBase``
+se puede instalar con ``configurar_cache_productos``.
+
+La cache de respuestas guarda el cuerpo ya serializado (y comprimido) de los
+listados. Sus claves incluyen la generación del catálogo o de la categoría,
+que las escrituras incrementan, así una escritura invalida todos los listados
+afectados sin recorrer la cache.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+
+class CacheBase:
+    """Interfaz mínima de una cache de productos"""
+
+    def token(self) -> int:
+        """Marca que se toma antes de leer de la base de datos (ver ``set``)"""
+        return 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return None
+
+    def set(self, key: Hashable, value: Any, token: Optional[int] = None):
+        pass
+
+    def delete(self, key: Hashable):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+class SinCache(CacheBase):
+    """Cache deshabilitada: todas las lecturas van a la base de datos"""
+
+    def stats(self) -> dict:
+        return {"habilitada": False}
+
+
+class LRUTTLCache(CacheBase):
+    """Cache LRU con expiración por tiempo (TTL), segura entre hilos.
+
+    Cada escritura (``set`` sin token, ``delete`` o ``clear``) incrementa un
+    contador. Una lectura que llenó la cache desde la base de datos pasa el
+    ``token`` tomado antes de consultar; si hubo escrituras en el medio el
+    valor leído puede estar viejo y no se guarda.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._datos: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._escrituras = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def token(self) -> int:
+        return self._escrituras
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entrada = self._datos.get(key)
+            if entrada is None:
+                self.misses += 1
+                return None
+            expira, value = entrada
+            if expira <= self._clock():
+                del self._datos[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._datos.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, token: Optional[int] = None):
+        with self._lock:
+            if token is None:
+                self._escrituras += 1
+            elif token != self._escrituras:
+                return
+            self._datos[key] = (self._clock() + self.ttl, value)
+            self._datos.move_to_end(key)
+            while len(self._datos) > self.max_entries:
+                self._datos.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._escrituras += 1
+            self._datos.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._escrituras += 1
+            self._datos.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "habilitada": True,
+                "entradas": len(self._datos),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class Generaciones:
+    """Contadores de generación del catálogo completo y de cada categoría.
+
+    Cada escritura incrementa la generación del catálogo y la de las
+    categorías que toca. Las categorías se comparan en minúsculas porque
+    las búsquedas por categoría no distinguen mayúsculas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalogo = 0
+        self._reinicios = 0
+        self._categorias: dict[str, int] = {}
+
+    def catalogo(self) -> int:
+        return self._catalogo
+
+    def categoria(self, categoria: str) -> tuple[int, int]:
+        return self._reinicios, self._categorias.get(categoria.lower(), 0)
+
+    def incrementar(self, categorias: Iterable[str] = ()):
+        with self._lock:
+            self._catalogo += 1
+            for categoria in {c.lower() for c in categorias}:
+                self._categorias[categoria] = self._categorias.get(categoria, 0) + 1
+
+    def reiniciar(self):
+        """Invalidar todo (por ejemplo tras una carga externa)"""
+        with self._lock:
+            self._catalogo += 1
+            self._reinicios += 1
+
+
+class RespuestaCacheada:
+    """Cuerpo serializado de un listado, en claro y comprimido con gzip"""
+
+    __slots__ = ("body", "gzip_body", "headers", "etag", "ultima_modificacion")
+
+    def __init__(self, body: bytes, gzip_body: bytes, headers: dict[str, str], etag: str, ultima_modificacion):
+        self.body = body
+        self.gzip_body = gzip_body
+        self.headers = headers
+        self.etag = etag
+        self.ultima_modificacion = ultima_modificacion
+
+
+def _cache_desde_entorno(prefijo: str, max_entries: int, ttl: float) -> CacheBase:
+    """<PREFIJO>_SIZE=0 deshabilita la cache"""
+    max_entries = int(os.getenv(f"{prefijo}_SIZE", str(max_entries)))
+    ttl = float(os.getenv(f"{prefijo}_TTL", str(ttl)))
+    if max_entries <= 0:
+        return SinCache()
+    return LRUTTLCache(max_entries=max_entries, ttl=ttl)
+
+
+# Cache de productos por ID (valores: ProductResponse)
+productos: CacheBase = _cache_desde_entorno("PRODUCT_CACHE", 1024, 30)
+
+# Cache de listados: clave (ruta, parámetros, generación) -> RespuestaCacheada
+respuestas: CacheBase = _cache_desde_entorno("RESPONSE_CACHE", 256, 60)
+generaciones = Generaciones()
+
+def configurar_cache_productos(cache: CacheBase):
+    """Reemplazar la implementación de la cache de productos"""
+    global productos
+    productos = cache
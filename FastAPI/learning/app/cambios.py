@@ -0,0 +1,150 @@
+"""Feed incremental de cambios del catálogo, con tombstones.
+
+Triggers de ``products`` (ver app/db.py) agregan una fila a ``product_changes``
+por cada INSERT, UPDATE o DELETE, en la misma transacción que la escritura.
+Así quedan registradas todas: las de app/services.py, los UPDATE masivos, la
+importación, el volcado del stock caliente y las rutas async. El ``id`` de la
+fila es el cursor del feed.
+
+``GET /productos/changes?since=<cursor>`` devuelve los productos que cambiaron
+después de ``since`` con su estado actual, o un tombstone (``eliminado``) si
+ya no existen. Sincronizar cuesta lo que la cantidad de cambios y no el tamaño
+del catálogo. Con ``wait=N`` la petición espera hasta N segundos a que haya
+cambios (long-poll): los commits de este proceso la despiertan y, para los de
+otros procesos, se vuelve a consultar cada ``INTERVALO_SONDEO`` segundos.
+
+El cursor es monótono en el orden de los commits: en PostgreSQL el trigger
+es diferido y toma un advisory lock al confirmar (ver ``_CAMBIOS_DDL`` en
+app/db.py), así un cliente nunca avanza su cursor por encima de un cambio que
+todavía no se confirmó. Quien escriba en ``product_changes`` a mano debe
+tomar el mismo lock (``LOCK_CAMBIOS``).
+
+Compactación (borra los cambios reemplazados por uno posterior del mismo
+producto; el feed devuelve lo mismo para cualquier cursor):
+
+    python -m app.cambios
+"""
+import asyncio
+import threading
+
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.orm import Session, aliased
+
+from app.db import ProductChangeDB, ProductDB, SessionLocal
+from app.serializacion import CAMPOS, consulta_filas
+
+# Productos por consulta IN al leer el estado actual (como /productos/batch)
+LOTE_IN = 500
+# Segundos máximos de un long-poll y entre consultas mientras espera
+ESPERA_MAXIMA = 30.0
+INTERVALO_SONDEO = 1.0
+# Advisory lock de PostgreSQL que ordena las escrituras del registro
+LOCK_CAMBIOS = "SELECT pg_advisory_xact_lock(hashtext('product_changes'))"
+
+
+def leer_cambios(db: Session, since: int, limit: int) -> dict:
+    """Página del feed: hasta ``limit`` cambios posteriores a ``since``.
+
+    Si un producto cambió varias veces en la página aparece una vez, con el
+    cursor de su último cambio. Los productos se leen como filas planas; el
+    resultado tiene la forma de ``CambiosResponse`` y se codifica con
+    ``serializacion.dumps``.
+    """
+    filas = db.execute(
+        select(ProductChangeDB.id, ProductChangeDB.product_id, ProductChangeDB.eliminado)
+        .where(ProductChangeDB.id > since)
+        .order_by(ProductChangeDB.id)
+        .limit(limit + 1)
+    ).all()
+    hay_mas = len(filas) > limit
+    filas = filas[:limit]
+
+    ultimos: dict[int, tuple[int, bool]] = {}
+    for cursor, product_id, eliminado in filas:
+        # Reinsertar para que el orden sea el del último cambio
+        ultimos.pop(product_id, None)
+        ultimos[product_id] = (cursor, eliminado)
+    vivos = [product_id for product_id, (_, eliminado) in ultimos.items() if not eliminado]
+    productos = {}
+    for inicio in range(0, len(vivos), LOTE_IN):
+        consulta = db.query(ProductDB).filter(ProductDB.id.in_(vivos[inicio:inicio + LOTE_IN]))
+        for fila in consulta_filas(consulta):
+            productos[fila.id] = dict(zip(CAMPOS, fila))
+
+    cambios = []
+    for product_id, (cursor, _) in sorted(ultimos.items(), key=lambda item: item[1][0]):
+        # Sin fila: se borró después de este cambio y el tombstone llega en una página posterior
+        producto = productos.get(product_id)
+        cambios.append({"cursor": cursor, "id": product_id, "eliminado": producto is None, "producto": producto})
+    return {"cambios": cambios, "cursor": filas[-1].id if filas else since, "hay_mas": hay_mas}
+
+def compactar(db: Session) -> int:
+    """Borrar los cambios que tienen uno posterior del mismo producto.
+
+    Returns:
+        Cantidad de filas borradas
+    """
+    posterior = aliased(ProductChangeDB)
+    ultimo = (
+        select(func.max(posterior.id)).where(posterior.product_id == ProductChangeDB.product_id).scalar_subquery()
+    )
+    borradas = db.execute(delete(ProductChangeDB).where(ProductChangeDB.id < ultimo)).rowcount
+    db.commit()
+    return borradas
+
+
+class Notificador:
+    """Despierta a los long-polls del feed cuando se confirma una transacción"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._esperando: set[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = set()
+
+    def notificar(self):
+        """Puede llamarse desde cualquier hilo"""
+        with self._lock:
+            esperando, self._esperando = self._esperando, set()
+        for loop, futuro in esperando:
+            loop.call_soon_threadsafe(_resolver, futuro)
+
+    async def esperar(self, timeout: float) -> bool:
+        """Esperar el próximo commit (False si pasó ``timeout`` sin ninguno)"""
+        loop = asyncio.get_running_loop()
+        entrada = (loop, loop.create_future())
+        with self._lock:
+            self._esperando.add(entrada)
+        try:
+            await asyncio.wait_for(entrada[1], timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                self._esperando.discard(entrada)
+
+
+def _resolver(futuro: asyncio.Future):
+    if not futuro.done():
+        futuro.set_result(None)
+
+
+notificador = Notificador()
+
+
+@event.listens_for(Session, "after_commit")
+def _despues_de_commit(session):
+    # Las sesiones de lectura no hacen commit: casi todos los commits son escrituras
+    notificador.notificar()
+
+
+def main():
+    db = SessionLocal()
+    try:
+        borradas = compactar(db)
+    finally:
+        db.close()
+    print(f"✓ Registro de cambios compactado: {borradas} filas borradas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Coalescencia de lecturas concurrentes (single-flight).
+
+Cuando varias peticiones piden a la vez un dato que no está en la cache,
+solo la primera (la líder) consulta la base de datos y las demás esperan su
+resultado. Así un producto muy pedido que sale de la cache cuesta una
+consulta y no una por cada petición concurrente.
+
+Solo se comparten llamadas que se superponen en el tiempo; no se guardan
+resultados (para eso está app/cache.py). El resultado pasa entre hilos, así
+que debe ser inmutable (p. ej. ``ProductResponse``), nunca un objeto ligado
+a una sesión.
+"""
+import threading
+from typing import Any, Callable, Hashable
+
+# Segundos que una llamada espera a la líder antes de consultar por su cuenta
+ESPERA_MAXIMA = 30.0
+
+
+class _Vuelo:
+    """Llamada en curso para una clave"""
+
+    __slots__ = ("listo", "resultado", "error")
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class Coalescedor:
+    """Ejecuta una sola vez las llamadas concurrentes con la misma clave, seguro entre hilos"""
+
+    def __init__(self, espera_maxima: float = ESPERA_MAXIMA):
+        self._lock = threading.Lock()
+        self._vuelos: dict[Hashable, _Vuelo] = {}
+        self.espera_maxima = espera_maxima
+        self.ejecuciones = 0
+        self.compartidas = 0
+        self.esperas_vencidas = 0
+
+    def ejecutar(self, clave: Hashable, funcion: Callable[[], Any]) -> Any:
+        """Llamar a ``funcion`` o esperar el resultado de la llamada en curso con ``clave``.
+
+        Si la líder falla, las que esperaban reciben la misma excepción.
+        """
+        with self._lock:
+            vuelo = self._vuelos.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelos[clave] = _Vuelo()
+                self.ejecuciones += 1
+            else:
+                self.compartidas += 1
+
+        if not lider:
+            if vuelo.listo.wait(self.espera_maxima):
+                if vuelo.error is not None:
+                    raise vuelo.error
+                return vuelo.resultado
+            with self._lock:
+                self.esperas_vencidas += 1
+            return funcion()
+
+        try:
+            vuelo.resultado = funcion()
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._vuelos[clave]
+            vuelo.listo.set()
+        return vuelo.resultado
+
+    def reiniciar(self):
+        with self._lock:
+            self.ejecuciones = 0
+            self.compartidas = 0
+            self.esperas_vencidas = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "en_curso": len(self._vuelos),
+                "ejecuciones": self.ejecuciones,
+                "compartidas": self.compartidas,
+                "esperas_vencidas": self.esperas_vencidas,
+            }
+
+
+coalescedor = Coalescedor()
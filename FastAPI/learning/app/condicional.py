@@ -0,0 +1,125 @@
+"""ETags y peticiones condicionales (If-None-Match / If-Modified-Since / If-Match).
+
+El ETag de un producto es su ID y su ``version`` (la columna de concurrencia
+optimista); el de un listado se calcula a partir de la cantidad de filas, el
+``updated_at`` más reciente y las sumas de IDs y versiones. Una respuesta
+parcial (``fields``) es otra representación y lleva además una marca de sus
+campos. Así el servidor puede responder
+``304 Not Modified`` sin serializar el cuerpo, y un ``PUT`` con ``If-Match``
+se traduce directamente en ``UPDATE ... WHERE version = :v``.
+"""
+import hashlib
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.serializacion import CAMPOS
+
+
+def a_utc(fecha: Optional[datetime]) -> Optional[datetime]:
+    """Las fechas sin zona horaria de la base de datos están en UTC"""
+    if fecha is None or fecha.tzinfo is not None:
+        return fecha
+    return fecha.replace(tzinfo=timezone.utc)
+
+def fecha_http(fecha: datetime) -> str:
+    """Formatear una fecha para el header Last-Modified"""
+    return format_datetime(a_utc(fecha).astimezone(timezone.utc), usegmt=True)
+
+def _marca_campos(campos: tuple[str, ...]) -> str:
+    """Identificador corto de los campos de una respuesta parcial"""
+    return hashlib.blake2b(",".join(campos).encode(), digest_size=4).hexdigest()
+
+def etag_producto(id: int, version: int, campos: tuple[str, ...] = CAMPOS) -> str:
+    """ETag fuerte de un producto: su ID y su versión (y sus campos si la respuesta es parcial)"""
+    if campos == CAMPOS:
+        return f'"{id}-v{version}"'
+    return f'"{id}-v{version}-{_marca_campos(campos)}"'
+
+# La marca de campos es opcional: un If-Match con el ETag de una respuesta parcial también vale
+_ETAG_PRODUCTO = re.compile(r'"(\d+)-v(\d+)(?:-[0-9a-f]+)?"')
+
+def versiones_if_match(request: Request, id: int) -> Optional[set[int]]:
+    """Versiones del producto ``id`` aceptadas por el header If-Match.
+
+    Devuelve None si no hay If-Match o es ``*`` (cualquier versión). Los ETags
+    débiles o de otro producto no coinciden nunca (comparación fuerte, RFC 9110
+    sección 13.1.1), así que pueden dejar el conjunto vacío.
+    """
+    if_match = request.headers.get("if-match")
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versiones = set()
+    for etag in if_match.split(","):
+        coincidencia = _ETAG_PRODUCTO.fullmatch(etag.strip())
+        if coincidencia and int(coincidencia.group(1)) == id:
+            versiones.add(int(coincidencia.group(2)))
+    return versiones
+
+def etag_listado(
+    total: int,
+    ultima_modificacion: Optional[datetime],
+    suma_ids: int = 0,
+    suma_versiones: int = 0,
+    campos: tuple[str, ...] = CAMPOS,
+) -> str:
+    """ETag fuerte de un listado: cantidad de filas, última modificación,
+    sumas de IDs y de versiones y, si la respuesta es parcial, sus campos.
+
+    En una página con ``limit`` la cantidad y la última modificación pueden no
+    cambiar cuando se borra una fila y entra la siguiente; la suma de IDs sí
+    (cambia qué filas forman la página) y la de versiones cambia con cualquier
+    escritura de una de ellas.
+    """
+    marca = a_utc(ultima_modificacion).isoformat() if ultima_modificacion else ""
+    firma = f"{total}|{marca}|{suma_ids}|{suma_versiones}"
+    if campos != CAMPOS:
+        firma += "|" + ",".join(campos)
+    return '"' + hashlib.blake2b(firma.encode(), digest_size=12).hexdigest() + '"'
+
+def etag_gzip(etag: str) -> str:
+    """ETag de la variante comprimida con gzip (otra representación, otro ETag fuerte)"""
+    return etag[:-1] + '-gz"'
+
+def _sin_debil(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+def no_modificado(request: Request, etag: str, ultima_modificacion: Optional[datetime] = None) -> bool:
+    """Ver si la copia del cliente sigue vigente.
+
+    If-None-Match tiene prioridad; If-Modified-Since solo se usa si el
+    cliente no envió ETags (RFC 9110, sección 13.2.2).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        etags = {_sin_debil(e.strip()) for e in if_none_match.split(",")}
+        return _sin_debil(etag) in etags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and ultima_modificacion:
+        try:
+            fecha_cliente = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if fecha_cliente.tzinfo is None:
+            fecha_cliente = fecha_cliente.replace(tzinfo=timezone.utc)
+        return a_utc(ultima_modificacion).replace(microsecond=0) <= fecha_cliente
+    return False
+
+def encabezados_cache(etag: str, ultima_modificacion: Optional[datetime] = None) -> dict[str, str]:
+    """Headers ETag y Last-Modified de una respuesta"""
+    headers = {"ETag": etag}
+    if ultima_modificacion:
+        headers["Last-Modified"] = fecha_http(ultima_modificacion)
+    return headers
+
+def respuesta_no_modificada(
+    etag: str, ultima_modificacion: Optional[datetime] = None, headers: Optional[dict[str, str]] = None
+) -> Response:
+    """Respuesta 304 sin cuerpo (``headers``: extra, como ``Vary``)"""
+    return Response(status_code=304, headers={**encabezados_cache(etag, ultima_modificacion), **(headers or {})})
@@ -0,0 +1,182 @@
+"""Registro de consultas lentas con captura automática del plan (EXPLAIN).
+
+Opcional: se activa con ``SLOW_QUERY_MS`` (umbral en milisegundos, sin
+definir o 0 = deshabilitado). Cada sentencia que supera el umbral se guarda
+en un buffer circular de ``SLOW_QUERY_BUFFER`` entradas y se escribe en el
+log ``app.consultas_lentas`` con:
+
+- el SQL normalizado (literales, parámetros y listas IN reemplazados por ``?``),
+- los parámetros redactados (solo tipo y largo, nunca valores),
+- la ruta que la emitió (ver app/metricas.py),
+- el plan de ejecución, que se captura en segundo plano la primera vez que
+  aparece cada forma de consulta (``EXPLAIN QUERY PLAN`` en SQLite,
+  ``EXPLAIN`` sin ANALYZE en PostgreSQL: no se vuelve a ejecutar la sentencia).
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.metricas import medicion_actual
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+SLOW_QUERY_BUFFER = int(os.getenv("SLOW_QUERY_BUFFER", "200"))
+# Formas distintas de consulta cuyo plan se conserva
+MAX_FORMAS = 1000
+
+_PREFIJO_EXPLAIN = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+_EXPLICABLES = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+_LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_LITERAL_NUMERO = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PARAMETRO = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):\w+")
+_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACIOS = re.compile(r"\s+")
+
+# True en el hilo que corre los EXPLAIN, para no registrarlos a ellos mismos
+_explicando: ContextVar[bool] = ContextVar("explicando", default=False)
+
+
+def normalizar_sql(sql: str) -> str:
+    """Forma de la consulta: sin literales ni valores, listas IN colapsadas"""
+    sql = _LITERAL_TEXTO.sub("?", sql)
+    sql = _PARAMETRO.sub("?", sql)
+    sql = _LITERAL_NUMERO.sub("?", sql)
+    sql = _LISTA.sub("(?...)", sql)
+    return _ESPACIOS.sub(" ", sql).strip()
+
+def _tipo(valor: Any) -> str:
+    if isinstance(valor, (str, bytes)):
+        return f"{type(valor).__name__}({len(valor)})"
+    return type(valor).__name__
+
+def redactar_parametros(parametros: Any, executemany: bool = False) -> Any:
+    """Reemplazar cada valor por su tipo (y largo, para textos)"""
+    if executemany and parametros:
+        return {"filas": len(parametros), "primera": redactar_parametros(parametros[0])}
+    if isinstance(parametros, dict):
+        return {clave: _tipo(valor) for clave, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [_tipo(valor) for valor in parametros]
+    return None
+
+
+class RegistroConsultasLentas:
+    """Buffer circular de consultas lentas y planes por forma de consulta"""
+
+    def __init__(self, umbral_ms: float = 0, capacidad: int = 200):
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+        self._pendientes: set[Future] = set()
+        self.umbral_ms = umbral_ms
+        self.consultas: deque = deque(maxlen=capacidad)
+        self.planes: dict[str, Optional[list[str]]] = {}
+
+    @property
+    def habilitado(self) -> bool:
+        return self.umbral_ms > 0
+
+    def activar(self, umbral_ms: float, capacidad: Optional[int] = None):
+        """Registrar las sentencias que tarden ``umbral_ms`` o más"""
+        with self._lock:
+            self.umbral_ms = umbral_ms
+            if capacidad is not None:
+                self.consultas = deque(self.consultas, maxlen=capacidad)
+
+    def desactivar(self):
+        self.umbral_ms = 0
+
+    def limpiar(self):
+        with self._lock:
+            self.consultas.clear()
+            self.planes.clear()
+
+    def registrar(self, conn, sql: str, parametros: Any, executemany: bool, duracion: float):
+        forma = normalizar_sql(sql)
+        medicion = medicion_actual()
+        entrada = {
+            "fecha": datetime.now(timezone.utc).isoformat(),
+            "duracion_ms": round(duracion * 1000, 3),
+            "sql": forma,
+            "parametros": redactar_parametros(parametros, executemany),
+            "ruta": medicion.ruta() if medicion else None,
+        }
+        with self._lock:
+            self.consultas.append(entrada)
+            nueva = forma not in self.planes and len(self.planes) < MAX_FORMAS
+            if nueva:
+                self.planes[forma] = None
+        logger.warning("Consulta lenta (%.1f ms, ruta %s): %s", entrada["duracion_ms"], entrada["ruta"], forma)
+        if nueva and not conn.dialect.is_async and sql.lstrip().upper().startswith(_EXPLICABLES):
+            primeros = parametros[0] if executemany and parametros else parametros
+            futuro = self._executor.submit(self._explicar, conn.engine, forma, sql, primeros)
+            with self._lock:
+                self._pendientes.add(futuro)
+            futuro.add_done_callback(self._terminado)
+
+    def _terminado(self, futuro: Future):
+        with self._lock:
+            self._pendientes.discard(futuro)
+
+    def _explicar(self, engine: Engine, forma: str, sql: str, parametros: Any):
+        """Capturar el plan con una conexión propia (corre en el hilo de EXPLAIN)"""
+        _explicando.set(True)
+        prefijo = _PREFIJO_EXPLAIN.get(engine.dialect.name, "EXPLAIN ")
+        try:
+            with engine.connect() as conn:
+                filas = conn.exec_driver_sql(prefijo + sql, parametros or ()).all()
+            plan = [str(fila[-1]) for fila in filas]
+        except Exception as e:
+            plan = [f"EXPLAIN falló: {e}"]
+        with self._lock:
+            if forma in self.planes:
+                self.planes[forma] = plan
+
+    def esperar(self, timeout: float = 5.0):
+        """Esperar a que terminen los EXPLAIN pendientes"""
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            with self._lock:
+                if not self._pendientes:
+                    return
+            time.sleep(0.01)
+
+    def listar(self) -> dict:
+        """Consultas registradas (la más reciente primero) con su plan"""
+        with self._lock:
+            consultas = [{**entrada, "plan": self.planes.get(entrada["sql"])} for entrada in reversed(self.consultas)]
+            return {
+                "habilitado": self.habilitado,
+                "umbral_ms": self.umbral_ms,
+                "capacidad": self.consultas.maxlen,
+                "consultas": consultas,
+            }
+
+
+registro = RegistroConsultasLentas(SLOW_QUERY_MS, SLOW_QUERY_BUFFER)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if registro.habilitado and not _explicando.get():
+        conn.info["inicio_consulta_lenta"] = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info.pop("inicio_consulta_lenta", None)
+    if inicio is None:
+        return
+    duracion = time.perf_counter() - inicio
+    if duracion * 1000 >= registro.umbral_ms:
+        registro.registrar(conn, statement, parameters, executemany, duracion)
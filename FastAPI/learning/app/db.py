@@ -1,10 +1,12 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text
+from sqlalchemy import create_engine, event, Boolean, Column, Integer, String, Float, DateTime, Text, Index, DDL, false, func, text
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.types import Numeric
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
+from app.pool import argumentos_engine
 
 # Cargar variables de entorno desde .env
 load_dotenv()
@@ -14,16 +16,62 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("La variable de entorno DATABASE_URL no está configurada")
 
-# Crear motor de SQLAlchemy
+# Crear motor de SQLAlchemy (pool configurado por variables DB_POOL_*, ver app/pool.py)
 DEBUG = os.getenv("DEBUG", "False") == "True"
-engine = create_engine(DATABASE_URL, echo=DEBUG)
+engine = create_engine(DATABASE_URL, echo=DEBUG, **argumentos_engine(DATABASE_URL))
 
 # Crear sesión
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Ruta async opcional: ASYNC_DB=True sirve las escrituras básicas con AsyncSession (ver app/main.py)
+ASYNC_DB = os.getenv("ASYNC_DB", "False") == "True"
+
+# Driver async equivalente para cada esquema de DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    """Convertir una URL de base de datos al driver async de su dialecto.
+
+    Por ejemplo ``postgresql://...`` pasa a ``postgresql+asyncpg://...`` y
+    ``sqlite:///./app.db`` a ``sqlite+aiosqlite:///./app.db``. Si la URL ya
+    usa un driver async se devuelve sin cambios.
+    """
+    scheme, separator, rest = url.partition("://")
+    dialect, _, driver = scheme.partition("+")
+    if driver in ("asyncpg", "aiosqlite", "psycopg_async"):
+        return url
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"No hay driver async configurado para el esquema '{scheme}'")
+    return f"{ASYNC_DRIVERS[dialect]}{separator}{rest}"
+
+# El motor async se crea al primer uso para no exigir asyncpg/aiosqlite
+# cuando solo se usa la ruta síncrona
+_async_engine = None
+_AsyncSessionLocal = None
+
+def get_async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    """Obtener (creando si hace falta) la fábrica de sesiones async"""
+    global _async_engine, _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        _async_engine = create_async_engine(
+            async_database_url(DATABASE_URL),
+            echo=DEBUG,
+            **argumentos_engine(DATABASE_URL, async_engine=True),
+        )
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _AsyncSessionLocal
+
 # Base para modelos
 Base = declarative_base()
 
+# Umbral del índice parcial de stock bajo: las consultas con threshold menor o
+# igual agregan "stock <= LOW_STOCK_INDEX_THRESHOLD" para poder usarlo
+LOW_STOCK_INDEX_THRESHOLD = 10
+
 # Modelo SQLAlchemy para la tabla 'products'
 class ProductDB(Base):
     __tablename__ = "products"
@@ -35,7 +83,146 @@ class ProductDB(Base):
     categoria = Column(String(80), nullable=False)
     stock = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at = datetime.now(timezone.utc)
+    # onupdate también aplica a los UPDATE masivos (stock, reservas, importación)
+    updated_at = Column(
+        DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        index=True,
+    )
+    # Control de concurrencia optimista: cada UPDATE del ORM agrega
+    # "AND version = :v" y la incrementa. Los UPDATE masivos la incrementan a mano
+    version = Column(Integer, nullable=False, server_default=text("1"))
+
+    __table_args__ = (
+        # Búsquedas case-insensitive: lower(columna) = lower(:valor)
+        Index("ix_products_nombre_lower", func.lower(nombre)),
+        Index("ix_products_categoria_lower", func.lower(categoria)),
+        Index("ix_products_precio", precio),
+        Index(
+            "ix_products_stock_bajo",
+            stock,
+            sqlite_where=text(f"stock <= {LOW_STOCK_INDEX_THRESHOLD}"),
+            postgresql_where=text(f"stock <= {LOW_STOCK_INDEX_THRESHOLD}"),
+        ),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
+# Resumen por categoría para /productos/stats. Las escrituras de app/services.py
+# lo mantienen con deltas (ver app/estadisticas.py); el promedio de precio es
+# suma_precios / productos
+class CategoriaStatsDB(Base):
+    __tablename__ = "categoria_stats"
+
+    categoria = Column(String(80), primary_key=True)
+    productos = Column(Integer, nullable=False, default=0)
+    unidades = Column(Integer, nullable=False, default=0)
+    valor_inventario = Column(Numeric(16, 2), nullable=False, default=0)
+    suma_precios = Column(Numeric(16, 2), nullable=False, default=0)
+    precio_min = Column(Numeric(10, 2), nullable=True)
+    precio_max = Column(Numeric(10, 2), nullable=True)
+
+# Registro de cambios del catálogo para la sincronización incremental (ver
+# app/cambios.py). Lo escriben triggers de products en la misma transacción que
+# cada INSERT/UPDATE/DELETE; el id es el cursor del feed y los borrados quedan
+# como tombstones (eliminado = true)
+class ProductChangeDB(Base):
+    __tablename__ = "product_changes"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    product_id = Column(Integer, nullable=False)
+    eliminado = Column(Boolean, nullable=False, default=False, server_default=false())
+    changed_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        # Compactación: último cambio de cada producto
+        Index("ix_product_changes_product_id_id", product_id, id),
+        # En SQLite, AUTOINCREMENT evita reutilizar cursores tras compactar
+        {"sqlite_autoincrement": True},
+    )
+
+# Índice de texto completo sobre nombre y descripción.
+# PostgreSQL: columna tsvector generada (configuración española sin acentos) con
+# índice GIN. SQLite: tabla FTS5 externa sincronizada con triggers. En ambos
+# casos el índice se mantiene solo en cualquier INSERT/UPDATE/DELETE, también
+# en los UPDATE masivos de app/services.py y app/importacion.py.
+FTS_CONFIG_PG = "es_unaccent"
+
+_FTS_DDL = {
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS unaccent",
+        f"""DO $$ BEGIN
+            CREATE TEXT SEARCH CONFIGURATION {FTS_CONFIG_PG} (COPY = spanish);
+            ALTER TEXT SEARCH CONFIGURATION {FTS_CONFIG_PG}
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+        EXCEPTION WHEN unique_violation THEN NULL;
+        END $$""",
+        f"""ALTER TABLE products ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('{FTS_CONFIG_PG}', coalesce(nombre, '')), 'A') ||
+            setweight(to_tsvector('{FTS_CONFIG_PG}', coalesce(descripcion, '')), 'B')
+        ) STORED""",
+        "CREATE INDEX ix_products_search_vector ON products USING GIN (search_vector)",
+    ],
+    "sqlite": [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            nombre, descripcion, content='products', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )""",
+        """CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, nombre, descripcion) VALUES (new.id, new.nombre, new.descripcion);
+        END""",
+        """CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, nombre, descripcion)
+            VALUES ('delete', old.id, old.nombre, old.descripcion);
+        END""",
+        """CREATE TRIGGER products_fts_au AFTER UPDATE OF nombre, descripcion ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, nombre, descripcion)
+            VALUES ('delete', old.id, old.nombre, old.descripcion);
+            INSERT INTO products_fts(rowid, nombre, descripcion) VALUES (new.id, new.nombre, new.descripcion);
+        END""",
+    ],
+}
+
+# Triggers del registro de cambios (ver ProductChangeDB). Se crean con products
+# porque se disparan desde ella. En PostgreSQL el id sale de una secuencia al
+# insertar, no al confirmar: el trigger es diferido (corre al hacer commit) y
+# toma un advisory lock hasta el final de la transacción, así un cursor mayor
+# nunca se hace visible antes que uno menor. El lock solo se retiene durante
+# el commit. En SQLite las escrituras ya son serializadas
+_CAMBIOS_DDL = {
+    "postgresql": [
+        """CREATE OR REPLACE FUNCTION products_registrar_cambio() RETURNS trigger AS $$
+        BEGIN
+            -- Trigger diferido: corre al confirmar. El lock hace que los cursores
+            -- se asignen en el orden de los commits
+            PERFORM pg_advisory_xact_lock(hashtext('product_changes'));
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO product_changes (product_id, eliminado) VALUES (OLD.id, true);
+            ELSE
+                INSERT INTO product_changes (product_id, eliminado) VALUES (NEW.id, false);
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql""",
+        """CREATE CONSTRAINT TRIGGER products_changes AFTER INSERT OR UPDATE OR DELETE ON products
+            DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION products_registrar_cambio()""",
+    ],
+    "sqlite": [
+        """CREATE TRIGGER products_changes_ai AFTER INSERT ON products BEGIN
+            INSERT INTO product_changes (product_id, eliminado) VALUES (new.id, 0);
+        END""",
+        """CREATE TRIGGER products_changes_au AFTER UPDATE ON products BEGIN
+            INSERT INTO product_changes (product_id, eliminado) VALUES (new.id, 0);
+        END""",
+        """CREATE TRIGGER products_changes_ad AFTER DELETE ON products BEGIN
+            INSERT INTO product_changes (product_id, eliminado) VALUES (old.id, 1);
+        END""",
+    ],
+}
+
+for _dialecto, _sentencias in (*_FTS_DDL.items(), *_CAMBIOS_DDL.items()):
+    for _sentencia in _sentencias:
+        event.listen(ProductDB.__table__, "after_create", DDL(_sentencia).execute_if(dialect=_dialecto))
+event.listen(ProductDB.__table__, "before_drop", DDL("DROP TABLE IF EXISTS products_fts").execute_if(dialect="sqlite"))
 
 # Función para obtener sesión de base de datos
 def get_db():
@@ -45,3 +232,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """Dependency para obtener sesión async de base de datos"""
+    async with get_async_sessionmaker()() as db:
+        yield db
@@ -0,0 +1,258 @@
+"""Estadísticas por categoría mantenidas de forma incremental.
+
+La tabla ``categoria_stats`` guarda, por categoría, la cantidad de productos,
+las unidades en stock, el valor del inventario (``precio * stock``), la suma
+de precios y los precios mínimo y máximo. Cada escritura acumula sus cambios
+en un ``DeltaCategorias`` y los aplica en su misma transacción con un upsert
+por categoría, así leer las estadísticas cuesta O(categorías) y no
+O(productos).
+
+El mínimo y el máximo no se pueden "restar": si se quita un precio igual al
+extremo guardado, ese extremo se recalcula consultando la categoría.
+
+Costo: las escrituras de una categoría actualizan la misma fila de
+``categoria_stats`` y esperan el lock de esa fila hasta el commit, así que los
+ajustes de stock de una categoría se serializan entre sí. Para productos con
+muchos ajustes por segundo está el write-behind de app/stock_caliente.py, que
+aplica un solo delta por categoría en cada volcado. Las filas se actualizan en
+orden de categoría para que dos transacciones no se bloqueen mutuamente.
+
+En dialectos sin ``INSERT ... ON CONFLICT`` no se actualiza la tabla en cada
+escritura (se registra una advertencia) y hay que reconstruirla.
+
+Reconstrucción completa (para reparar la tabla):
+
+    python -m app.estadisticas
+"""
+import logging
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.db import CategoriaStatsDB, ProductDB, SessionLocal
+from app.models import CategoriaStats
+
+logger = logging.getLogger(__name__)
+
+# INSERT ... ON CONFLICT DO UPDATE de cada dialecto soportado
+_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+def _decimal(valor) -> Decimal:
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor))
+
+def _menor(a: Optional[Decimal], b: Optional[Decimal]) -> Optional[Decimal]:
+    return b if a is None else a if b is None else min(a, b)
+
+def _mayor(a: Optional[Decimal], b: Optional[Decimal]) -> Optional[Decimal]:
+    return b if a is None else a if b is None else max(a, b)
+
+
+class _Delta:
+    """Cambios acumulados de una categoría"""
+
+    __slots__ = ("productos", "unidades", "valor", "suma_precios",
+                 "precio_min", "precio_max", "min_quitado", "max_quitado")
+
+    def __init__(self):
+        self.productos = 0
+        self.unidades = 0
+        self.valor = Decimal(0)
+        self.suma_precios = Decimal(0)
+        # Extremos de los precios agregados y de los quitados
+        self.precio_min: Optional[Decimal] = None
+        self.precio_max: Optional[Decimal] = None
+        self.min_quitado: Optional[Decimal] = None
+        self.max_quitado: Optional[Decimal] = None
+
+
+class DeltaCategorias:
+    """Acumula los cambios de una transacción por categoría.
+
+    Ejemplo::
+
+        DeltaCategorias().alta("Audio", 50, 3).aplicar(db)
+    """
+
+    def __init__(self):
+        self._deltas: dict[str, _Delta] = {}
+
+    def _delta(self, categoria: str) -> _Delta:
+        return self._deltas.setdefault(categoria, _Delta())
+
+    def alta(self, categoria: str, precio, stock: int) -> "DeltaCategorias":
+        """Un producto entra a la categoría"""
+        precio = _decimal(precio)
+        d = self._delta(categoria)
+        d.productos += 1
+        d.unidades += stock
+        d.valor += precio * stock
+        d.suma_precios += precio
+        d.precio_min = _menor(d.precio_min, precio)
+        d.precio_max = _mayor(d.precio_max, precio)
+        return self
+
+    def baja(self, categoria: str, precio, stock: int) -> "DeltaCategorias":
+        """Un producto sale de la categoría (borrado o cambio de categoría/precio)"""
+        precio = _decimal(precio)
+        d = self._delta(categoria)
+        d.productos -= 1
+        d.unidades -= stock
+        d.valor -= precio * stock
+        d.suma_precios -= precio
+        d.min_quitado = _menor(d.min_quitado, precio)
+        d.max_quitado = _mayor(d.max_quitado, precio)
+        return self
+
+    def ajuste_stock(self, categoria: str, precio, cantidad: int) -> "DeltaCategorias":
+        """El stock de un producto cambia en ``cantidad`` unidades"""
+        d = self._delta(categoria)
+        d.unidades += cantidad
+        d.valor += _decimal(precio) * cantidad
+        return self
+
+    def sentencias(self, dialecto: str) -> list:
+        """Sentencias que aplican los cambios (deben ir después de escribir ``products``).
+
+        Sin upsert en el dialecto no devuelve ninguna: la escritura sigue y la
+        tabla se corrige con ``reconstruir``.
+        """
+        if dialecto not in _INSERTS:
+            logger.warning(
+                "Estadísticas incrementales no soportadas en '%s': ejecutar python -m app.estadisticas", dialecto
+            )
+            return []
+        sentencias = []
+        # Siempre en el mismo orden: dos escrituras que tocan las mismas categorías no se bloquean en cruz
+        for categoria, d in sorted(self._deltas.items()):
+            sentencias.append(_upsert(_INSERTS[dialecto], categoria, d))
+            if d.min_quitado is not None:
+                sentencias.append(_recalcular_extremo(categoria, CategoriaStatsDB.precio_min, func.min,
+                                                      CategoriaStatsDB.precio_min >= d.min_quitado))
+                sentencias.append(_recalcular_extremo(categoria, CategoriaStatsDB.precio_max, func.max,
+                                                      CategoriaStatsDB.precio_max <= d.max_quitado))
+        if any(d.productos < 0 for d in self._deltas.values()):
+            sentencias.append(
+                delete(CategoriaStatsDB)
+                .where(CategoriaStatsDB.categoria.in_(self._deltas), CategoriaStatsDB.productos <= 0)
+            )
+        return sentencias
+
+    def aplicar(self, db: Session):
+        """Aplicar los cambios en la transacción de la sesión (sin commit)"""
+        for stmt in self.sentencias(db.get_bind().dialect.name):
+            db.execute(stmt)
+
+    async def aplicar_async(self, db: AsyncSession):
+        """Versión async de ``aplicar``"""
+        for stmt in self.sentencias(db.get_bind().dialect.name):
+            await db.execute(stmt)
+
+
+def _upsert(insert_dialecto, categoria: str, d: _Delta):
+    """Sumar el delta a la fila de la categoría (creándola si no existe)"""
+    stmt = insert_dialecto(CategoriaStatsDB).values(
+        categoria=categoria,
+        productos=d.productos,
+        unidades=d.unidades,
+        valor_inventario=d.valor,
+        suma_precios=d.suma_precios,
+        precio_min=d.precio_min,
+        precio_max=d.precio_max,
+    )
+    nuevo = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=[CategoriaStatsDB.categoria],
+        set_={
+            "productos": CategoriaStatsDB.productos + nuevo.productos,
+            "unidades": CategoriaStatsDB.unidades + nuevo.unidades,
+            "valor_inventario": CategoriaStatsDB.valor_inventario + nuevo.valor_inventario,
+            "suma_precios": CategoriaStatsDB.suma_precios + nuevo.suma_precios,
+            "precio_min": case(
+                (nuevo.precio_min.is_(None), CategoriaStatsDB.precio_min),
+                (CategoriaStatsDB.precio_min.is_(None), nuevo.precio_min),
+                (nuevo.precio_min < CategoriaStatsDB.precio_min, nuevo.precio_min),
+                else_=CategoriaStatsDB.precio_min,
+            ),
+            "precio_max": case(
+                (nuevo.precio_max.is_(None), CategoriaStatsDB.precio_max),
+                (CategoriaStatsDB.precio_max.is_(None), nuevo.precio_max),
+                (nuevo.precio_max > CategoriaStatsDB.precio_max, nuevo.precio_max),
+                else_=CategoriaStatsDB.precio_max,
+            ),
+        },
+    )
+
+def _recalcular_extremo(categoria: str, columna, agregado, condicion):
+    """Recalcular el mínimo o el máximo solo si se quitó el valor guardado"""
+    # lower(categoria) permite usar ix_products_categoria_lower
+    valor = (
+        select(agregado(ProductDB.precio))
+        .where(func.lower(ProductDB.categoria) == func.lower(categoria), ProductDB.categoria == categoria)
+        .scalar_subquery()
+    )
+    return (
+        update(CategoriaStatsDB)
+        .where(CategoriaStatsDB.categoria == categoria, condicion)
+        .values({columna: valor})
+    )
+
+def reconstruir(db: Session) -> int:
+    """Recalcular toda la tabla desde ``products`` en una transacción.
+
+    Returns:
+        Cantidad de categorías
+    """
+    db.execute(delete(CategoriaStatsDB))
+    db.execute(insert(CategoriaStatsDB).from_select(
+        ["categoria", "productos", "unidades", "valor_inventario", "suma_precios", "precio_min", "precio_max"],
+        select(
+            ProductDB.categoria,
+            func.count(),
+            func.coalesce(func.sum(ProductDB.stock), 0),
+            func.coalesce(func.sum(ProductDB.precio * ProductDB.stock), 0),
+            func.coalesce(func.sum(ProductDB.precio), 0),
+            func.min(ProductDB.precio),
+            func.max(ProductDB.precio),
+        ).group_by(ProductDB.categoria),
+    ))
+    db.commit()
+    return db.scalar(select(func.count()).select_from(CategoriaStatsDB))
+
+def consulta_estadisticas():
+    """SELECT de todas las categorías ordenadas por nombre"""
+    return select(CategoriaStatsDB).order_by(CategoriaStatsDB.categoria)
+
+def a_respuesta(stats: CategoriaStatsDB) -> CategoriaStats:
+    """Convertir una fila del resumen al modelo de respuesta (con el promedio)"""
+    return CategoriaStats(
+        categoria=stats.categoria,
+        productos=stats.productos,
+        unidades=stats.unidades,
+        valor_inventario=stats.valor_inventario,
+        precio_min=stats.precio_min,
+        precio_max=stats.precio_max,
+        precio_promedio=stats.suma_precios / stats.productos if stats.productos else None,
+    )
+
+def obtener_estadisticas(db: Session) -> list[CategoriaStats]:
+    """Estadísticas de todas las categorías"""
+    return [a_respuesta(stats) for stats in db.scalars(consulta_estadisticas())]
+
+
+def main():
+    db = SessionLocal()
+    try:
+        categorias = reconstruir(db)
+    finally:
+        db.close()
+    print(f"✓ Estadísticas reconstruidas: {categorias} categorías")
+
+
+if __name__ == "__main__":
+    main()
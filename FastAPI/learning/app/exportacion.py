@@ -0,0 +1,154 @@
+"""Trabajos de exportación del catálogo a archivos CSV/NDJSON comprimidos.
+
+Cada trabajo corre en un pool de hilos local, lee ``products`` con un cursor
+del servidor (``stream_results``) y escribe las filas a un archivo gzip en
+disco, así los volcados grandes no compiten en memoria ni en hilos con las
+peticiones interactivas.
+"""
+import csv
+import gzip
+import json
+import os
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db import ProductDB
+from app.models import ExportacionRequest, ExportacionResponse
+from app.services import filtro_categoria
+
+EXPORT_DIR = Path(os.getenv("EXPORT_DIR", Path(tempfile.gettempdir()) / "exportaciones_productos"))
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+# Trabajos terminados que se conservan (los más viejos se borran junto con su archivo)
+MAX_TRABAJOS = 50
+CHUNK_SIZE = 1000
+
+COLUMNAS = ["id", "nombre", "descripcion", "precio", "categoria", "stock", "created_at", "updated_at"]
+
+
+class TrabajoExportacion:
+    """Estado en memoria de un trabajo de exportación"""
+
+    def __init__(self, parametros: ExportacionRequest):
+        self.id = uuid.uuid4().hex
+        self.parametros = parametros
+        self.estado = "pendiente"
+        self.filas_exportadas = 0
+        self.total_filas: Optional[int] = None
+        self.error: Optional[str] = None
+        self.creado_en = datetime.now(timezone.utc)
+        self.terminado_en: Optional[datetime] = None
+        self.archivo = EXPORT_DIR / f"productos-{self.id}.{parametros.formato}.gz"
+
+    def respuesta(self) -> ExportacionResponse:
+        progreso = 0.0
+        if self.estado == "completado":
+            progreso = 1.0
+        elif self.total_filas:
+            progreso = min(self.filas_exportadas / self.total_filas, 1.0)
+        return ExportacionResponse(
+            id=self.id,
+            estado=self.estado,
+            formato=self.parametros.formato,
+            filas_exportadas=self.filas_exportadas,
+            total_filas=self.total_filas,
+            progreso=progreso,
+            error=self.error,
+            creado_en=self.creado_en,
+            terminado_en=self.terminado_en,
+        )
+
+
+_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="exportacion")
+_trabajos: dict[str, TrabajoExportacion] = {}
+_lock = threading.Lock()
+
+
+def _consulta(parametros: ExportacionRequest):
+    """Construir el SELECT de columnas con los filtros del trabajo"""
+    stmt = select(*(getattr(ProductDB, columna) for columna in COLUMNAS))
+    if parametros.categoria is not None:
+        stmt = stmt.where(filtro_categoria(parametros.categoria))
+    if parametros.min_price is not None:
+        stmt = stmt.where(ProductDB.precio >= parametros.min_price)
+    if parametros.max_price is not None:
+        stmt = stmt.where(ProductDB.precio <= parametros.max_price)
+    return stmt
+
+def _valor_json(valor):
+    """Convertir Decimal y datetime a tipos JSON"""
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if valor is not None and not isinstance(valor, (str, int)):
+        return float(valor)
+    return valor
+
+def _ejecutar(trabajo: TrabajoExportacion, session_factory: Callable[[], Session]):
+    """Escribir el archivo del trabajo (corre en un hilo del pool)"""
+    trabajo.estado = "en_progreso"
+    temporal = trabajo.archivo.with_suffix(".tmp")
+    try:
+        EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+        stmt = _consulta(trabajo.parametros)
+        with session_factory() as db:
+            trabajo.total_filas = db.scalar(select(func.count()).select_from(stmt.subquery()))
+            filas = db.execute(
+                stmt.order_by(ProductDB.id),
+                execution_options={"stream_results": True, "yield_per": CHUNK_SIZE},
+            )
+            with gzip.open(temporal, "wt", encoding="utf-8", newline="") as salida:
+                writer = csv.writer(salida) if trabajo.parametros.formato == "csv" else None
+                if writer:
+                    writer.writerow(COLUMNAS)
+                for fila in filas:
+                    if writer:
+                        writer.writerow(fila)
+                    else:
+                        salida.write(json.dumps(
+                            {columna: _valor_json(valor) for columna, valor in zip(COLUMNAS, fila)},
+                            ensure_ascii=False,
+                        ) + "\n")
+                    trabajo.filas_exportadas += 1
+        os.replace(temporal, trabajo.archivo)
+        trabajo.estado = "completado"
+    except Exception as e:
+        temporal.unlink(missing_ok=True)
+        trabajo.estado = "error"
+        trabajo.error = str(e)
+    finally:
+        trabajo.terminado_en = datetime.now(timezone.utc)
+
+def _descartar_viejos():
+    """Olvidar los trabajos terminados más viejos y borrar sus archivos"""
+    terminados = [t for t in _trabajos.values() if t.estado in ("completado", "error")]
+    for trabajo in sorted(terminados, key=lambda t: t.creado_en)[:max(len(_trabajos) - MAX_TRABAJOS, 0)]:
+        del _trabajos[trabajo.id]
+        trabajo.archivo.unlink(missing_ok=True)
+
+def iniciar_exportacion(parametros: ExportacionRequest, session_factory: Callable[[], Session]) -> TrabajoExportacion:
+    """Registrar un trabajo de exportación y encolarlo en el pool.
+
+    Args:
+        parametros: Formato y filtros de la exportación
+        session_factory: Fábrica de sesiones que usará el hilo del trabajo
+
+    Returns:
+        El trabajo en estado "pendiente"
+    """
+    trabajo = TrabajoExportacion(parametros)
+    with _lock:
+        _descartar_viejos()
+        _trabajos[trabajo.id] = trabajo
+    _executor.submit(_ejecutar, trabajo, session_factory)
+    return trabajo
+
+def obtener_trabajo(id: str) -> Optional[TrabajoExportacion]:
+    """Buscar un trabajo de exportación por su ID"""
+    return _trabajos.get(id)
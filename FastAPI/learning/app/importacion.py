@@ -0,0 +1,270 @@
+"""Importación masiva de productos desde NDJSON o CSV.
+
+Las filas se leen como stream, se validan con el modelo ``Product`` en lotes
+y cada lote se inserta con un solo ``executemany`` y un solo commit. Una fila
+inválida se reporta sin abortar el resto de la carga.
+
+Uso desde la línea de comandos:
+
+    python -m app.importacion catalogo.ndjson
+    python -m app.importacion catalogo.csv --formato csv --upsert
+"""
+import argparse
+import csv
+import json
+import sys
+from typing import Any, Iterable, Iterator, Literal, Optional, TextIO
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app import cache
+from app.autocompletar import indice as indice_autocompletar
+from app.db import ProductDB, SessionLocal
+from app.estadisticas import DeltaCategorias
+from app.models import ImportacionResponse, Product
+from app.stock_caliente import registro as registro_stock_caliente
+
+Formato = Literal["ndjson", "csv"]
+
+BATCH_SIZE = 1000
+# Cantidad máxima de errores detallados en el resumen
+MAX_ERRORES = 100
+
+
+def _filas_ndjson(archivo: TextIO) -> Iterator[tuple[int, Any]]:
+    """Leer un objeto JSON por línea (las líneas vacías se ignoran)"""
+    for numero, linea in enumerate(archivo, start=1):
+        if not linea.strip():
+            continue
+        try:
+            yield numero, json.loads(linea)
+        except json.JSONDecodeError as e:
+            yield numero, ValueError(f"JSON inválido: {e.msg}")
+
+def _filas_csv(archivo: TextIO) -> Iterator[tuple[int, Any]]:
+    """Leer filas CSV con encabezado; las celdas vacías se toman como None"""
+    reader = csv.DictReader(archivo)
+    for fila in reader:
+        yield reader.line_num, {k: (v if v != "" else None) for k, v in fila.items()}
+
+def leer_filas(archivo: TextIO, formato: Formato) -> Iterator[tuple[int, Any]]:
+    """Leer las filas del archivo como pares (número de línea, datos)"""
+    if formato == "csv":
+        return _filas_csv(archivo)
+    return _filas_ndjson(archivo)
+
+def _mensaje_validacion(error: ValidationError) -> str:
+    """Resumir un error de pydantic en una línea"""
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in e['loc']) or 'fila'}: {e['msg']}" for e in error.errors()
+    )
+
+
+class _Resumen:
+    """Acumula los contadores y errores de una importación"""
+
+    def __init__(self):
+        self.insertados = 0
+        self.actualizados = 0
+        self.total_errores = 0
+        self.errores: list[dict] = []
+
+    def error(self, fila: int, mensaje: str):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append({"fila": fila, "error": mensaje})
+
+    def respuesta(self) -> ImportacionResponse:
+        return ImportacionResponse(
+            insertados=self.insertados,
+            actualizados=self.actualizados,
+            total_errores=self.total_errores,
+            errores=self.errores,
+        )
+
+
+def _guardar_lote(db: Session, lote: list[tuple[int, Product]], upsert: bool) -> tuple[int, int]:
+    """Insertar (o actualizar por nombre) un lote ya validado en una transacción.
+
+    Returns:
+        (insertados, actualizados)
+    """
+    # Con upsert los nombres se comparan sin distinguir mayúsculas (ix_products_nombre_lower)
+    existentes: dict[str, tuple[int, str]] = {}
+    if upsert:
+        nombres = {product.nombre.lower() for _, product in lote}
+        filas = db.execute(
+            select(ProductDB.id, ProductDB.nombre)
+            .where(func.lower(ProductDB.nombre).in_(nombres))
+            .order_by(ProductDB.id.desc())
+        )
+        # Si hay nombres repetidos en la tabla se actualiza el de menor ID
+        existentes = {nombre.lower(): (id, nombre) for id, nombre in filas}
+
+    # Sin upsert la clave es la posición; con upsert, el nombre en minúsculas
+    nuevos: dict = {}
+    cambios: dict[int, dict] = {}
+    # Filas actualizadas cuyo nombre cambia de mayúsculas: el índice de autocompletar las renombra
+    renombrados: dict[int, str] = {}
+    actualizados = 0
+    for _, product in lote:
+        valores = product.model_dump()
+        clave = product.nombre.lower()
+        if not upsert:
+            nuevos[len(nuevos)] = valores
+        elif clave in existentes:
+            id, nombre = existentes[clave]
+            cambios[id] = {"id": id, **valores}
+            if product.nombre != nombre:
+                renombrados[id] = product.nombre
+            else:
+                renombrados.pop(id, None)
+            actualizados += 1
+        else:
+            if clave in nuevos:
+                actualizados += 1
+            nuevos[clave] = valores
+
+    # Categorías afectadas (nuevas y anteriores) para invalidar los listados
+    categorias = {product.categoria for _, product in lote}
+    # Los productos calientes vuelcan su stock pendiente antes de reemplazarlo: los
+    # valores previos y la versión se leen después del volcado, que los cambia
+    with registro_stock_caliente.excluir(cambios):
+        # (categoria, precio, stock) previos de las filas que se actualizan
+        anteriores: dict[int, tuple] = {}
+        if cambios:
+            filas = db.execute(
+                select(ProductDB.id, ProductDB.categoria, ProductDB.precio, ProductDB.stock, ProductDB.version)
+                .where(ProductDB.id.in_(cambios))
+            )
+            for id, categoria, precio, stock, version in filas:
+                anteriores[id] = (categoria, precio, stock)
+                # El UPDATE del ORM verifica la versión leída y la incrementa
+                cambios[id]["version"] = version
+                categorias.add(categoria)
+            # Borrados entre las dos lecturas: se insertan como nuevos
+            for id in set(cambios) - set(anteriores):
+                valores = cambios.pop(id)
+                del valores["id"]
+                nuevos[valores["nombre"].lower()] = valores
+                renombrados.pop(id, None)
+                actualizados -= 1
+        if nuevos:
+            db.execute(insert(ProductDB), list(nuevos.values()))
+        if cambios:
+            db.execute(update(ProductDB), list(cambios.values()))
+
+        estadisticas = DeltaCategorias()
+        for valores in nuevos.values():
+            estadisticas.alta(valores["categoria"], valores["precio"], valores["stock"])
+        for id, valores in cambios.items():
+            estadisticas.baja(*anteriores[id])
+            estadisticas.alta(valores["categoria"], valores["precio"], valores["stock"])
+        estadisticas.aplicar(db)
+        db.commit()
+    for id in cambios:
+        cache.productos.delete(id)
+    for id, nombre in renombrados.items():
+        indice_autocompletar.agregar(id, nombre)
+    cache.generaciones.incrementar(categorias)
+    return len(nuevos), actualizados
+
+def _procesar_lote(db: Session, lote: list[tuple[int, Product]], upsert: bool, resumen: _Resumen):
+    """Guardar un lote; si la base de datos lo rechaza, reintentar fila por fila"""
+    try:
+        insertados, actualizados = _guardar_lote(db, lote, upsert)
+    except SQLAlchemyError:
+        db.rollback()
+        if len(lote) == 1:
+            resumen.error(lote[0][0], "La base de datos rechazó la fila")
+            return
+        for fila in lote:
+            _procesar_lote(db, [fila], upsert, resumen)
+        return
+    resumen.insertados += insertados
+    resumen.actualizados += actualizados
+
+def importar_productos(
+    db: Session,
+    filas: Iterable[tuple[int, Any]],
+    upsert: bool = False,
+    batch_size: int = BATCH_SIZE,
+) -> ImportacionResponse:
+    """Importar productos validando e insertando por lotes.
+
+    Args:
+        db: Sesión de base de datos
+        filas: Pares (número de línea, datos) como los de ``leer_filas``
+        upsert: Si es True, los productos con un nombre existente (sin distinguir
+            mayúsculas) se actualizan
+        batch_size: Filas por lote (un executemany y un commit por lote)
+
+    Los productos insertados aparecen en ``/productos/autocompletar`` al
+    terminar la importación.
+
+    Returns:
+        Resumen con insertados, actualizados y errores por fila
+    """
+    resumen = _Resumen()
+    lote: list[tuple[int, Product]] = []
+    try:
+        for numero, datos in filas:
+            if isinstance(datos, Exception):
+                resumen.error(numero, str(datos))
+                continue
+            try:
+                lote.append((numero, Product.model_validate(datos)))
+            except ValidationError as e:
+                resumen.error(numero, _mensaje_validacion(e))
+                continue
+            if len(lote) >= batch_size:
+                _procesar_lote(db, lote, upsert, resumen)
+                lote = []
+        if lote:
+            _procesar_lote(db, lote, upsert, resumen)
+    finally:
+        if resumen.insertados:
+            # Los IDs insertados no se conocen: el índice se reconstruye una sola vez, en
+            # la próxima búsqueda después de la carga (no una vez por lote)
+            indice_autocompletar.invalidar()
+    return resumen.respuesta()
+
+def importar_archivo(
+    db: Session,
+    archivo: TextIO,
+    formato: Formato = "ndjson",
+    upsert: bool = False,
+    batch_size: int = BATCH_SIZE,
+) -> ImportacionResponse:
+    """Importar productos desde un archivo de texto NDJSON o CSV"""
+    return importar_productos(db, leer_filas(archivo, formato), upsert, batch_size)
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Importar productos desde NDJSON o CSV")
+    parser.add_argument("archivo", help="Ruta del archivo ('-' para leer de stdin)")
+    parser.add_argument("--formato", choices=["ndjson", "csv"], help="Por defecto se deduce de la extensión")
+    parser.add_argument("--upsert", action="store_true", help="Actualizar productos con el mismo nombre (sin distinguir mayúsculas)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    formato = args.formato or ("csv" if args.archivo.endswith(".csv") else "ndjson")
+    archivo = sys.stdin if args.archivo == "-" else open(args.archivo, encoding="utf-8", newline="")
+    db = SessionLocal()
+    try:
+        resumen = importar_archivo(db, archivo, formato, args.upsert, args.batch_size)
+    finally:
+        db.close()
+        if archivo is not sys.stdin:
+            archivo.close()
+
+    print(f"✓ Insertados: {resumen.insertados} | Actualizados: {resumen.actualizados} | Errores: {resumen.total_errores}")
+    for error in resumen.errores:
+        print(f"  Línea {error.fila}: {error.error}")
+
+
+if __name__ == "__main__":
+    main()
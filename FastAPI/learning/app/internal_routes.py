@@ -0,0 +1,76 @@
+"""Endpoints internos de operación (caches, índices en memoria, pool, consultas lentas, stock caliente, réplicas)"""
+import os
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app import cache
+from app.coalescencia import coalescedor
+from app.autocompletar import indice as indice_autocompletar
+from app.consultas_lentas import registro as registro_consultas_lentas
+from app.metricas import registro as registro_metricas
+from app.db import engine
+from app.pool import metricas_pool
+from app.replicas import enrutador as enrutador_lecturas
+from app.stock_caliente import registro as registro_stock_caliente
+
+# Las rutas /internal no tienen autenticación y algunas modifican el estado del
+# proceso (stock caliente, consultas lentas): solo se montan con INTERNAL_ROUTES=True
+INTERNAL_ROUTES = os.getenv("INTERNAL_ROUTES", "False") == "True"
+
+router = APIRouter(prefix="/internal", tags=["internal"])
+# /metrics va en la raíz, donde lo busca Prometheus
+router_metricas = APIRouter(tags=["internal"])
+
+@router.get("/cache", response_model=dict)
+def estadisticas_cache():
+    """Contadores de las caches de productos y de listados (hits, misses, evictions)
+    y de las lecturas coalescidas"""
+    return {
+        "productos": cache.productos.stats(),
+        "respuestas": cache.respuestas.stats(),
+        "coalescencia": coalescedor.stats(),
+    }
+
+@router.get("/autocompletar", response_model=dict)
+def estadisticas_autocompletar():
+    """Tamaño y memoria estimada del índice de autocompletado"""
+    return indice_autocompletar.memoria()
+
+@router.get("/pool", response_model=dict)
+def estadisticas_pool():
+    """Conexiones en uso, overflow y tiempo de espera por una conexión del pool"""
+    return metricas_pool(engine)
+
+@router.get("/replicas", response_model=dict)
+def estadisticas_replicas():
+    """Réplicas de lectura, su salud y cuántas lecturas recibió cada una"""
+    return enrutador_lecturas.stats()
+
+@router.get("/consultas_lentas", response_model=dict)
+def consultas_lentas():
+    """Últimas consultas que superaron SLOW_QUERY_MS, con su plan de ejecución"""
+    return registro_consultas_lentas.listar()
+
+@router.delete("/consultas_lentas", status_code=204)
+def limpiar_consultas_lentas():
+    """Vaciar el buffer de consultas lentas y los planes capturados"""
+    registro_consultas_lentas.limpiar()
+
+@router.get("/stock_caliente", response_model=dict)
+def estadisticas_stock_caliente():
+    """Productos calientes, ajustes pendientes y duración de los volcados"""
+    return registro_stock_caliente.stats()
+
+@router.put("/stock_caliente/{id}", status_code=204)
+def designar_stock_caliente(id: int):
+    """Pasar los ajustes de stock del producto a write-behind"""
+    registro_stock_caliente.designar(id)
+
+@router.delete("/stock_caliente/{id}", status_code=204)
+def quitar_stock_caliente(id: int):
+    """Volcar lo pendiente y volver al ajuste directo en la base"""
+    registro_stock_caliente.quitar(id)
+
+@router_metricas.get("/metrics", response_class=PlainTextResponse)
+def metricas_prometheus():
+    """Latencia, códigos de estado y consultas SQL por ruta en formato de Prometheus"""
+    return PlainTextResponse(registro_metricas.prometheus(), media_type="text/plain; version=0.0.4")
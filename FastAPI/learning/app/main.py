@@ -1,5 +1,68 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import SQLAlchemyError
+from app.db import ASYNC_DB, DATABASE_URL, SessionLocal, engine
+from app.pool import calentar_pool, conexiones_calentamiento
+from app.autocompletar import indice as indice_autocompletar
+from app.internal_routes import INTERNAL_ROUTES, router as internal_router, router_metricas
+from app.metricas import MiddlewareMetricas
+from app.replicas import enrutador as enrutador_lecturas
 from app.routes import router
+from app.stock_caliente import HOT_STOCK_IDS, parsear_ids, registro as registro_stock_caliente
 
-app = FastAPI(title="API de Productos", version="1.0")
-app.include_router(router)
\ No newline at end of file
+logger = logging.getLogger(__name__)
+
+def _construir_autocompletar():
+    """Construir el índice de autocompletado al arrancar"""
+    db = SessionLocal()
+    try:
+        indice_autocompletar.asegurar_construido(db)
+    except SQLAlchemyError as e:
+        # Se reintenta en la primera búsqueda
+        logger.warning("No se pudo construir el índice de autocompletado: %s", e)
+    finally:
+        db.close()
+
+def _calentar_pool():
+    """Abrir DB_POOL_WARMUP conexiones antes de recibir tráfico"""
+    conexiones = conexiones_calentamiento(DATABASE_URL)
+    if not conexiones:
+        return
+    try:
+        calentar_pool(engine, conexiones)
+    except SQLAlchemyError as e:
+        logger.warning("No se pudo calentar el pool de conexiones: %s", e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(_calentar_pool)
+    await run_in_threadpool(_construir_autocompletar)
+    for id in parsear_ids(HOT_STOCK_IDS):
+        registro_stock_caliente.designar(id)
+    enrutador_lecturas.iniciar()
+    yield
+    enrutador_lecturas.detener()
+    # Volcar el stock pendiente de los productos calientes antes de salir
+    await run_in_threadpool(registro_stock_caliente.detener)
+
+def incluir_rutas(app: FastAPI, async_db: bool = ASYNC_DB):
+    """Montar las rutas de productos; ASYNC_DB=True sirve algunas escrituras con
+    AsyncSession (ver app/async_routes.py) sin quitar ningún endpoint"""
+    if async_db:
+        from app.async_routes import combinar_rutas
+        app.include_router(combinar_rutas(router))
+    else:
+        app.include_router(router)
+
+def incluir_rutas_internas(app: FastAPI, habilitadas: bool = INTERNAL_ROUTES):
+    """Montar /internal/* solo si INTERNAL_ROUTES=True (no tienen autenticación)"""
+    if habilitadas:
+        app.include_router(internal_router)
+
+app = FastAPI(title="API de Productos", version="1.0", lifespan=lifespan)
+incluir_rutas(app)
+incluir_rutas_internas(app)
+app.include_router(router_metricas)
+app.add_middleware(MiddlewareMetricas)
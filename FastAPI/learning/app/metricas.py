@@ -0,0 +1,210 @@
+"""Métricas de latencia por ruta y de consultas SQL por petición.
+
+``MiddlewareMetricas`` (middleware ASGI puro, sin ``BaseHTTPMiddleware``)
+mide cada petición HTTP y la registra con la plantilla de su ruta
+(``/productos/{id}``, no la URL concreta) para que la cantidad de series no
+crezca con los IDs. Los eventos de SQLAlchemy cuentan las sentencias y el
+tiempo en la base de datos de la petición en curso a través de una
+``ContextVar``, que FastAPI copia al hilo de las rutas síncronas.
+
+Los resultados se exponen en formato de texto de Prometheus (``/metrics``)
+y en el header ``Server-Timing`` de cada respuesta.
+"""
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Límites (en segundos) de los buckets de latencia
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Límites de los buckets de sentencias SQL por petición
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+SIN_RUTA = "sin_ruta"
+
+
+class MedicionPeticion:
+    """Sentencias SQL y tiempo en la base de datos de una petición"""
+
+    __slots__ = ("consultas", "tiempo_db", "scope")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.scope = scope
+
+    def ruta(self) -> str:
+        """Plantilla de la ruta (disponible una vez que el router la resolvió)"""
+        route = self.scope.get("route") if self.scope else None
+        return getattr(route, "path", None) or SIN_RUTA
+
+
+_peticion_actual: ContextVar[Optional[MedicionPeticion]] = ContextVar("peticion_actual", default=None)
+
+def medicion_actual() -> Optional[MedicionPeticion]:
+    """Medición de la petición en curso (None fuera de una petición)"""
+    return _peticion_actual.get()
+
+
+class Histograma:
+    """Histograma con buckets fijos (conteos no acumulados, suma y total)"""
+
+    __slots__ = ("limites", "conteos", "suma", "total")
+
+    def __init__(self, limites: tuple):
+        self.limites = limites
+        self.conteos = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.conteos[bisect.bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+    def acumulados(self) -> list[tuple[str, int]]:
+        """Pares (le, conteo acumulado) en el formato de Prometheus"""
+        acumulado = 0
+        pares = []
+        for limite, conteo in zip(self.limites + (float("inf"),), self.conteos):
+            acumulado += conteo
+            pares.append(("+Inf" if limite == float("inf") else repr(limite), acumulado))
+        return pares
+
+
+class RegistroMetricas:
+    """Métricas acumuladas por (método, ruta), seguras entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias: dict[tuple[str, str], Histograma] = {}
+        self.consultas: dict[tuple[str, str], Histograma] = {}
+        self.tiempo_db: dict[tuple[str, str], float] = {}
+        self.estados: dict[tuple[str, str, int], int] = {}
+
+    def registrar(self, metodo: str, ruta: str, estado: int, duracion: float, medicion: MedicionPeticion):
+        clave = (metodo, ruta)
+        with self._lock:
+            if clave not in self.latencias:
+                self.latencias[clave] = Histograma(BUCKETS_LATENCIA)
+                self.consultas[clave] = Histograma(BUCKETS_CONSULTAS)
+                self.tiempo_db[clave] = 0.0
+            self.latencias[clave].observar(duracion)
+            self.consultas[clave].observar(medicion.consultas)
+            self.tiempo_db[clave] += medicion.tiempo_db
+            self.estados[(metodo, ruta, estado)] = self.estados.get((metodo, ruta, estado), 0) + 1
+
+    def reiniciar(self):
+        with self._lock:
+            self.latencias.clear()
+            self.consultas.clear()
+            self.tiempo_db.clear()
+            self.estados.clear()
+
+    def prometheus(self) -> str:
+        """Todas las métricas en formato de texto de Prometheus"""
+        lineas = []
+        with self._lock:
+            lineas += _histograma_prometheus(
+                "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta", self.latencias
+            )
+            lineas += [
+                "# HELP http_requests_total Peticiones HTTP por ruta y código de estado",
+                "# TYPE http_requests_total counter",
+            ]
+            for (metodo, ruta, estado), total in sorted(self.estados.items()):
+                lineas.append(f'http_requests_total{{{_etiquetas(metodo, ruta)},status="{estado}"}} {total}')
+            lineas += _histograma_prometheus(
+                "http_request_db_statements", "Sentencias SQL por petición", self.consultas
+            )
+            lineas += [
+                "# HELP http_request_db_seconds_total Tiempo total en la base de datos por ruta",
+                "# TYPE http_request_db_seconds_total counter",
+            ]
+            for (metodo, ruta), total in sorted(self.tiempo_db.items()):
+                lineas.append(f"http_request_db_seconds_total{{{_etiquetas(metodo, ruta)}}} {total!r}")
+        return "\n".join(lineas) + "\n"
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _etiquetas(metodo: str, ruta: str) -> str:
+    return f'method="{_escapar(metodo)}",route="{_escapar(ruta)}"'
+
+def _histograma_prometheus(nombre: str, ayuda: str, histogramas: dict) -> list[str]:
+    lineas = [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} histogram"]
+    for (metodo, ruta), histograma in sorted(histogramas.items()):
+        etiquetas = _etiquetas(metodo, ruta)
+        for le, acumulado in histograma.acumulados():
+            lineas.append(f'{nombre}_bucket{{{etiquetas},le="{le}"}} {acumulado}')
+        lineas.append(f"{nombre}_sum{{{etiquetas}}} {histograma.suma!r}")
+        lineas.append(f"{nombre}_count{{{etiquetas}}} {histograma.total}")
+    return lineas
+
+
+registro = RegistroMetricas()
+
+
+def server_timing(medicion: MedicionPeticion, duracion: float) -> str:
+    """Valor del header Server-Timing (duraciones en milisegundos)"""
+    return (
+        f'db;dur={medicion.tiempo_db * 1000:.2f};desc="{medicion.consultas} consultas", '
+        f"app;dur={duracion * 1000:.2f}"
+    )
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI que mide cada petición HTTP.
+
+    El header ``Server-Timing`` se agrega al enviar los headers de la
+    respuesta; en las respuestas por streaming solo incluye el trabajo hecho
+    hasta ese momento (la métrica de ``/metrics`` sí incluye todo).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicion = MedicionPeticion(scope)
+        token = _peticion_actual.set(medicion)
+        inicio = time.perf_counter()
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+                valor = server_timing(medicion, time.perf_counter() - inicio).encode("latin-1")
+                mensaje["headers"] = list(mensaje.get("headers", [])) + [(b"server-timing", valor)]
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _peticion_actual.reset(token)
+            registro.registrar(scope["method"], medicion.ruta(), estado, time.perf_counter() - inicio, medicion)
+
+
+# Eventos de SQLAlchemy: aplican a todos los motores (también al de las rutas async)
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    if _peticion_actual.get() is not None:
+        conn.info["inicio_sentencia"] = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    medicion = _peticion_actual.get()
+    inicio = conn.info.pop("inicio_sentencia", None)
+    if medicion is None or inicio is None:
+        return
+    medicion.consultas += 1
+    medicion.tiempo_db += time.perf_counter() - inicio
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
 
 class Product(BaseModel):
@@ -41,4 +41,127 @@ class ProductResponse(BaseModel):
     categoria: str
     stock: int
     created_at: Optional[datetime] = None
-    updated_at: Optional[datetime] = None
\ No newline at end of file
+    updated_at: Optional[datetime] = None
+    version: int = 1
+
+class ProductoParcial(BaseModel):
+    """Producto de una respuesta con ``fields``: siempre trae ``id`` y solo los campos pedidos"""
+    id: int
+    nombre: Optional[str] = None
+    descripcion: Optional[str] = None
+    precio: Optional[float] = None
+    categoria: Optional[str] = None
+    stock: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    version: Optional[int] = None
+
+class StockDelta(BaseModel):
+    """Ajuste de stock de un producto dentro de una reserva por lote"""
+    id: int = Field(description="ID del producto")
+    quantity: int = Field(description="Cantidad a sumar (positivo) o restar (negativo)")
+
+
+class ReservaStockRequest(BaseModel):
+    """Lote de ajustes de stock que se aplican todos o ninguno"""
+    items: list[StockDelta] = Field(
+        min_length=1,
+        max_length=500,
+        description="Ajustes a aplicar en una sola transacción"
+    )
+
+
+class ReservaStockError(BaseModel):
+    """Motivo por el que un producto del lote no se pudo ajustar"""
+    id: int
+    quantity: int
+    error: Literal["no_encontrado", "stock_insuficiente"]
+    stock_disponible: Optional[int] = None
+
+
+class ReservaStockResponse(BaseModel):
+    """Resultado de una reserva por lote"""
+    aplicado: bool
+    productos: list[ProductResponse] = []
+    errores: list[ReservaStockError] = []
+
+
+class LoteProductosRequest(BaseModel):
+    """IDs a buscar en una sola petición"""
+    ids: list[int] = Field(min_length=1, max_length=10_000, description="IDs de productos (se admiten repetidos)")
+
+
+class LoteProductosResponse(BaseModel):
+    """Productos encontrados en el orden pedido"""
+    productos: list[Optional[ProductResponse]] = Field(description="Un elemento por ID pedido; null si no existe")
+    faltantes: list[int] = Field(description="IDs pedidos que no existen, sin repetir")
+
+
+class CambioProducto(BaseModel):
+    """Último cambio de un producto: su estado actual o un tombstone"""
+    cursor: int = Field(description="Posición del cambio en el feed")
+    id: int = Field(description="ID del producto")
+    eliminado: bool = False
+    producto: Optional[ProductResponse] = Field(default=None, description="Estado actual; null si fue eliminado")
+
+
+class CambiosResponse(BaseModel):
+    """Página del feed de cambios del catálogo"""
+    cambios: list[CambioProducto]
+    cursor: int = Field(description="Valor de since para pedir la página siguiente")
+    hay_mas: bool = Field(description="True si quedan cambios después de esta página")
+
+
+class ImportacionError(BaseModel):
+    """Fila del archivo importado que no se pudo cargar"""
+    fila: int = Field(description="Número de línea en el archivo")
+    error: str
+
+
+class ImportacionResponse(BaseModel):
+    """Resumen de una importación masiva de productos"""
+    insertados: int = 0
+    actualizados: int = 0
+    total_errores: int = 0
+    errores: list[ImportacionError] = Field(
+        default=[],
+        description="Primeros errores encontrados (ver total_errores)"
+    )
+
+
+class ExportacionRequest(BaseModel):
+    """Parámetros de un trabajo de exportación del catálogo"""
+    formato: Literal["ndjson", "csv"] = "ndjson"
+    categoria: Optional[str] = Field(default=None, description="Filtrar por categoría (case-insensitive)")
+    min_price: Optional[float] = Field(default=None, ge=0)
+    max_price: Optional[float] = Field(default=None, ge=0)
+
+
+class ExportacionResponse(BaseModel):
+    """Estado y progreso de un trabajo de exportación"""
+    id: str
+    estado: Literal["pendiente", "en_progreso", "completado", "error"]
+    formato: Literal["ndjson", "csv"]
+    filas_exportadas: int = 0
+    total_filas: Optional[int] = None
+    progreso: float = Field(default=0.0, description="Fracción exportada (0 a 1)")
+    error: Optional[str] = None
+    creado_en: datetime
+    terminado_en: Optional[datetime] = None
+
+
+class SugerenciaProducto(BaseModel):
+    """Producto sugerido por el autocompletado"""
+    id: int
+    nombre: str
+
+
+class CategoriaStats(BaseModel):
+    """Estadísticas agregadas de una categoría"""
+    categoria: str
+    productos: int
+    unidades: int = Field(description="Unidades totales en stock")
+    valor_inventario: float = Field(description="Suma de precio * stock")
+    precio_min: Optional[float] = None
+    precio_max: Optional[float] = None
+    precio_promedio: Optional[float] = None
@@ -0,0 +1,204 @@
+"""Configuración y métricas del pool de conexiones.
+
+Los parámetros del pool se leen de variables de entorno con valores por
+defecto según el dialecto de DATABASE_URL:
+
+    DB_POOL_SIZE            conexiones que se mantienen abiertas
+    DB_MAX_OVERFLOW         conexiones extra bajo carga (-1 sin límite)
+    DB_POOL_TIMEOUT         segundos de espera por una conexión libre
+    DB_POOL_RECYCLE         segundos antes de reabrir una conexión (-1 nunca)
+    DB_POOL_PRE_PING        True/False: verificar la conexión antes de usarla
+    DB_STATEMENT_TIMEOUT_MS tiempo máximo por sentencia (0 sin límite, solo PostgreSQL)
+    DB_POOL_WARMUP          conexiones que se abren al arrancar
+
+``PoolMedido`` registra cuánto espera cada checkout por una conexión; las
+esperas largas son la primera señal de un pool demasiado chico.
+"""
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import Engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Valores por defecto por dialecto. En SQLite no hay red: no hace falta
+# pre_ping ni reciclar conexiones
+DEFAULTS = {
+    "postgresql": {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30.0, "pool_recycle": 1800, "pool_pre_ping": True},
+    "sqlite": {"pool_size": 5, "max_overflow": 10, "pool_timeout": 30.0, "pool_recycle": -1, "pool_pre_ping": False},
+}
+DEFAULTS_OTROS = DEFAULTS["postgresql"]
+
+# Un checkout que espera más que esto cuenta como espera lenta
+ESPERA_LENTA = 0.010
+
+
+def _entero(nombre: str, defecto: int, minimo: int) -> int:
+    valor = os.getenv(nombre)
+    if valor is None:
+        return defecto
+    try:
+        numero = int(valor)
+    except ValueError:
+        raise ValueError(f"{nombre} debe ser un entero (recibido '{valor}')")
+    if numero < minimo:
+        raise ValueError(f"{nombre} debe ser mayor o igual a {minimo} (recibido {numero})")
+    return numero
+
+def _decimal(nombre: str, defecto: float) -> float:
+    valor = os.getenv(nombre)
+    if valor is None:
+        return defecto
+    try:
+        numero = float(valor)
+    except ValueError:
+        raise ValueError(f"{nombre} debe ser un número (recibido '{valor}')")
+    if numero <= 0:
+        raise ValueError(f"{nombre} debe ser mayor que 0 (recibido {numero})")
+    return numero
+
+def _booleano(nombre: str, defecto: bool) -> bool:
+    valor = os.getenv(nombre)
+    if valor is None:
+        return defecto
+    if valor not in ("True", "False"):
+        raise ValueError(f"{nombre} debe ser True o False (recibido '{valor}')")
+    return valor == "True"
+
+def _en_memoria(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def configuracion_pool(database_url: str) -> dict:
+    """Leer y validar la configuración del pool para el dialecto de la URL"""
+    url = make_url(database_url)
+    defaults = DEFAULTS.get(url.get_backend_name(), DEFAULTS_OTROS)
+    config = {
+        "pool_size": _entero("DB_POOL_SIZE", defaults["pool_size"], 1),
+        "max_overflow": _entero("DB_MAX_OVERFLOW", defaults["max_overflow"], -1),
+        "pool_timeout": _decimal("DB_POOL_TIMEOUT", defaults["pool_timeout"]),
+        "pool_recycle": _entero("DB_POOL_RECYCLE", defaults["pool_recycle"], -1),
+        "pool_pre_ping": _booleano("DB_POOL_PRE_PING", defaults["pool_pre_ping"]),
+        "statement_timeout_ms": _entero("DB_STATEMENT_TIMEOUT_MS", 0, 0),
+        "warmup": _entero("DB_POOL_WARMUP", 0, 0),
+    }
+    if config["max_overflow"] >= 0 and config["warmup"] > config["pool_size"] + config["max_overflow"]:
+        raise ValueError("DB_POOL_WARMUP no puede superar DB_POOL_SIZE + DB_MAX_OVERFLOW")
+    return config
+
+def argumentos_engine(database_url: str, async_engine: bool = False) -> dict:
+    """Argumentos de ``create_engine``/``create_async_engine`` según la configuración.
+
+    Las bases SQLite en memoria conservan el pool por defecto de SQLAlchemy
+    (una sola conexión compartida).
+    """
+    url = make_url(database_url)
+    if _en_memoria(url):
+        return {}
+    config = configuracion_pool(database_url)
+    argumentos = {
+        "pool_size": config["pool_size"],
+        "max_overflow": config["max_overflow"],
+        "pool_timeout": config["pool_timeout"],
+        "pool_recycle": config["pool_recycle"],
+        "pool_pre_ping": config["pool_pre_ping"],
+    }
+    if not async_engine:
+        argumentos["poolclass"] = PoolMedido
+    elif url.get_backend_name() == "sqlite":
+        # aiosqlite usa NullPool por defecto, que no acepta los argumentos del pool
+        argumentos["poolclass"] = AsyncAdaptedQueuePool
+    if config["statement_timeout_ms"] and url.get_backend_name() == "postgresql":
+        if async_engine:
+            argumentos["connect_args"] = {"server_settings": {"statement_timeout": str(config["statement_timeout_ms"])}}
+        else:
+            argumentos["connect_args"] = {"options": f"-c statement_timeout={config['statement_timeout_ms']}"}
+    return argumentos
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que mide la espera de cada checkout"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_metricas = threading.Lock()
+        self.checkouts = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.esperas_lentas = 0
+        self.timeouts = 0
+
+    def recreate(self):
+        # dispose() y pool_recycle crean un pool nuevo; las métricas siguen en el nuevo
+        nuevo = super().recreate()
+        with self._lock_metricas:
+            nuevo.checkouts = self.checkouts
+            nuevo.espera_total = self.espera_total
+            nuevo.espera_maxima = self.espera_maxima
+            nuevo.esperas_lentas = self.esperas_lentas
+            nuevo.timeouts = self.timeouts
+        return nuevo
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except PoolTimeoutError:
+            with self._lock_metricas:
+                self.timeouts += 1
+            raise
+        espera = time.perf_counter() - inicio
+        with self._lock_metricas:
+            self.checkouts += 1
+            self.espera_total += espera
+            self.espera_maxima = max(self.espera_maxima, espera)
+            if espera >= ESPERA_LENTA:
+                self.esperas_lentas += 1
+        return conexion
+
+    def metricas(self) -> dict:
+        with self._lock_metricas:
+            return {
+                "tamano": self.size(),
+                "en_uso": self.checkedout(),
+                "libres": self.checkedin(),
+                "overflow": max(self.overflow(), 0),
+                "max_overflow": self._max_overflow,
+                "timeout": self._timeout,
+                "checkouts": self.checkouts,
+                "espera_promedio_ms": self.espera_total / self.checkouts * 1000 if self.checkouts else 0.0,
+                "espera_maxima_ms": self.espera_maxima * 1000,
+                "esperas_lentas": self.esperas_lentas,
+                "timeouts": self.timeouts,
+            }
+
+
+def metricas_pool(engine: Engine) -> dict:
+    """Métricas del pool del motor (solo conteos básicos si no es un ``PoolMedido``)"""
+    pool = engine.pool
+    if isinstance(pool, PoolMedido):
+        return pool.metricas()
+    return {"clase": type(pool).__name__, "estado": pool.status()}
+
+def calentar_pool(engine: Engine, conexiones: int) -> int:
+    """Abrir ``conexiones`` conexiones a la vez y devolverlas al pool.
+
+    Returns:
+        Cantidad de conexiones abiertas
+    """
+    abiertas = []
+    try:
+        for _ in range(conexiones):
+            abiertas.append(engine.connect())
+    finally:
+        for conexion in abiertas:
+            conexion.close()
+    return len(abiertas)
+
+def conexiones_calentamiento(database_url: Optional[str]) -> int:
+    """Valor de DB_POOL_WARMUP (0 para bases en memoria)"""
+    if not database_url or _en_memoria(make_url(database_url)):
+        return 0
+    return configuracion_pool(database_url)["warmup"]
@@ -0,0 +1,228 @@
+"""Lecturas en réplicas con read-your-writes.
+
+Opcional: se activa con ``DATABASE_REPLICA_URLS`` (URLs separadas por coma).
+Las rutas GET piden la sesión con ``get_db_lectura``, que toma una réplica
+sana por round-robin; las escrituras usan ``get_db_escritura`` y siempre van
+a la primaria. Sin réplicas configuradas (o si ninguna está sana) las
+lecturas también van a la primaria.
+
+- Salud: un hilo ejecuta ``SELECT 1`` en cada réplica cada
+  ``REPLICA_HEALTH_INTERVAL`` segundos. Una réplica que falla (en el chequeo o
+  durante una petición) deja de recibir lecturas hasta que vuelva a responder.
+  Solo se comprueba la conexión, no el retraso de la replicación.
+- Read-your-writes: después de una escritura la respuesta lleva la cookie
+  ``read_primary_until`` y durante ``READ_YOUR_WRITES_SECONDS`` las lecturas
+  de ese cliente van a la primaria. Un cliente sin cookies puede mandar
+  ``X-Read-Primary: 1`` en la petición.
+- Caches: en esa misma ventana lo leído en una réplica no se guarda en las
+  caches compartidas (ver ``cacheable``), para que una réplica atrasada no
+  vuelva a llenarlas con datos anteriores a la escritura.
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Iterable, Optional
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.db import DEBUG, SessionLocal, get_db
+from app.pool import argumentos_engine
+
+logger = logging.getLogger(__name__)
+
+DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS", "")
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+COOKIE_PRIMARIA = "read_primary_until"
+HEADER_PRIMARIA = "X-Read-Primary"
+
+
+def parsear_urls(valor: str) -> list[str]:
+    """URLs separadas por coma (formato de DATABASE_REPLICA_URLS)"""
+    return [url.strip() for url in valor.split(",") if url.strip()]
+
+
+class _Replica:
+    """Motor de una réplica y su estado de salud"""
+
+    __slots__ = ("engine", "sana", "lecturas", "fallos")
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.sana = True
+        self.lecturas = 0
+        self.fallos = 0
+
+
+class EnrutadorLecturas:
+    """Réplicas de lectura, round-robin entre las sanas y el hilo que las verifica"""
+
+    def __init__(self, intervalo: float = 5, ventana: float = 5):
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._replicas: list[_Replica] = []
+        self._turno = itertools.count()
+        self.intervalo = intervalo
+        self.ventana = ventana
+        # time.monotonic() de la última escritura en este proceso
+        self._ultima_escritura = float("-inf")
+        self.lecturas_primaria = 0
+
+    @property
+    def habilitado(self) -> bool:
+        return bool(self._replicas)
+
+    def configurar(self, urls: Iterable[str]):
+        """Reemplazar las réplicas (lista vacía = todas las lecturas a la primaria)"""
+        replicas = [
+            _Replica(create_engine(url, echo=DEBUG, **argumentos_engine(url))) for url in urls
+        ]
+        with self._lock:
+            anteriores, self._replicas = self._replicas, replicas
+            self._turno = itertools.count()
+            self.lecturas_primaria = 0
+        for replica in anteriores:
+            replica.engine.dispose()
+
+    def elegir(self) -> Optional[Engine]:
+        """Siguiente réplica sana, o None si hay que leer de la primaria"""
+        with self._lock:
+            sanas = [replica for replica in self._replicas if replica.sana]
+            if not sanas:
+                self.lecturas_primaria += 1
+                return None
+            replica = sanas[next(self._turno) % len(sanas)]
+            replica.lecturas += 1
+            return replica.engine
+
+    def contar_primaria(self):
+        with self._lock:
+            self.lecturas_primaria += 1
+
+    def marcar_caida(self, engine: Engine):
+        """Sacar la réplica de la rotación hasta el próximo chequeo que responda"""
+        with self._lock:
+            for replica in self._replicas:
+                if replica.engine is engine and replica.sana:
+                    replica.sana = False
+                    replica.fallos += 1
+                    logger.warning("Réplica %s marcada como caída", engine.url.render_as_string(hide_password=True))
+
+    def verificar(self):
+        """Ejecutar ``SELECT 1`` en cada réplica y actualizar su estado"""
+        with self._lock:
+            replicas = list(self._replicas)
+        for replica in replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+            except SQLAlchemyError:
+                self.marcar_caida(replica.engine)
+            else:
+                with self._lock:
+                    replica.sana = True
+
+    def iniciar(self):
+        """Arrancar el hilo de chequeo de salud (no hace nada sin réplicas)"""
+        if not self._replicas or (self._hilo is not None and self._hilo.is_alive()):
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="replicas", daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            self.verificar()
+
+    def detener(self):
+        self._detener.set()
+        hilo = self._hilo
+        if hilo is not None:
+            hilo.join()
+        self._hilo = None
+
+    def registrar_escritura(self):
+        self._ultima_escritura = time.monotonic()
+
+    def escritura_reciente(self) -> bool:
+        """True si este proceso escribió dentro de la ventana de read-your-writes"""
+        return time.monotonic() - self._ultima_escritura < self.ventana
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "habilitado": bool(self._replicas),
+                "intervalo_chequeo": self.intervalo,
+                "ventana_read_your_writes": self.ventana,
+                "lecturas_primaria": self.lecturas_primaria,
+                "replicas": [
+                    {
+                        "url": replica.engine.url.render_as_string(hide_password=True),
+                        "sana": replica.sana,
+                        "lecturas": replica.lecturas,
+                        "fallos": replica.fallos,
+                    }
+                    for replica in self._replicas
+                ],
+            }
+
+
+enrutador = EnrutadorLecturas(REPLICA_HEALTH_INTERVAL, READ_YOUR_WRITES_SECONDS)
+enrutador.configurar(parsear_urls(DATABASE_REPLICA_URLS))
+
+
+def _fijado_a_primaria(request: Request) -> bool:
+    if request.headers.get(HEADER_PRIMARIA):
+        return True
+    try:
+        return float(request.cookies.get(COOKIE_PRIMARIA, 0)) > time.time()
+    except ValueError:
+        return False
+
+def get_db_lectura(request: Request, db: Session = Depends(get_db)):
+    """Dependency para lecturas: una réplica sana o, si no hay, la primaria"""
+    if not enrutador.habilitado:
+        yield db
+        return
+    if _fijado_a_primaria(request):
+        enrutador.contar_primaria()
+        engine = None
+    else:
+        engine = enrutador.elegir()
+    if engine is None:
+        yield db
+        return
+    replica = SessionLocal(bind=engine, info={"replica": True})
+    try:
+        yield replica
+    except OperationalError:
+        enrutador.marcar_caida(engine)
+        raise
+    finally:
+        replica.close()
+
+def marcar_escritura(response: Response):
+    """Dependency que registra la escritura y fija al cliente a la primaria por un rato"""
+    enrutador.registrar_escritura()
+    if enrutador.habilitado:
+        hasta = time.time() + enrutador.ventana
+        response.set_cookie(
+            COOKIE_PRIMARIA, f"{hasta:.3f}", max_age=max(1, round(enrutador.ventana)), httponly=True, samesite="lax"
+        )
+
+def get_db_escritura(response: Response, db: Session = Depends(get_db)):
+    """Dependency para escrituras: la primaria, fijando al cliente a ella por un rato"""
+    marcar_escritura(response)
+    return db
+
+def cacheable(db: Session) -> bool:
+    """False si ``db`` es una réplica y hubo una escritura reciente (puede estar atrasada)"""
+    return not (db.info.get("replica") and enrutador.escritura_reciente())
@@ -1,89 +1,453 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.models import Product, ProductResponse
+import gzip
+import io
+import tempfile
+import time
+from typing import Callable, Iterator, Literal, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from app import cache
+from app.condicional import (
+    encabezados_cache,
+    etag_gzip,
+    etag_listado,
+    etag_producto,
+    no_modificado,
+    respuesta_no_modificada,
+    versiones_if_match,
+)
+from app.models import (
+    Product,
+    ProductResponse,
+    ProductoParcial,
+    ReservaStockRequest,
+    ReservaStockResponse,
+    LoteProductosRequest,
+    LoteProductosResponse,
+    CambiosResponse,
+    ImportacionResponse,
+    ExportacionRequest,
+    ExportacionResponse,
+    SugerenciaProducto,
+    CategoriaStats,
+)
+from app.autocompletar import indice as indice_autocompletar
+from app.cambios import ESPERA_MAXIMA, INTERVALO_SONDEO, leer_cambios, notificador
+from app.estadisticas import obtener_estadisticas
+from app.importacion import importar_archivo
+from app.serializacion import (
+    CAMPOS,
+    consulta_filas,
+    dumps,
+    json_producto,
+    json_productos,
+    modelo_parcial,
+    parsear_campos,
+)
+from app.exportacion import iniciar_exportacion, obtener_trabajo
 from app.services import (
     buscar_prod_int, 
+    obtener_producto,
+    obtener_campos_producto,
+    obtener_productos_lote,
     buscar_prod_nombre, 
+    consulta_prod_nombre,
     buscar_prod_categoria, 
     buscar_prod_rango_precio, 
+    buscar_prod_bajo_stock,
+    consulta_productos_texto,
+    consulta_prod_categoria,
+    consulta_prod_rango_precio,
+    consulta_prod_bajo_stock,
+    consulta_productos_pagina,
+    resumen_consulta,
     producto_en_stock, 
     actualizar_stock,
-    obtener_todos_productos,
+    reservar_stock_lote,
+    iterar_filas_productos,
     crear_producto,
     eliminar_producto,
-    actualizar_producto
+    actualizar_producto,
+    StockInsuficienteError,
+    ColaStockLlenaError,
+    ConflictoVersionError,
 )
-from app.db import get_db
-from sqlalchemy.orm import Session
-from app.db import ProductDB
+from app.replicas import cacheable, get_db_escritura, get_db_lectura
+from sqlalchemy import Row
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm import Query as Consulta
 
 router = APIRouter()
 
+# IDs admitidos en GET /productos/batch (la URL tiene un largo máximo)
+MAX_IDS_GET = 1000
+
 # IMPORTANTE: Las rutas específicas van ANTES que las rutas con parámetros {id}
 # Si no, FastAPI interpretará "low_stock" como un ID
 
-@router.get("/productos", response_model=list[ProductResponse]) 
-def obtener_todos_productos_route(db: Session = Depends(get_db)):
-    """Obtener lista de todos los productos"""
-    return obtener_todos_productos(db)
+def _acepta_gzip(request: Request) -> bool:
+    """Ver si el cliente acepta gzip en Accept-Encoding.
+
+    Se lee el header completo: una entrada ``gzip`` manda sobre ``*`` sin
+    importar el orden, y ``q=0`` rechaza la codificación (RFC 9110, 12.5.3).
+    """
+    calidades = {}
+    for codificacion in request.headers.get("accept-encoding", "").split(","):
+        nombre, *parametros = codificacion.split(";")
+        nombre = nombre.strip().lower()
+        if not nombre:
+            continue
+        calidad = 1.0
+        for parametro in parametros:
+            clave, _, valor = parametro.partition("=")
+            if clave.strip().lower() == "q":
+                try:
+                    calidad = float(valor)
+                except ValueError:
+                    calidad = 0.0
+        calidades[nombre] = calidad
+    return calidades.get("gzip", calidades.get("*", 0.0)) > 0
+
+# Documentación de las rutas que aceptan ``fields`` (con él las respuestas son parciales)
+RESPUESTA_PRODUCTO_PARCIAL = {
+    200: {"model": ProductoParcial, "description": "El producto; con `fields`, solo `id` y los campos pedidos"}
+}
+RESPUESTA_LISTADO_PARCIAL = {
+    200: {"model": list[ProductoParcial], "description": "Los productos; con `fields`, solo `id` y los campos pedidos"}
+}
+
+def campos_solicitados(
+    fields: Optional[str] = Query(
+        None, description="Campos a devolver separados por coma (id se incluye siempre); por defecto todos"
+    ),
+) -> tuple[str, ...]:
+    """Dependencia que valida ``fields`` (422 con campos desconocidos)"""
+    try:
+        return parsear_campos(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+def _respuesta_producto(producto, campos: tuple[str, ...], headers: Optional[dict[str, str]] = None) -> Response:
+    """Un producto (modelo o fila) validado con el modelo parcial de ``campos``"""
+    body = modelo_parcial(campos).model_validate(producto).model_dump_json()
+    return Response(body, media_type="application/json", headers=headers)
+
+def _respuesta_cacheada(
+    request: Request,
+    generacion: object,
+    consulta: Consulta,
+    encabezados: Optional[Callable[[list[Row]], dict[str, str]]] = None,
+    campos: tuple[str, ...] = CAMPOS,
+) -> Response:
+    """Servir un listado desde la cache de respuestas o generarlo y guardarlo.
+
+    La clave es la ruta, los parámetros de la query ordenados y la generación
+    vigente (tomada antes de consultar). En un miss primero se calcula el ETag
+    con un agregado (ver ``resumen_consulta``) y, si el cliente ya tiene
+    esa versión, se responde 304 sin cargar ni serializar las filas.
+    Las filas se leen y codifican por la vía rápida de app/serializacion.py,
+    seleccionando solo ``campos``. ``encabezados`` calcula headers extra a
+    partir de las filas.
+    """
+    clave = (request.url.path, tuple(sorted(request.query_params.multi_items())), generacion)
+    comprimir = _acepta_gzip(request)
+    # Cada codificación es otra representación: la comprimida tiene su propio ETag fuerte
+    variante = etag_gzip if comprimir else (lambda etag: etag)
+    encabezados_variante = {"Vary": "Accept-Encoding"}
+    entrada = cache.respuestas.get(clave)
+    if entrada is None:
+        resumen = resumen_consulta(consulta)
+        etag = etag_listado(*resumen, campos=campos)
+        ultima_modificacion = resumen[1]
+        # Sin fecha: If-Modified-Since no ve que una fila entró o salió de la página
+        if no_modificado(request, variante(etag)):
+            return respuesta_no_modificada(variante(etag), ultima_modificacion, encabezados_variante)
+        filas = consulta_filas(consulta, campos).all()
+        headers = encabezados(filas) if encabezados else {}
+        headers.update(encabezados_cache(etag, ultima_modificacion))
+        body = json_productos(filas, campos)
+        entrada = cache.RespuestaCacheada(
+            body, gzip.compress(body, compresslevel=6), headers, etag, ultima_modificacion
+        )
+        if cacheable(consulta.session):
+            cache.respuestas.set(clave, entrada)
+    elif no_modificado(request, variante(entrada.etag)):
+        return respuesta_no_modificada(variante(entrada.etag), entrada.ultima_modificacion, encabezados_variante)
 
-@router.get("/productos/low_stock", response_model=list[ProductResponse])
-def obtener_productos_bajo_stock(threshold: int = 5, db: Session = Depends(get_db)):
+    headers = {**entrada.headers, **encabezados_variante, "ETag": variante(entrada.etag)}
+    if comprimir:
+        headers["Content-Encoding"] = "gzip"
+        return Response(entrada.gzip_body, media_type="application/json", headers=headers)
+    return Response(entrada.body, media_type="application/json", headers=headers)
+
+def _stream_json(filas: Iterator[Row], campos: tuple[str, ...] = CAMPOS) -> Iterator[bytes]:
+    """Escribir los productos como un array JSON, un elemento a la vez"""
+    yield b"["
+    for i, fila in enumerate(filas):
+        if i:
+            yield b","
+        yield json_producto(fila, campos)
+    yield b"]"
+
+def _stream_ndjson(filas: Iterator[Row], campos: tuple[str, ...] = CAMPOS) -> Iterator[bytes]:
+    """Escribir los productos como NDJSON (un objeto JSON por línea)"""
+    for fila in filas:
+        yield json_producto(fila, campos) + b"\n"
+
+@router.get("/productos", response_model=list[ProductResponse], responses=RESPUESTA_LISTADO_PARCIAL) 
+def obtener_todos_productos_route(
+    request: Request,
+    limit: int = Query(100, ge=1, le=1000, description="Cantidad máxima de productos por página"),
+    after: Optional[int] = Query(None, description="Cursor: ID del último producto recibido"),
+    stream: Optional[Literal["json", "ndjson"]] = Query(None, description="Enviar todo el catálogo por bloques"),
+    campos: tuple[str, ...] = Depends(campos_solicitados),
+    db: Session = Depends(get_db_lectura),
+):
+    """Obtener productos paginados por cursor (ordenados por ID).
+
+    Si la página está llena se agrega el cursor de la siguiente en los headers
+    ``Link`` (rel="next") y ``X-Next-Cursor``. Con ``stream`` se ignora ``limit``
+    y se envían todos los productos leídos por bloques. Las páginas se sirven
+    desde la cache de respuestas hasta la próxima escritura. ``fields`` limita
+    las columnas que se leen y se envían.
+    """
+    if stream:
+        filas = iterar_filas_productos(db, after, campos=campos)
+        if stream == "ndjson":
+            return StreamingResponse(_stream_ndjson(filas, campos), media_type="application/x-ndjson")
+        return StreamingResponse(_stream_json(filas, campos), media_type="application/json")
+
+    def encabezados(filas: list[Row]) -> dict[str, str]:
+        if len(filas) < limit:
+            return {}
+        next_cursor = filas[-1].id
+        next_url = request.url.include_query_params(after=next_cursor)
+        return {"Link": f'<{next_url.path}?{next_url.query}>; rel="next"', "X-Next-Cursor": str(next_cursor)}
+
+    return _respuesta_cacheada(
+        request, cache.generaciones.catalogo(), consulta_productos_pagina(db, limit, after), encabezados, campos
+    )
+
+@router.get("/productos/low_stock", response_model=list[ProductResponse], responses=RESPUESTA_LISTADO_PARCIAL)
+def obtener_productos_bajo_stock(
+    request: Request,
+    threshold: int = 5,
+    campos: tuple[str, ...] = Depends(campos_solicitados),
+    db: Session = Depends(get_db_lectura),
+):
     """Obtener productos con stock bajo (por defecto <= 5)"""
-    
-    low_stock_products = db.query(ProductDB).filter(ProductDB.stock <= threshold).all()
-    return low_stock_products
+    return _respuesta_cacheada(
+        request, cache.generaciones.catalogo(), consulta_prod_bajo_stock(db, threshold), campos=campos
+    )
+
+@router.get("/productos/stats", response_model=list[CategoriaStats])
+def estadisticas_por_categoria(db: Session = Depends(get_db_lectura)):
+    """Cantidad, unidades, valor del inventario y precios de cada categoría"""
+    return obtener_estadisticas(db)
 
-@router.get("/productos/buscar/nombre/{nombre}", response_model=ProductResponse)
-def obtener_producto_por_nombre(nombre: str, db: Session = Depends(get_db)):
+@router.get(
+    "/productos/buscar/nombre/{nombre}", response_model=ProductResponse, responses=RESPUESTA_PRODUCTO_PARCIAL
+)
+def obtener_producto_por_nombre(
+    nombre: str, campos: tuple[str, ...] = Depends(campos_solicitados), db: Session = Depends(get_db_lectura)
+):
     """Buscar producto por nombre exacto"""
-    product = buscar_prod_nombre(db, nombre)
+    product = consulta_filas(consulta_prod_nombre(db, nombre), campos).first()
     if product:
-        return product
+        return _respuesta_producto(product, campos)
     raise HTTPException(status_code=404, detail="Producto no encontrado")
 
-@router.get("/productos/categoria/{categoria}", response_model=list[ProductResponse])
-def obtener_productos_por_categoria(categoria: str, db: Session = Depends(get_db)):
+@router.get("/productos/search", response_model=list[ProductResponse], responses=RESPUESTA_LISTADO_PARCIAL)
+def buscar_productos_route(
+    q: str = Query(min_length=1, max_length=200, description="Palabras a buscar en nombre y descripción"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10_000),
+    campos: tuple[str, ...] = Depends(campos_solicitados),
+    db: Session = Depends(get_db_lectura),
+):
+    """Búsqueda de texto completo ordenada por relevancia"""
+    consulta = consulta_productos_texto(db, q, limit, offset)
+    filas = consulta_filas(consulta, campos).all() if consulta is not None else []
+    return Response(json_productos(filas, campos), media_type="application/json")
+
+@router.get("/productos/autocompletar", response_model=list[SugerenciaProducto])
+def autocompletar_productos(
+    q: str = Query(min_length=1, max_length=150, description="Prefijo escrito por el usuario"),
+    k: int = Query(10, ge=1, le=50, description="Cantidad máxima de sugerencias"),
+    db: Session = Depends(get_db_lectura),
+):
+    """Sugerencias por prefijo de nombre desde el índice en memoria"""
+    indice_autocompletar.asegurar_construido(db)
+    return [SugerenciaProducto(id=id, nombre=nombre) for id, nombre in indice_autocompletar.buscar(q, k)]
+
+@router.get(
+    "/productos/categoria/{categoria}", response_model=list[ProductResponse], responses=RESPUESTA_LISTADO_PARCIAL
+)
+def obtener_productos_por_categoria(
+    request: Request,
+    categoria: str,
+    campos: tuple[str, ...] = Depends(campos_solicitados),
+    db: Session = Depends(get_db_lectura),
+):
     """Obtener todos los productos de una categoría"""
-    products = buscar_prod_categoria(db, categoria)
-    return products
+    return _respuesta_cacheada(
+        request, cache.generaciones.categoria(categoria), consulta_prod_categoria(db, categoria), campos=campos
+    )
 
-@router.get("/productos/rango_precio/", response_model=list[ProductResponse])
-def obtener_productos_por_rango_precio(min_price: float, max_price: float, db: Session = Depends(get_db)):
+@router.get("/productos/rango_precio/", response_model=list[ProductResponse], responses=RESPUESTA_LISTADO_PARCIAL)
+def obtener_productos_por_rango_precio(
+    request: Request,
+    min_price: float,
+    max_price: float,
+    campos: tuple[str, ...] = Depends(campos_solicitados),
+    db: Session = Depends(get_db_lectura),
+):
     """Buscar productos por rango de precio"""
-    products = buscar_prod_rango_precio(db, min_price, max_price)
-    return products
+    return _respuesta_cacheada(
+        request, cache.generaciones.catalogo(), consulta_prod_rango_precio(db, min_price, max_price), campos=campos
+    )
 
-@router.get("/productos/{id}", response_model=ProductResponse)
-def obtener_producto_por_id(id: int, db: Session = Depends(get_db)):
-    """Obtener un producto por su ID"""
-    product = buscar_prod_int(db, id)
-    if product:
-        return product
-    raise HTTPException(status_code=404, detail="Producto no encontrado") 
+def _respuesta_lote(db: Session, ids: list[int]) -> LoteProductosResponse:
+    productos = obtener_productos_lote(db, ids)
+    faltantes = list(dict.fromkeys(id for id, product in zip(ids, productos) if product is None))
+    return LoteProductosResponse(productos=productos, faltantes=faltantes)
+
+@router.get("/productos/batch", response_model=LoteProductosResponse)
+def obtener_productos_lote_route(
+    ids: str = Query(min_length=1, description="IDs separados por coma, p. ej. 3,1,7"),
+    db: Session = Depends(get_db_lectura),
+):
+    """Buscar varios productos por ID (para listas largas usar POST)"""
+    try:
+        lista = [int(id) for id in ids.split(",") if id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids debe ser una lista de enteros separados por coma")
+    if not lista or len(lista) > MAX_IDS_GET:
+        raise HTTPException(status_code=422, detail=f"ids debe tener entre 1 y {MAX_IDS_GET} elementos")
+    return _respuesta_lote(db, lista)
+
+@router.post("/productos/batch", response_model=LoteProductosResponse)
+def obtener_productos_lote_post(lote: LoteProductosRequest, db: Session = Depends(get_db_lectura)):
+    """Buscar varios productos por ID en el orden pedido (null en los que no existen)"""
+    return _respuesta_lote(db, lote.ids)
+
+@router.get("/productos/changes", response_model=CambiosResponse)
+async def cambios_productos(
+    since: int = Query(0, ge=0, description="Cursor de la página anterior (0 = desde el principio)"),
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(0, ge=0, le=ESPERA_MAXIMA, description="Segundos a esperar si no hay cambios (long-poll)"),
+    db: Session = Depends(get_db_lectura),
+):
+    """Productos que cambiaron después de ``since`` (estado actual o tombstone).
+
+    Para sincronizar, repetir con ``since`` igual al ``cursor`` de la respuesta.
+    """
+    limite = time.monotonic() + wait
+    while True:
+        pagina = await run_in_threadpool(leer_cambios, db, since, limit)
+        restante = limite - time.monotonic()
+        if pagina["cambios"] or restante <= 0:
+            return Response(dumps(pagina), media_type="application/json")
+        # Devolver la conexión al pool mientras espera
+        await run_in_threadpool(db.rollback)
+        await notificador.esperar(min(restante, INTERVALO_SONDEO))
+
+@router.post("/productos/reservar_stock", response_model=ReservaStockResponse)
+def reservar_stock_route(reserva: ReservaStockRequest, response: Response, db: Session = Depends(get_db_escritura)):
+    """Aplicar varios ajustes de stock de forma atómica (409 si alguno falla o el stock no deja de cambiar)"""
+    try:
+        productos, errores = reservar_stock_lote(db, [(item.id, item.quantity) for item in reserva.items])
+    except ConflictoVersionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if errores:
+        response.status_code = 409
+        return ReservaStockResponse(aplicado=False, errores=errores)
+    return ReservaStockResponse(aplicado=True, productos=productos)
+
+@router.get("/productos/{id}", response_model=ProductResponse, responses=RESPUESTA_PRODUCTO_PARCIAL)
+def obtener_producto_por_id(
+    id: int,
+    request: Request,
+    response: Response,
+    campos: tuple[str, ...] = Depends(campos_solicitados),
+    db: Session = Depends(get_db_lectura),
+):
+    """Obtener un producto por su ID (304 si el ETag del cliente sigue vigente)"""
+    if campos == CAMPOS:
+        product = obtener_producto(db, id)
+    else:
+        product = obtener_campos_producto(db, id, campos)
+    if not product:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    etag = etag_producto(product.id, product.version, campos)
+    if no_modificado(request, etag, product.updated_at):
+        return respuesta_no_modificada(etag, product.updated_at)
+    if campos != CAMPOS:
+        return _respuesta_producto(product, campos, encabezados_cache(etag, product.updated_at))
+    response.headers.update(encabezados_cache(etag, product.updated_at))
+    return product
 
 @router.get("/productos/{id}/stock", response_model=dict)
-def verificar_stock_producto(id: int, db: Session = Depends(get_db)):
+def verificar_stock_producto(id: int, request: Request, response: Response, db: Session = Depends(get_db_lectura)):
     """Verificar si un producto tiene stock disponible"""
-    product = buscar_prod_int(db, id)
+    product = obtener_producto(db, id)
     if not product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
+    etag = etag_producto(product.id, product.version)
+    if no_modificado(request, etag, product.updated_at):
+        return respuesta_no_modificada(etag, product.updated_at)
+    response.headers.update(encabezados_cache(etag, product.updated_at))
     return {"id": id, "nombre": product.nombre, "stock": product.stock, "disponible": product.stock > 0}
 
 @router.post("/productos", response_model=ProductResponse, status_code=201)
-def crear_producto_route(product: Product, db: Session = Depends(get_db)):
+def crear_producto_route(product: Product, db: Session = Depends(get_db_escritura)):
     """Crear un nuevo producto"""
     return crear_producto(db, product)
 
+@router.post("/productos/importar", response_model=ImportacionResponse)
+async def importar_productos_route(
+    request: Request,
+    formato: Literal["ndjson", "csv"] = "ndjson",
+    upsert: bool = Query(False, description="Actualizar productos con el mismo nombre (sin distinguir mayúsculas)"),
+    db: Session = Depends(get_db_escritura),
+):
+    """Importar productos en masa desde el cuerpo de la petición (NDJSON o CSV).
+
+    El cuerpo se copia por bloques a un archivo temporal (en memoria hasta 1 MB)
+    y la importación corre en el threadpool, sin cargar el archivo completo.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as cuerpo:
+        async for chunk in request.stream():
+            cuerpo.write(chunk)
+        cuerpo.seek(0)
+        archivo = io.TextIOWrapper(cuerpo, encoding="utf-8", newline="")
+        try:
+            return await run_in_threadpool(importar_archivo, db, archivo, formato, upsert)
+        finally:
+            archivo.detach()
+
 @router.put("/productos/{id}", response_model=ProductResponse)
-def reemplazar_producto(id: int, nuevo_producto: Product, db: Session = Depends(get_db)):
-    """Reemplazar un producto existente por completo"""
-    updated = actualizar_producto(db, id, nuevo_producto)
+def reemplazar_producto(
+    id: int, nuevo_producto: Product, request: Request, response: Response, db: Session = Depends(get_db_escritura)
+):
+    """Reemplazar un producto existente por completo.
+
+    Con ``If-Match`` (el ETag de ``GET /productos/{id}``) solo se aplica si el
+    producto no cambió desde entonces (412 si cambió). Sin él, 409 si otra
+    escritura lo modificó durante la petición.
+    """
+    versiones = versiones_if_match(request, id)
+    try:
+        updated = actualizar_producto(db, id, nuevo_producto, versiones)
+    except ConflictoVersionError as e:
+        raise HTTPException(status_code=409 if versiones is None else 412, detail=str(e))
     if updated:
+        response.headers["ETag"] = etag_producto(updated.id, updated.version)
         return updated
     raise HTTPException(status_code=404, detail="Producto no encontrado")
 
 @router.delete("/productos/{id}", status_code=204)
-def eliminar_producto_route(id: int, db: Session = Depends(get_db)):
+def eliminar_producto_route(id: int, db: Session = Depends(get_db_escritura)):
     """Eliminar un producto por su ID"""
     if eliminar_producto(db, id):
         return
@@ -92,9 +456,42 @@ def eliminar_producto_route(id: int, db: Session = Depends(get_db)):
 
 
 @router.patch("/productos/{id}/actualizar_stock", response_model=ProductResponse)
-def actualizar_stock_producto(id: int, quantity: int, db: Session = Depends(get_db)):
-    updated_product = actualizar_stock(db, id, quantity)
+def actualizar_stock_producto(id: int, quantity: int, db: Session = Depends(get_db_escritura)):
+    """Sumar o restar stock de forma atómica (409 si el stock quedaría negativo).
+
+    Los productos calientes responden 503 si sus ajustes no se pueden volcar.
+    """
+    try:
+        updated_product = actualizar_stock(db, id, quantity)
+    except StockInsuficienteError:
+        raise HTTPException(status_code=409, detail="Stock insuficiente")
+    except ColaStockLlenaError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     if updated_product:
         return updated_product
-    raise HTTPException(status_code=400, detail="No se pudo actualizar el stock del producto")
+    raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+
+@router.post("/exportaciones", response_model=ExportacionResponse, status_code=202)
+def iniciar_exportacion_route(parametros: ExportacionRequest, db: Session = Depends(get_db_lectura)):
+    """Iniciar una exportación del catálogo en segundo plano"""
+    trabajo = iniciar_exportacion(parametros, sessionmaker(bind=db.get_bind()))
+    return trabajo.respuesta()
+
+@router.get("/exportaciones/{id}", response_model=ExportacionResponse)
+def estado_exportacion(id: str):
+    """Consultar el estado y progreso de una exportación"""
+    trabajo = obtener_trabajo(id)
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="Exportación no encontrada")
+    return trabajo.respuesta()
 
+@router.get("/exportaciones/{id}/descarga")
+def descargar_exportacion(id: str):
+    """Descargar el archivo comprimido de una exportación terminada"""
+    trabajo = obtener_trabajo(id)
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="Exportación no encontrada")
+    if trabajo.estado != "completado":
+        raise HTTPException(status_code=409, detail=f"La exportación está en estado '{trabajo.estado}'")
+    return FileResponse(trabajo.archivo, media_type="application/gzip", filename=trabajo.archivo.name)
@@ -0,0 +1,97 @@
+"""Serialización rápida de listados de productos.
+
+Los listados no cargan objetos ``ProductDB`` ni los validan con
+``ProductResponse``: seleccionan solo las columnas de la respuesta como filas
+planas (sin identity map), con ``precio`` ya convertido a float en SQL, y las
+codifican directamente a bytes con orjson. Los datos ya cumplen las
+restricciones de la tabla, así que volver a validarlos no aporta nada.
+
+El JSON resultante es el mismo que produce ``ProductResponse`` y las rutas
+conservan ``response_model`` para que el esquema de OpenAPI no cambie. Si
+orjson no está instalado se usa el módulo ``json`` de la biblioteca estándar.
+
+Con ``fields=`` (ver ``parsear_campos``) la proyección del SELECT se reduce a
+los campos pedidos y las respuestas de un solo producto se validan con un
+modelo parcial construido a partir de ``ProductResponse``.
+"""
+import json
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlalchemy import Float, Row, cast
+from sqlalchemy.orm import Query
+
+from app.db import ProductDB
+from app.models import ProductResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+# Campos de la respuesta, en el orden de ProductResponse
+CAMPOS = tuple(ProductResponse.model_fields)
+COLUMNAS = tuple(
+    cast(ProductDB.precio, Float).label("precio") if campo == "precio" else getattr(ProductDB, campo)
+    for campo in CAMPOS
+)
+COLUMNA_POR_CAMPO = dict(zip(CAMPOS, COLUMNAS))
+
+
+def parsear_campos(fields: Optional[str]) -> tuple[str, ...]:
+    """Campos pedidos en ``fields`` (separados por coma) en el orden de ``CAMPOS``.
+
+    ``id`` se incluye siempre (lo usan el cursor de paginación y el ETag).
+    Sin ``fields`` se devuelven todos los campos.
+
+    Raises:
+        ValueError: si hay campos desconocidos o la lista está vacía
+    """
+    if fields is None:
+        return CAMPOS
+    pedidos = {campo.strip() for campo in fields.split(",") if campo.strip()}
+    if not pedidos:
+        raise ValueError("fields no puede estar vacío")
+    desconocidos = pedidos.difference(CAMPOS)
+    if desconocidos:
+        raise ValueError(
+            f"Campos desconocidos: {', '.join(sorted(desconocidos))}. Permitidos: {', '.join(CAMPOS)}"
+        )
+    pedidos.add("id")
+    return tuple(campo for campo in CAMPOS if campo in pedidos)
+
+@lru_cache(maxsize=256)
+def modelo_parcial(campos: tuple[str, ...]) -> type[BaseModel]:
+    """Modelo de respuesta con solo ``campos`` (mismos tipos que ``ProductResponse``)"""
+    if campos == CAMPOS:
+        return ProductResponse
+    campos_modelo = ProductResponse.model_fields
+    definiciones = {campo: (campos_modelo[campo].annotation, campos_modelo[campo]) for campo in campos}
+    return create_model(
+        f"ProductResponse_{'_'.join(campos)}", __config__=ConfigDict(from_attributes=True), **definiciones
+    )
+
+def consulta_filas(consulta: Query, campos: tuple[str, ...] = CAMPOS) -> Query:
+    """La misma consulta (filtros, orden, límite) pero con filas planas de ``campos``"""
+    return consulta.with_entities(*(COLUMNA_POR_CAMPO[campo] for campo in campos))
+
+def _por_defecto(valor: Any):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+def dumps(valor: Any) -> bytes:
+    """Codificar a JSON compacto en UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(valor)
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":"), default=_por_defecto).encode()
+
+def json_producto(fila: Row, campos: tuple[str, ...] = CAMPOS) -> bytes:
+    """Un producto (fila de ``consulta_filas``) como objeto JSON"""
+    return dumps(dict(zip(campos, fila)))
+
+def json_productos(filas: Iterable[Row], campos: tuple[str, ...] = CAMPOS) -> bytes:
+    """Una lista de productos como array JSON"""
+    return dumps([dict(zip(campos, fila)) for fila in filas])
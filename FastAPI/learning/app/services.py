@@ -1,29 +1,210 @@
-from app.db import ProductDB
-from app.models import Product
-from typing import Optional
-from sqlalchemy.orm import Session
+from app import cache
+from app.autocompletar import indice as indice_autocompletar
+from app.coalescencia import coalescedor
+from app.replicas import cacheable
+from app.stock_caliente import ColaStockLlenaError, StockInsuficienteError, registro as registro_stock_caliente
+from app.estadisticas import DeltaCategorias
+from app.db import ProductDB, LOW_STOCK_INDEX_THRESHOLD, FTS_CONFIG_PG
+from app.models import Product, ProductResponse
+from app.serializacion import CAMPOS, consulta_filas
+from typing import Iterator, Optional, Union
+import re
+from sqlalchemy import Row, and_, case, column, func, literal_column, or_, select, table, text, update
+from sqlalchemy.orm import Query, Session
 from datetime import datetime, timezone
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 
 
+# IDs por consulta IN en las búsquedas por lote
+LOTE_IN = 500
+# Intentos de una reserva por lote cuando otro escritor cambia el stock a la vez
+INTENTOS_RESERVA = 3
+
+
+class ConflictoVersionError(ValueError):
+    """El producto cambió desde la versión que se quería modificar"""
+
+
+def _cachear(product: ProductDB, token: Optional[int] = None) -> ProductResponse:
+    """Guardar en la cache una copia del producto (tras un commit o una lectura)"""
+    snapshot = ProductResponse.model_validate(product)
+    cache.productos.set(product.id, snapshot, token)
+    return snapshot
+
+def _invalidar_listados(*categorias: str):
+    """Invalidar los listados cacheados del catálogo y de las categorías dadas"""
+    cache.generaciones.incrementar(categorias)
+
+def filtro_nombre(nombre: str):
+    """Comparación case-insensitive que usa el índice ix_products_nombre_lower"""
+    return func.lower(ProductDB.nombre) == func.lower(nombre)
+
+def filtro_categoria(categoria: str):
+    """Comparación case-insensitive que usa el índice ix_products_categoria_lower"""
+    return func.lower(ProductDB.categoria) == func.lower(categoria)
+
+def filtro_bajo_stock(threshold: int) -> list:
+    """Condiciones de stock bajo; si el umbral lo permite se agrega la
+    condición literal del índice parcial ix_products_stock_bajo"""
+    condiciones = [ProductDB.stock <= threshold]
+    if threshold <= LOW_STOCK_INDEX_THRESHOLD:
+        condiciones.append(ProductDB.stock <= literal_column(str(LOW_STOCK_INDEX_THRESHOLD)))
+    return condiciones
+
 def buscar_prod_int(db: Session, id: int) -> Optional[ProductDB]:
     """Buscar producto por ID en la base de datos"""
     return db.query(ProductDB).filter(ProductDB.id == id).first()
 
+def _leer_producto(db: Session, id: int, token: int) -> Optional[ProductResponse]:
+    db_product = buscar_prod_int(db, id)
+    if db_product is None:
+        return None
+    if not cacheable(db):
+        return ProductResponse.model_validate(db_product)
+    return _cachear(db_product, token)
+
+def obtener_producto(db: Session, id: int) -> Optional[ProductResponse]:
+    """Buscar producto por ID pasando primero por la cache en memoria.
+
+    En un miss, las lecturas concurrentes del mismo ID comparten una sola
+    consulta (ver app/coalescencia.py). Devuelve una copia de solo lectura
+    (``ProductResponse``); para modificar el producto usar ``buscar_prod_int``.
+    """
+    product = cache.productos.get(id)
+    if product is not None:
+        return product
+    # Con el token de escrituras en la clave, quien llega después de una
+    # escritura no se suma a una consulta empezada antes de ella. Una lectura
+    # fijada a la primaria no espera el resultado de una réplica
+    token = cache.productos.token()
+    clave = ("producto", id, db.info.get("replica", False), token)
+    return coalescedor.ejecutar(clave, lambda: _leer_producto(db, id, token))
+
+def obtener_productos_lote(db: Session, ids: list[int]) -> list[Optional[ProductResponse]]:
+    """Buscar varios productos por ID en el orden de ``ids`` (None si no existe).
+
+    Los que no están en la cache se leen con consultas ``IN`` de hasta
+    ``LOTE_IN`` IDs y se guardan en la cache (salvo que ``cacheable`` lo impida).
+    """
+    encontrados: dict[int, ProductResponse] = {}
+    faltan = []
+    for id in dict.fromkeys(ids):
+        product = cache.productos.get(id)
+        if product is not None:
+            encontrados[id] = product
+        else:
+            faltan.append(id)
+    guardar = cacheable(db)
+    for inicio in range(0, len(faltan), LOTE_IN):
+        token = cache.productos.token()
+        bloque = faltan[inicio:inicio + LOTE_IN]
+        for db_product in db.query(ProductDB).filter(ProductDB.id.in_(bloque)):
+            encontrados[db_product.id] = (
+                _cachear(db_product, token) if guardar else ProductResponse.model_validate(db_product)
+            )
+    return [encontrados.get(id) for id in ids]
+
+def obtener_campos_producto(db: Session, id: int, campos: tuple[str, ...]) -> Optional[Union[ProductResponse, Row]]:
+    """Como ``obtener_producto`` pero en un miss selecciona solo ``campos``.
+
+    La fila parcial no se guarda en la cache; incluye siempre ``updated_at``
+    y ``version`` para poder calcular el ETag.
+    """
+    product = cache.productos.get(id)
+    if product is not None:
+        return product
+    seleccion = campos + tuple(campo for campo in ("updated_at", "version") if campo not in campos)
+    return consulta_filas(db.query(ProductDB).filter(ProductDB.id == id), seleccion).first()
+
+def consulta_prod_nombre(db: Session, nombre: str) -> Query:
+    """Consulta del producto con un nombre exacto (case-insensitive)"""
+    return db.query(ProductDB).filter(filtro_nombre(nombre))
+
 def buscar_prod_nombre(db: Session, nombre: str) -> Optional[ProductDB]:
     """Buscar producto por nombre exacto (case-insensitive)"""
-    return db.query(ProductDB).filter(ProductDB.nombre.ilike(nombre)).first()
+    return consulta_prod_nombre(db, nombre).first()
+
+def consulta_prod_categoria(db: Session, categoria: str) -> Query:
+    """Consulta de productos de una categoría (case-insensitive)"""
+    return db.query(ProductDB).filter(filtro_categoria(categoria))
 
 def buscar_prod_categoria(db: Session, categoria: str) -> list[ProductDB]:
     """Buscar productos por categoría (case-insensitive)"""
-    return db.query(ProductDB).filter(ProductDB.categoria.ilike(categoria)).all()
+    return consulta_prod_categoria(db, categoria).all()
 
-def buscar_prod_rango_precio(db: Session, min_price: float, max_price: float) -> list[ProductDB]:
-    """Buscar productos por rango de precio"""
+def consulta_prod_rango_precio(db: Session, min_price: float, max_price: float) -> Query:
+    """Consulta de productos dentro de un rango de precio"""
     return db.query(ProductDB).filter(
         ProductDB.precio >= min_price,
         ProductDB.precio <= max_price
-    ).all()
+    )
+
+def buscar_prod_rango_precio(db: Session, min_price: float, max_price: float) -> list[ProductDB]:
+    """Buscar productos por rango de precio"""
+    return consulta_prod_rango_precio(db, min_price, max_price).all()
+
+def consulta_prod_bajo_stock(db: Session, threshold: int) -> Query:
+    """Consulta de productos con stock menor o igual al umbral"""
+    return db.query(ProductDB).filter(*filtro_bajo_stock(threshold))
+
+def buscar_prod_bajo_stock(db: Session, threshold: int) -> list[ProductDB]:
+    """Buscar productos con stock menor o igual al umbral"""
+    return consulta_prod_bajo_stock(db, threshold).all()
+
+def resumen_consulta(query: Query) -> tuple[int, Optional[datetime], int, int]:
+    """Cantidad de filas, última modificación, suma de IDs y suma de versiones
+    del resultado de una consulta.
+
+    Sirve para calcular el ETag de un listado sin cargar ni serializar las
+    filas. Respeta ``limit``/``offset`` de la consulta.
+    """
+    filas = query.with_entities(ProductDB.id, ProductDB.updated_at, ProductDB.version).subquery()
+    total, ultima_modificacion, suma_ids, suma_versiones = query.session.query(
+        func.count(),
+        func.max(filas.c.updated_at),
+        func.coalesce(func.sum(filas.c.id), 0),
+        func.coalesce(func.sum(filas.c.version), 0),
+    ).one()
+    return total, ultima_modificacion, int(suma_ids), int(suma_versiones)
+
+def _terminos_busqueda(q: str) -> list[str]:
+    """Separar la búsqueda en palabras (sin operadores ni comillas)"""
+    return re.findall(r"\w+", q)
+
+def consulta_productos_texto(db: Session, q: str, limit: int = 20, offset: int = 0) -> Optional[Query]:
+    """Consulta de búsqueda de texto completo en nombre y descripción ordenada por relevancia.
+
+    Cada palabra se busca como prefijo y deben aparecer todas. Usa el índice
+    GIN (tsvector) en PostgreSQL y la tabla FTS5 en SQLite; en otros motores
+    recurre a LIKE. Devuelve None si la búsqueda no tiene palabras.
+    """
+    terminos = _terminos_busqueda(q)
+    if not terminos:
+        return None
+    dialecto = db.get_bind().dialect.name
+    query = db.query(ProductDB)
+
+    if dialecto == "postgresql":
+        prefijos = " & ".join(f"{termino}:*" for termino in terminos)
+        consulta = func.to_tsquery(literal_column(f"'{FTS_CONFIG_PG}'"), prefijos)
+        vector = literal_column("products.search_vector")
+        query = query.filter(vector.op("@@")(consulta)).order_by(
+            func.ts_rank_cd(vector, consulta).desc(), ProductDB.id
+        )
+    elif dialecto == "sqlite":
+        # Peso 10 para coincidencias en el nombre y 1 en la descripción
+        fts = table("products_fts", column("rowid"))
+        query = query.join(fts, fts.c.rowid == ProductDB.id).filter(text("products_fts MATCH :q")).order_by(
+            text("bm25(products_fts, 10.0, 1.0)"), ProductDB.id
+        ).params(q=" ".join(f'"{termino}"*' for termino in terminos))
+    else:
+        query = query.filter(and_(*(
+            or_(ProductDB.nombre.ilike(f"%{termino}%"), ProductDB.descripcion.ilike(f"%{termino}%"))
+            for termino in terminos
+        ))).order_by(ProductDB.id)
+
+    return query.limit(limit).offset(offset)
 
 def producto_en_stock(db: Session, id: int) -> bool:
     """Verificar si un producto tiene stock disponible"""
@@ -32,8 +213,26 @@ def producto_en_stock(db: Session, id: int) -> bool:
         return True
     return False
 
-def actualizar_stock(db: Session, id: int, quantity: int) -> Optional[ProductDB]:
-    """Actualizar el stock de un producto.
+def _ajustar_stock_caliente(db: Session, id: int, quantity: int) -> Optional[ProductResponse]:
+    """Ajuste en memoria de un producto caliente (ver app/stock_caliente.py).
+
+    La copia devuelta tiene el stock reservado; ``version`` y ``updated_at``
+    cambian recién cuando se vuelca.
+    """
+    disponible = registro_stock_caliente.ajustar(db, id, quantity)
+    if disponible is None:
+        return None
+    product = obtener_producto(db, id)
+    return product.model_copy(update={"stock": disponible}) if product else None
+
+def actualizar_stock(db: Session, id: int, quantity: int) -> Optional[Union[ProductDB, ProductResponse]]:
+    """Actualizar el stock de un producto con un único UPDATE condicional.
+    
+    El ajuste se hace en la base de datos (``stock = stock + quantity``) solo si
+    el resultado no es negativo, así dos llamadas concurrentes no pierden
+    actualizaciones ni dejan el stock bajo cero. Si el motor soporta
+    ``RETURNING`` la fila actualizada vuelve en la misma sentencia. Los
+    productos calientes se ajustan en memoria y se vuelcan por lotes.
     
     Args:
         db: Sesión de base de datos
@@ -41,24 +240,179 @@ def actualizar_stock(db: Session, id: int, quantity: int) -> Optional[ProductDB]
         quantity: Cantidad a sumar (positivo) o restar (negativo)
         
     Returns:
-        Product actualizado si fue exitoso, None si no se pudo actualizar
+        Product actualizado si fue exitoso, None si el producto no existe
+
+    Raises:
+        StockInsuficienteError: si el stock quedaría negativo
+        ColaStockLlenaError: si el producto es caliente y sus volcados no avanzan
     """
-    product = buscar_prod_int(db, id)
-    if product:
-        nuevo_stock = product.stock + quantity
-        if nuevo_stock >= 0:
-            product.stock = nuevo_stock
-            product.updated_at = datetime.now(timezone.utc)
-            db.commit()
-            db.refresh(product)
-            return product
+    if registro_stock_caliente.es_caliente(id):
+        return _ajustar_stock_caliente(db, id, quantity)
+    stmt = (
+        update(ProductDB)
+        .where(ProductDB.id == id, ProductDB.stock + quantity >= 0)
+        .values(stock=ProductDB.stock + quantity, version=ProductDB.version + 1)
+    )
+    if db.get_bind().dialect.update_returning:
+        product = db.execute(
+            stmt.returning(ProductDB),
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        ).scalar_one_or_none()
+        if product is not None:
+            DeltaCategorias().ajuste_stock(product.categoria, product.precio, quantity).aplicar(db)
+            # Separarlo de la sesión para que el commit no lo expire y no haga falta un refresh
+            db.expunge(product)
+        db.commit()
+    else:
+        result = db.execute(stmt, execution_options={"synchronize_session": False})
+        if result.rowcount:
+            categoria, precio = db.execute(
+                select(ProductDB.categoria, ProductDB.precio).where(ProductDB.id == id)
+            ).one()
+            DeltaCategorias().ajuste_stock(categoria, precio, quantity).aplicar(db)
+        db.commit()
+        product = buscar_prod_int(db, id) if result.rowcount else None
+
+    if product is None:
+        # Solo en el caso de fallo se consulta si el producto existe
+        if buscar_prod_int(db, id) is None:
+            return None
+        raise StockInsuficienteError("Stock insuficiente para el ajuste solicitado")
+    _cachear(product)
+    _invalidar_listados(product.categoria)
+    return product
+
+def reservar_stock_lote(db: Session, deltas: list[tuple[int, int]]) -> tuple[list[ProductDB], list[dict]]:
+    """Aplicar varios ajustes de stock en una sola transacción (todo o nada).
+
+    Los IDs repetidos se suman, las filas se bloquean en orden de ID
+    (``SELECT ... FOR UPDATE``) para que dos lotes concurrentes no se
+    bloqueen mutuamente, y el ajuste se aplica con un único UPDATE.
+
+    Args:
+        db: Sesión de base de datos
+        deltas: Pares (id, quantity) a aplicar
+
+    Returns:
+        (productos actualizados, errores por producto). Si hay errores no se
+        aplica ningún ajuste y la lista de productos queda vacía.
+
+    Raises:
+        ConflictoVersionError: si otro escritor cambió el stock durante cada
+            uno de los ``INTENTOS_RESERVA`` intentos
+    """
+    with registro_stock_caliente.excluir(id for id, _ in deltas):
+        for _ in range(INTENTOS_RESERVA):
+            resultado = _reservar_stock_lote(db, deltas)
+            if resultado is not None:
+                return resultado
+    raise ConflictoVersionError(f"El stock cambió durante la reserva ({INTENTOS_RESERVA} intentos)")
+
+def _reservar_stock_lote(
+    db: Session, deltas: list[tuple[int, int]]
+) -> Optional[tuple[list[ProductDB], list[dict]]]:
+    """Un intento de ``reservar_stock_lote``; None si otro escritor se adelantó"""
+    totales: dict[int, int] = {}
+    for id, quantity in deltas:
+        totales[id] = totales.get(id, 0) + quantity
+    ids = sorted(totales)
+
+    filas = db.execute(
+        select(ProductDB.id, ProductDB.stock)
+        .where(ProductDB.id.in_(ids))
+        .order_by(ProductDB.id)
+        .with_for_update()
+    ).all()
+    stock_actual = {id: stock for id, stock in filas}
+
+    errores = []
+    for id in ids:
+        if id not in stock_actual:
+            errores.append({"id": id, "quantity": totales[id], "error": "no_encontrado"})
+        elif stock_actual[id] + totales[id] < 0:
+            errores.append({
+                "id": id,
+                "quantity": totales[id],
+                "error": "stock_insuficiente",
+                "stock_disponible": stock_actual[id],
+            })
+    if errores:
+        db.rollback()
+        return [], errores
+
+    delta = case(totales, value=ProductDB.id)
+    # La condición se repite en el UPDATE por si el motor no soporta FOR UPDATE (SQLite)
+    stmt = (
+        update(ProductDB)
+        .where(ProductDB.id.in_(ids), ProductDB.stock + delta >= 0)
+        .values(stock=ProductDB.stock + delta, version=ProductDB.version + 1)
+    )
+    if db.get_bind().dialect.update_returning:
+        productos = db.execute(
+            stmt.returning(ProductDB),
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        ).scalars().all()
+        actualizados = len(productos)
+    else:
+        actualizados = db.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+        productos = None
+
+    if actualizados != len(ids):
+        # Otro escritor cambió el stock entre la lectura y el UPDATE: reevaluar
+        db.rollback()
         return None
-    return None
+
+    if productos is None:
+        productos = db.query(ProductDB).filter(ProductDB.id.in_(ids)).order_by(ProductDB.id).all()
+    estadisticas = DeltaCategorias()
+    for product in productos:
+        estadisticas.ajuste_stock(product.categoria, product.precio, totales[product.id])
+    estadisticas.aplicar(db)
+    for product in productos:
+        db.expunge(product)
+    db.commit()
+    for product in productos:
+        _cachear(product)
+    _invalidar_listados(*(product.categoria for product in productos))
+    return sorted(productos, key=lambda p: p.id), []
 
 def obtener_todos_productos(db: Session) -> list[ProductDB]:
     """Obtener todos los productos de la base de datos"""
     return db.query(ProductDB).all()
 
+def consulta_productos_pagina(db: Session, limit: int, after: Optional[int] = None) -> Query:
+    """Consulta de una página de productos ordenada por ID (paginación por cursor).
+
+    Args:
+        db: Sesión de base de datos
+        limit: Cantidad máxima de productos a devolver
+        after: ID del último producto de la página anterior (None para la primera)
+    """
+    query = db.query(ProductDB)
+    if after is not None:
+        query = query.filter(ProductDB.id > after)
+    return query.order_by(ProductDB.id).limit(limit)
+
+def iterar_productos(db: Session, after: Optional[int] = None, chunk_size: int = 500) -> Iterator[ProductDB]:
+    """Recorrer los productos por bloques sin cargar toda la tabla en memoria.
+
+    Usa ``yield_per`` para leer las filas en bloques de ``chunk_size``
+    con un cursor del servidor cuando el driver lo soporta.
+    """
+    query = db.query(ProductDB)
+    if after is not None:
+        query = query.filter(ProductDB.id > after)
+    yield from query.order_by(ProductDB.id).yield_per(chunk_size)
+
+def iterar_filas_productos(
+    db: Session, after: Optional[int] = None, chunk_size: int = 500, campos: tuple[str, ...] = CAMPOS
+) -> Iterator[Row]:
+    """Como ``iterar_productos`` pero con filas planas de ``campos`` (ver app/serializacion.py)"""
+    query = db.query(ProductDB)
+    if after is not None:
+        query = query.filter(ProductDB.id > after)
+    yield from consulta_filas(query.order_by(ProductDB.id), campos).yield_per(chunk_size)
+
 def crear_producto(db: Session, product: Product) -> ProductDB:
     """Crear un nuevo producto en la base de datos"""
     db_product = ProductDB(
@@ -70,8 +424,13 @@ def crear_producto(db: Session, product: Product) -> ProductDB:
     )
     try:
         db.add(db_product)
+        db.flush()
+        DeltaCategorias().alta(db_product.categoria, db_product.precio, db_product.stock).aplicar(db)
         db.commit()
         db.refresh(db_product)
+        _cachear(db_product)
+        _invalidar_listados(db_product.categoria)
+        indice_autocompletar.agregar(db_product.id, db_product.nombre)
         return db_product
     except IntegrityError:
         db.rollback()
@@ -80,24 +439,61 @@ def crear_producto(db: Session, product: Product) -> ProductDB:
 
 def eliminar_producto(db: Session, id: int) -> bool:
     """Eliminar un producto por su ID"""
-    product = buscar_prod_int(db, id)
-    if product:
-        db.delete(product)
-        db.commit()
-        return True
-    return False
+    with registro_stock_caliente.excluir((id,)):
+        product = buscar_prod_int(db, id)
+        if product:
+            categoria = product.categoria
+            db.delete(product)
+            db.flush()
+            DeltaCategorias().baja(categoria, product.precio, product.stock).aplicar(db)
+            db.commit()
+            cache.productos.delete(id)
+            _invalidar_listados(categoria)
+            indice_autocompletar.quitar(id)
+            return True
+        return False
 
-def actualizar_producto(db: Session, id: int, product: Product) -> Optional[ProductDB]:
-    """Actualizar un producto existente completamente"""
-    db_product = buscar_prod_int(db, id)
-    if db_product:
-        db_product.nombre = product.nombre
-        db_product.descripcion = product.descripcion
-        db_product.precio = product.precio
-        db_product.categoria = product.categoria
-        db_product.stock = product.stock
-        db_product.updated_at = datetime.now(timezone.utc)
-        db.commit()
-        db.refresh(db_product)
-        return db_product
-    return None
\ No newline at end of file
+def actualizar_producto(
+    db: Session, id: int, product: Product, versiones: Optional[set[int]] = None
+) -> Optional[ProductDB]:
+    """Actualizar un producto existente completamente.
+
+    El UPDATE lleva ``AND version = :v`` (contador de versión del ORM), así una
+    escritura concurrente entre la lectura y el UPDATE no se pierde en
+    silencio. La lectura previa es la que ya hacía falta para los deltas de
+    ``categoria_stats``.
+
+    Args:
+        versiones: versiones aceptadas (las del If-Match); None acepta cualquiera
+
+    Raises:
+        ConflictoVersionError: si la versión no es una de ``versiones`` o el
+            producto cambió antes del UPDATE
+    """
+    with registro_stock_caliente.excluir((id,)):
+        db_product = buscar_prod_int(db, id)
+        if db_product:
+            if versiones is not None and db_product.version not in versiones:
+                db.rollback()
+                raise ConflictoVersionError(f"El producto {id} cambió (versión actual {db_product.version})")
+            categoria_anterior = db_product.categoria
+            estadisticas = DeltaCategorias().baja(db_product.categoria, db_product.precio, db_product.stock)
+            db_product.nombre = product.nombre
+            db_product.descripcion = product.descripcion
+            db_product.precio = product.precio
+            db_product.categoria = product.categoria
+            db_product.stock = product.stock
+            db_product.updated_at = datetime.now(timezone.utc)
+            try:
+                db.flush()
+            except StaleDataError:
+                db.rollback()
+                raise ConflictoVersionError(f"El producto {id} fue modificado por otra escritura")
+            estadisticas.alta(db_product.categoria, db_product.precio, db_product.stock).aplicar(db)
+            db.commit()
+            db.refresh(db_product)
+            _cachear(db_product)
+            _invalidar_listados(categoria_anterior, db_product.categoria)
+            indice_autocompletar.agregar(db_product.id, db_product.nombre)
+            return db_product
+        return None
\ No newline at end of file
@@ -0,0 +1,358 @@
+"""Write-behind de stock para productos calientes.
+
+En una venta flash unos pocos productos reciben miles de ajustes de stock por
+segundo. Con ``actualizar_stock`` cada ajuste es un UPDATE y un commit sobre
+la misma fila, y todos hacen fila por el lock de esa fila.
+
+Los productos designados como calientes (``HOT_STOCK_IDS`` o
+``PUT /internal/stock_caliente/{id}``) ajustan un contador en memoria que
+mantiene el invariante stock >= 0. Un hilo vuelca los deltas acumulados a
+``products.stock`` cada ``HOT_STOCK_FLUSH_MS`` milisegundos: un UPDATE por
+producto y un solo commit por volcado, sin importar cuántos ajustes hubo.
+
+- Durabilidad: cada volcado es una transacción (stock, versión y
+  ``categoria_stats``). Si falla, los deltas vuelven al contador y se
+  reintentan. Al quitar la designación y al apagar la aplicación se vuelca
+  todo. Ante una caída del proceso se pierden a lo sumo los ajustes de un
+  intervalo, ya confirmados al cliente.
+- Límite: con ``HOT_STOCK_MAX_PENDIENTES`` ajustes sin volcar, quien ajusta
+  vuelca de forma sincrónica. Si aun así no baja (la base no responde) el
+  ajuste se rechaza con ``ColaStockLlenaError``.
+- Las demás escrituras de un producto caliente (PUT, reservas, borrado,
+  importación) pasan por ``excluir``: se vuelcan sus deltas, los ajustes
+  esperan y al terminar el contador se vuelve a leer de la base.
+- Un solo proceso: el contador se lee de la base una vez y solo ve los
+  ajustes de este proceso. Con varios workers, o con escrituras que no pasan
+  por ``excluir``, el contador se desincroniza. El volcado lleva
+  ``stock + delta >= 0``, así la base nunca queda con stock negativo: un
+  delta rechazado (o de un producto que ya no existe) se descarta junto con
+  su contador, que se vuelve a leer en el próximo ajuste. Esos ajustes ya se
+  habían confirmado al cliente y se cuentan en ``volcados_rechazados``.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app import cache
+from app.db import ProductDB
+from app.estadisticas import DeltaCategorias
+
+logger = logging.getLogger(__name__)
+
+HOT_STOCK_IDS = os.getenv("HOT_STOCK_IDS", "")
+HOT_STOCK_FLUSH_MS = float(os.getenv("HOT_STOCK_FLUSH_MS", "5"))
+HOT_STOCK_MAX_PENDIENTES = int(os.getenv("HOT_STOCK_MAX_PENDIENTES", "5000"))
+
+
+class StockInsuficienteError(ValueError):
+    """El ajuste de stock dejaría el producto con stock negativo"""
+
+
+class ColaStockLlenaError(RuntimeError):
+    """Hay demasiados ajustes sin volcar y el volcado sincrónico no pudo avanzar"""
+
+
+def parsear_ids(valor: str) -> set[int]:
+    """IDs separados por coma (formato de HOT_STOCK_IDS)"""
+    return {int(id) for id in valor.split(",") if id.strip()}
+
+
+class _Contador:
+    """Stock reservado en memoria de un producto caliente"""
+
+    __slots__ = ("disponible", "pendiente", "operaciones", "categoria", "precio")
+
+    def __init__(self, stock: int, categoria: str, precio):
+        self.disponible = stock
+        self.pendiente = 0
+        self.operaciones = 0
+        self.categoria = categoria
+        self.precio = precio
+
+
+class RegistroStockCaliente:
+    """Contadores de los productos calientes y el hilo que los vuelca, seguro entre hilos"""
+
+    def __init__(self, intervalo_ms: float = 5, max_pendientes: int = 5000):
+        self._lock = threading.Lock()
+        self._cambio = threading.Condition(self._lock)
+        self._lock_volcado = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        # Motor de la sesión que cargó los contadores; los volcados usan el mismo
+        self._engine: Optional[Engine] = None
+        self._contadores: dict[int, _Contador] = {}
+        self._excluidos: set[int] = set()
+        # Cambia al terminar cada exclusión: una carga que la cruzó se descarta
+        self._epoca = 0
+        self.intervalo = intervalo_ms / 1000
+        self.max_pendientes = max_pendientes
+        self.designados: set[int] = set()
+        self.pendientes = 0
+        self._reiniciar_metricas()
+
+    def _reiniciar_metricas(self):
+        self.ajustes = 0
+        self.volcados = 0
+        self.filas_volcadas = 0
+        self.ajustes_volcados = 0
+        self.volcados_sincronicos = 0
+        self.rechazos = 0
+        self.volcados_rechazados = 0
+        self.errores = 0
+        self.duracion_ultimo = 0.0
+        self.duracion_maxima = 0.0
+
+    def es_caliente(self, id: int) -> bool:
+        return id in self.designados
+
+    def designar(self, id: int):
+        """Pasar los ajustes de stock del producto a write-behind"""
+        with self._lock:
+            self.designados.add(id)
+        self._asegurar_hilo()
+
+    def quitar(self, id: int):
+        """Volver al ajuste directo en la base, después de volcar lo pendiente"""
+        with self._lock:
+            self.designados.discard(id)
+        while True:
+            # Un ajuste que ya había pasado por es_caliente puede sumar después del volcado
+            self.vaciar({id})
+            with self._lock_volcado, self._lock:
+                contador = self._contadores.get(id)
+                if contador is None or not contador.operaciones:
+                    self._contadores.pop(id, None)
+                    return
+
+    def _asegurar_hilo(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._detener.clear()
+                self._hilo = threading.Thread(target=self._bucle, name="stock-caliente", daemon=True)
+                self._hilo.start()
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            if self.pendientes:
+                self.vaciar()
+
+    def detener(self):
+        """Detener el hilo y volcar todo lo pendiente (al apagar la aplicación)"""
+        self._detener.set()
+        hilo = self._hilo
+        if hilo is not None:
+            hilo.join()
+        self._hilo = None
+        self.vaciar()
+
+    def reiniciar(self):
+        """Detener, volcar y olvidar designaciones, contadores y métricas"""
+        self.detener()
+        with self._lock_volcado, self._lock:
+            self.designados.clear()
+            self._contadores.clear()
+            self.pendientes = 0
+            self._engine = None
+            self._reiniciar_metricas()
+
+    def _cargar(self, db: Session, id: int) -> bool:
+        """Leer el stock del producto para crear su contador (False si no existe)"""
+        with self._lock:
+            epoca = self._epoca
+        fila = db.execute(
+            select(ProductDB.stock, ProductDB.categoria, ProductDB.precio).where(ProductDB.id == id)
+        ).first()
+        if fila is None:
+            return False
+        with self._lock:
+            if self._engine is None:
+                self._engine = db.get_bind()
+            if id not in self._contadores and id not in self._excluidos and epoca == self._epoca:
+                self._contadores[id] = _Contador(*fila)
+        return True
+
+    def ajustar(self, db: Session, id: int, quantity: int) -> Optional[int]:
+        """Sumar ``quantity`` al stock reservado en memoria.
+
+        Returns:
+            El stock disponible después del ajuste, None si el producto no existe
+
+        Raises:
+            StockInsuficienteError: si el stock quedaría negativo
+            ColaStockLlenaError: si hay demasiados ajustes sin volcar
+        """
+        self._asegurar_hilo()
+        if self.pendientes >= self.max_pendientes:
+            with self._lock:
+                self.volcados_sincronicos += 1
+            self.vaciar()
+            if self.pendientes >= self.max_pendientes:
+                with self._lock:
+                    self.rechazos += 1
+                raise ColaStockLlenaError(f"Hay {self.pendientes} ajustes de stock sin volcar")
+        while True:
+            with self._cambio:
+                while id in self._excluidos:
+                    self._cambio.wait()
+                contador = self._contadores.get(id)
+                if contador is not None:
+                    if contador.disponible + quantity < 0:
+                        raise StockInsuficienteError("Stock insuficiente para el ajuste solicitado")
+                    contador.disponible += quantity
+                    contador.pendiente += quantity
+                    contador.operaciones += 1
+                    self.pendientes += 1
+                    self.ajustes += 1
+                    return contador.disponible
+            if not self._cargar(db, id):
+                return None
+
+    def vaciar(self, ids: Optional[set[int]] = None) -> bool:
+        """Volcar a la base los deltas pendientes (de ``ids`` o de todos).
+
+        Returns:
+            False si el volcado falló (los deltas quedan para el próximo)
+        """
+        with self._lock_volcado:
+            with self._lock:
+                lote = {}
+                for id, contador in self._contadores.items():
+                    if contador.operaciones and (ids is None or id in ids):
+                        lote[id] = (contador.pendiente, contador.operaciones, contador.categoria, contador.precio)
+                        contador.pendiente = 0
+                        contador.operaciones = 0
+                operaciones = sum(ops for _, ops, _, _ in lote.values())
+                self.pendientes -= operaciones
+                engine = self._engine
+            if not lote:
+                return True
+
+            inicio = time.perf_counter()
+            try:
+                rechazados = self._escribir(engine, lote)
+            except SQLAlchemyError:
+                logger.exception("No se pudo volcar el stock de %d productos calientes", len(lote))
+                with self._lock:
+                    # Los contadores solo se borran con _lock_volcado tomado: siguen ahí
+                    for id, (delta, ops, _, _) in lote.items():
+                        self._contadores[id].pendiente += delta
+                        self._contadores[id].operaciones += ops
+                    self.pendientes += operaciones
+                    self.errores += 1
+                return False
+            duracion = time.perf_counter() - inicio
+
+            if rechazados:
+                logger.warning(
+                    "Stock de productos calientes desincronizado con la base, se descartan sus contadores: %s",
+                    sorted(rechazados),
+                )
+                with self._lock:
+                    for id in rechazados:
+                        # Los ajustes posteriores al lote se calcularon sobre el mismo contador
+                        self.pendientes -= self._contadores.pop(id).operaciones
+                        self.volcados_rechazados += 1
+            for id in lote:
+                cache.productos.delete(id)
+            cache.generaciones.incrementar({categoria for _, _, categoria, _ in lote.values()})
+            with self._lock:
+                self.volcados += 1
+                self.filas_volcadas += len(lote)
+                self.ajustes_volcados += operaciones
+                self.duracion_ultimo = duracion
+                self.duracion_maxima = max(self.duracion_maxima, duracion)
+            return True
+
+    def _escribir(self, engine: Engine, lote: dict[int, tuple]) -> set[int]:
+        """Aplicar los deltas en una sola transacción.
+
+        Returns:
+            IDs cuyo delta no se aplicó: el producto ya no existe o su stock
+            en la base quedaría negativo
+        """
+        tabla = ProductDB.__table__
+        stmt = (
+            update(tabla)
+            .where(tabla.c.id == bindparam("b_id"), tabla.c.stock + bindparam("delta") >= 0)
+            .values(stock=tabla.c.stock + bindparam("delta"), version=tabla.c.version + 1)
+        )
+        rechazados = set()
+        estadisticas = DeltaCategorias()
+        with Session(engine) as db:
+            # Un UPDATE por producto, en orden de ID, para saber cuáles cambiaron
+            for id, (delta, _, categoria, precio) in sorted(lote.items()):
+                if not delta:
+                    continue
+                if db.execute(stmt, {"b_id": id, "delta": delta}).rowcount != 1:
+                    rechazados.add(id)
+                    continue
+                estadisticas.ajuste_stock(categoria, precio, delta)
+            estadisticas.aplicar(db)
+            db.commit()
+        return rechazados
+
+    @contextmanager
+    def excluir(self, ids: Iterable[int]):
+        """Escribir productos por fuera de los contadores.
+
+        Vuelca los deltas pendientes de los productos calientes de ``ids``,
+        hace esperar sus ajustes mientras dura el bloque y al salir descarta
+        los contadores para que se vuelvan a leer de la base. Debe usarse antes
+        de tomar locks de esas filas en la base (el volcado usa otra conexión).
+        """
+        with self._cambio:
+            calientes = set(ids) & self.designados
+            while calientes & self._excluidos:
+                self._cambio.wait()
+            self._excluidos |= calientes
+        try:
+            if calientes and not self.vaciar(calientes):
+                raise ColaStockLlenaError("No se pudo volcar el stock pendiente de los productos calientes")
+            yield
+        finally:
+            if calientes:
+                with self._lock_volcado, self._cambio:
+                    for id in calientes:
+                        contador = self._contadores.get(id)
+                        if contador is not None and not contador.operaciones:
+                            del self._contadores[id]
+                    self._excluidos -= calientes
+                    self._epoca += 1
+                    self._cambio.notify_all()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "designados": sorted(self.designados),
+                "intervalo_ms": self.intervalo * 1000,
+                "max_pendientes": self.max_pendientes,
+                "pendientes": self.pendientes,
+                "productos": [
+                    {"id": id, "disponible": contador.disponible, "pendiente": contador.pendiente}
+                    for id, contador in sorted(self._contadores.items())
+                ],
+                "ajustes": self.ajustes,
+                "volcados": self.volcados,
+                "filas_volcadas": self.filas_volcadas,
+                "ajustes_volcados": self.ajustes_volcados,
+                "volcados_sincronicos": self.volcados_sincronicos,
+                "rechazos": self.rechazos,
+                "volcados_rechazados": self.volcados_rechazados,
+                "errores": self.errores,
+                "ultimo_volcado_ms": self.duracion_ultimo * 1000,
+                "volcado_maximo_ms": self.duracion_maxima * 1000,
+            }
+
+
+registro = RegistroStockCaliente(HOT_STOCK_FLUSH_MS, HOT_STOCK_MAX_PENDIENTES)
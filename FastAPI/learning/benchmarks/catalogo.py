@@ -0,0 +1,35 @@
+"""Catálogos sintéticos reproducibles para los benchmarks.
+
+Los productos los genera ``seed_data.sembrar`` con una semilla fija (mismo
+tamaño y semilla = mismo catálogo); el catálogo se reutiliza entre corridas
+si ya tiene la cantidad de filas pedida y nadie lo modificó. Los escenarios de
+escritura lo modifican, así que la corrida siguiente lo vuelve a generar.
+"""
+from sqlalchemy import Engine, func, select
+
+from app.db import Base, ProductDB
+from seed_data import sembrar
+
+
+def catalogo_intacto(engine: Engine, filas: int) -> bool:
+    """True si la tabla tiene ``filas`` productos tal como los cargó ``sembrar``.
+
+    Los IDs de una carga son consecutivos y empiezan en la versión 1: un alta
+    o una baja rompe la secuencia y cualquier modificación sube la versión.
+    """
+    with engine.connect() as conn:
+        cantidad, min_id, max_id, max_version = conn.execute(
+            select(func.count(), func.min(ProductDB.id), func.max(ProductDB.id), func.max(ProductDB.version))
+        ).one()
+    return cantidad == filas and (cantidad == 0 or (max_id - min_id + 1 == cantidad and max_version == 1))
+
+def preparar_catalogo(engine: Engine, filas: int, semilla: int = 42, regenerar: bool = False) -> int:
+    """Crear las tablas y cargar el catálogo si no está ya intacto con ``filas`` productos.
+
+    Returns:
+        Cantidad de productos en la tabla
+    """
+    Base.metadata.create_all(bind=engine)
+    if not regenerar and catalogo_intacto(engine, filas):
+        return filas
+    return sembrar(engine, filas, semilla, reemplazar=True)
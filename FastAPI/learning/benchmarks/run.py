@@ -0,0 +1,282 @@
+"""Benchmark de las rutas de productos, en proceso, sobre el transporte ASGI de httpx.
+
+Genera (o reutiliza) un catálogo sintético, ejecuta cada escenario con
+``--concurrencia`` clientes simultáneos y reporta peticiones por segundo,
+latencias p50/p95/p99, RSS máximo del proceso y sentencias SQL por petición
+(leídas del header ``Server-Timing``, ver app/metricas.py).
+
+Uso:
+
+    python -m benchmarks.run --filas 10000 --concurrencia 8 --guardar-baseline benchmarks/baseline.json
+    python -m benchmarks.run --filas 10000 --concurrencia 8 --baseline benchmarks/baseline.json
+
+Con ``--baseline`` el proceso termina con código 1 si algún escenario
+empeora más que ``--tolerancia`` (p95 o throughput) o emite más sentencias SQL.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import re
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+ESCENARIOS_ESCRITURA = {
+    "actualizar_stock", "reservar_stock", "crear_producto", "reemplazar_producto", "eliminar_producto",
+}
+_CONSULTAS = re.compile(r'desc="(\d+) consultas"')
+
+
+class Contexto:
+    """Datos del catálogo que usan los escenarios para armar sus peticiones"""
+
+    def __init__(self, min_id: int, max_id: int, nombres: list[str], categorias: list[str], cursor_cambios: int = 0):
+        self.min_id = min_id
+        self.max_id = max_id
+        self.nombres = nombres
+        self.categorias = categorias
+        self.cursor_cambios = cursor_cambios
+        # IDs creados por "crear_producto", que "eliminar_producto" borra después
+        self.creados: list[int] = []
+
+    def id(self, rnd: random.Random) -> int:
+        return rnd.randint(self.min_id, self.max_id)
+
+
+Escenario = Callable[[httpx.AsyncClient, random.Random, Contexto], Awaitable[httpx.Response]]
+
+
+def _producto(r: random.Random, x: Contexto) -> dict:
+    return {
+        "nombre": f"Benchmark {r.randrange(10**9)}",
+        "precio": round(r.uniform(1, 2000), 2),
+        "categoria": r.choice(x.categorias),
+        "stock": r.randint(0, 500),
+    }
+
+async def _crear_producto(c: httpx.AsyncClient, r: random.Random, x: Contexto) -> httpx.Response:
+    response = await c.post("/productos", json=_producto(r, x))
+    if response.status_code == 201:
+        x.creados.append(response.json()["id"])
+    return response
+
+async def _eliminar_producto(c: httpx.AsyncClient, r: random.Random, x: Contexto) -> httpx.Response:
+    # Sin productos creados quedan IDs del catálogo (los ya borrados responden 404)
+    id = x.creados.pop() if x.creados else x.id(r)
+    return await c.delete(f"/productos/{id}")
+
+ESCENARIOS: dict[str, Escenario] = {
+    "listado_paginado": lambda c, r, x: c.get("/productos", params={"limit": 100, "after": x.id(r)}),
+    "producto_por_id": lambda c, r, x: c.get(f"/productos/{x.id(r)}"),
+    "stock_por_id": lambda c, r, x: c.get(f"/productos/{x.id(r)}/stock"),
+    "buscar_nombre": lambda c, r, x: c.get(f"/productos/buscar/nombre/{r.choice(x.nombres)}"),
+    "categoria": lambda c, r, x: c.get(f"/productos/categoria/{r.choice(x.categorias)}"),
+    "rango_precio": lambda c, r, x: c.get(
+        "/productos/rango_precio/", params={"min_price": (p := r.randint(1, 1990)), "max_price": p + 5}
+    ),
+    "bajo_stock": lambda c, r, x: c.get("/productos/low_stock", params={"threshold": 2}),
+    "busqueda_texto": lambda c, r, x: c.get("/productos/search", params={"q": r.choice(x.nombres).split()[1]}),
+    "autocompletar": lambda c, r, x: c.get("/productos/autocompletar", params={"q": r.choice(x.nombres)[:3]}),
+    "estadisticas": lambda c, r, x: c.get("/productos/stats"),
+    "listado_stream": lambda c, r, x: c.get(
+        "/productos", params={"stream": "ndjson", "after": max(x.min_id, x.max_id - 1000)}
+    ),
+    "lote_por_id": lambda c, r, x: c.post("/productos/batch", json={"ids": [x.id(r) for _ in range(50)]}),
+    "cambios": lambda c, r, x: c.get(
+        "/productos/changes", params={"since": r.randint(max(0, x.cursor_cambios - 1000), x.cursor_cambios)}
+    ),
+    "actualizar_stock": lambda c, r, x: c.patch(f"/productos/{x.id(r)}/actualizar_stock", params={"quantity": 1}),
+    "reservar_stock": lambda c, r, x: c.post(
+        "/productos/reservar_stock", json={"items": [{"id": x.id(r), "quantity": 1} for _ in range(3)]}
+    ),
+    "crear_producto": _crear_producto,
+    "reemplazar_producto": lambda c, r, x: c.put(f"/productos/{x.id(r)}", json=_producto(r, x)),
+    "eliminar_producto": _eliminar_producto,
+}
+
+
+def percentil(valores: list[float], p: float) -> float:
+    """Percentil por rango más cercano (valores ya ordenados)"""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, math.ceil(p / 100 * len(valores)) - 1))
+    return valores[indice]
+
+def rss_maximo_mb() -> float:
+    """RSS máximo del proceso hasta el momento"""
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo informa en KiB, macOS en bytes
+    return maximo / (1024 * 1024) if sys.platform == "darwin" else maximo / 1024
+
+async def ejecutar_escenario(
+    cliente: httpx.AsyncClient,
+    escenario: Escenario,
+    contexto: Contexto,
+    peticiones: int,
+    concurrencia: int,
+    semilla: int,
+) -> dict:
+    """Ejecutar ``peticiones`` peticiones repartidas entre ``concurrencia`` clientes"""
+    latencias: list[float] = []
+    consultas: list[int] = []
+    errores = 0
+    restantes = peticiones
+
+    async def trabajador(numero: int):
+        nonlocal restantes, errores
+        rnd = random.Random(semilla * 1000 + numero)
+        while restantes > 0:
+            restantes -= 1
+            inicio = time.perf_counter()
+            response = await escenario(cliente, rnd, contexto)
+            latencias.append(time.perf_counter() - inicio)
+            if response.status_code >= 500:
+                errores += 1
+            coincidencia = _CONSULTAS.search(response.headers.get("server-timing", ""))
+            if coincidencia:
+                consultas.append(int(coincidencia.group(1)))
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador(i) for i in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        "peticiones": len(latencias),
+        "errores": errores,
+        "rps": round(len(latencias) / duracion, 2) if duracion else 0.0,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 3),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 3),
+        "consultas_por_peticion": round(sum(consultas) / len(consultas), 3) if consultas else None,
+        "rss_max_mb": round(rss_maximo_mb(), 1),
+    }
+
+def comparar(actual: dict, baseline: dict, tolerancia: float = 0.2) -> list[str]:
+    """Regresiones de ``actual`` respecto de ``baseline`` (lista vacía si no hay)"""
+    regresiones = []
+    for nombre, resultado in actual["escenarios"].items():
+        base = baseline.get("escenarios", {}).get(nombre)
+        if base is None:
+            continue
+        if base["p95_ms"] and resultado["p95_ms"] > base["p95_ms"] * (1 + tolerancia):
+            regresiones.append(f"{nombre}: p95 {base['p95_ms']} ms -> {resultado['p95_ms']} ms")
+        if base["rps"] and resultado["rps"] < base["rps"] * (1 - tolerancia):
+            regresiones.append(f"{nombre}: throughput {base['rps']} -> {resultado['rps']} peticiones/s")
+        if (base["consultas_por_peticion"] is not None and resultado["consultas_por_peticion"] is not None
+                and resultado["consultas_por_peticion"] > base["consultas_por_peticion"] + 0.01):
+            regresiones.append(
+                f"{nombre}: sentencias SQL por petición {base['consultas_por_peticion']} -> "
+                f"{resultado['consultas_por_peticion']}"
+            )
+        if resultado["errores"] > base["errores"]:
+            regresiones.append(f"{nombre}: errores {base['errores']} -> {resultado['errores']}")
+    return regresiones
+
+def _contexto(engine) -> Contexto:
+    from sqlalchemy import func, select
+    from app.db import ProductChangeDB, ProductDB
+
+    with engine.connect() as conn:
+        min_id, max_id = conn.execute(select(func.min(ProductDB.id), func.max(ProductDB.id))).one()
+        nombres = list(conn.scalars(select(ProductDB.nombre).order_by(ProductDB.id).limit(1000)))
+        categorias = list(conn.scalars(select(ProductDB.categoria).distinct()))
+        cursor_cambios = conn.scalar(select(func.max(ProductChangeDB.id))) or 0
+    return Contexto(min_id, max_id, nombres, categorias, cursor_cambios)
+
+async def ejecutar(args) -> dict:
+    """Preparar el catálogo y correr los escenarios pedidos"""
+    # DATABASE_URL debe estar definida antes de importar la aplicación
+    os.environ["DATABASE_URL"] = args.database_url
+    import sqlalchemy
+    from app.db import engine
+    from app.main import app
+    from benchmarks.catalogo import preparar_catalogo
+
+    nombres = args.escenarios.split(",") if args.escenarios else list(ESCENARIOS)
+    if not args.escrituras:
+        nombres = [n for n in nombres if n not in ESCENARIOS_ESCRITURA]
+    # Las lecturas se miden antes de que las escrituras modifiquen el catálogo
+    nombres.sort(key=lambda nombre: nombre in ESCENARIOS_ESCRITURA)
+
+    inicio = time.perf_counter()
+    filas = preparar_catalogo(engine, args.filas, args.semilla, args.regenerar)
+    print(f"✓ Catálogo de {filas} productos listo en {time.perf_counter() - inicio:.1f} s")
+    contexto = _contexto(engine)
+    resultados = {}
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://benchmark") as cliente:
+        for nombre in nombres:
+            escenario = ESCENARIOS[nombre]
+            # Calentamiento: caches, índices en memoria y pool
+            await ejecutar_escenario(cliente, escenario, contexto, args.concurrencia, args.concurrencia, args.semilla)
+            resultados[nombre] = await ejecutar_escenario(
+                cliente, escenario, contexto, args.peticiones, args.concurrencia, args.semilla
+            )
+            r = resultados[nombre]
+            print(
+                f"  {nombre:<18} {r['rps']:>9.1f} req/s  p50 {r['p50_ms']:>8.2f} ms  "
+                f"p95 {r['p95_ms']:>8.2f} ms  p99 {r['p99_ms']:>8.2f} ms  "
+                f"SQL/req {r['consultas_por_peticion']}  RSS {r['rss_max_mb']} MB"
+            )
+    return {
+        "meta": {
+            "fecha": datetime.now(timezone.utc).isoformat(),
+            "filas": filas,
+            "concurrencia": args.concurrencia,
+            "peticiones": args.peticiones,
+            "dialecto": engine.dialect.name,
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "plataforma": platform.platform(),
+        },
+        "escenarios": resultados,
+    }
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark de la API de productos")
+    parser.add_argument("--filas", type=int, default=10_000, help="Tamaño del catálogo (p. ej. 10000, 100000, 1000000)")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--peticiones", type=int, default=500, help="Peticiones por escenario")
+    parser.add_argument("--escenarios", help=f"Lista separada por comas (por defecto todos: {', '.join(ESCENARIOS)})")
+    parser.add_argument("--escrituras", action=argparse.BooleanOptionalAction, default=True,
+                        help="Incluir los escenarios que modifican el stock")
+    parser.add_argument("--database-url", help="Por defecto sqlite:///./benchmark_<filas>.db")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--regenerar", action="store_true", help="Volver a cargar el catálogo aunque ya exista")
+    parser.add_argument("--salida", default="benchmarks/resultados.json")
+    parser.add_argument("--baseline", help="Resultados contra los que comparar")
+    parser.add_argument("--guardar-baseline", help="Guardar también los resultados como baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Empeoramiento admitido (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    args.database_url = args.database_url or f"sqlite:///./benchmark_{args.filas}.db"
+
+    resultados = asyncio.run(ejecutar(args))
+    for destino in filter(None, [args.salida, args.guardar_baseline]):
+        Path(destino).parent.mkdir(parents=True, exist_ok=True)
+        Path(destino).write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"✓ Resultados guardados en {destino}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if baseline["meta"]["filas"] != resultados["meta"]["filas"]:
+            print("⚠ El baseline se midió con otro tamaño de catálogo")
+        regresiones = comparar(resultados, baseline, args.tolerancia)
+        for regresion in regresiones:
+            print(f"✗ {regresion}")
+        if regresiones:
+            sys.exit(1)
+        print("✓ Sin regresiones respecto del baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compara la serialización de listados: ORM + ProductResponse contra la vía rápida.
+
+Carga (o reutiliza) un catálogo sintético, lee ``--filas`` productos y mide
+varias repeticiones de cada camino, desde la consulta hasta los bytes JSON:
+
+- orm: objetos ``ProductDB`` validados con ``ProductResponse`` (el camino anterior)
+- rapida: filas planas de app/serializacion.py codificadas con orjson
+
+Uso:
+
+    python -m benchmarks.serializacion --filas 10000 --repeticiones 20
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import Callable, Optional
+
+
+def medir(funcion: Callable[[], bytes], repeticiones: int) -> tuple[float, bytes]:
+    """Mediana de la duración (segundos) y el resultado de la última corrida"""
+    duraciones = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duraciones.append(time.perf_counter() - inicio)
+    return statistics.median(duraciones), resultado
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark de la serialización de listados")
+    parser.add_argument("--filas", type=int, default=10_000, help="Productos por listado")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--database-url", help="Por defecto sqlite:///./benchmark_<filas>.db")
+    args = parser.parse_args(argv)
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///./benchmark_{args.filas}.db"
+
+    from pydantic import TypeAdapter
+    from app import serializacion
+    from app.db import ProductDB, SessionLocal, engine
+    from app.models import ProductResponse
+    from benchmarks.catalogo import preparar_catalogo
+
+    preparar_catalogo(engine, args.filas)
+    lista = TypeAdapter(list[ProductResponse])
+
+    with SessionLocal() as db:
+        consulta = db.query(ProductDB).order_by(ProductDB.id).limit(args.filas)
+
+        def orm() -> bytes:
+            # expunge_all: cada corrida paga la carga al identity map, como una petición nueva
+            db.expunge_all()
+            return lista.dump_json(lista.validate_python(consulta.all(), from_attributes=True))
+
+        def rapida() -> bytes:
+            return serializacion.json_productos(serializacion.consulta_filas(consulta).all())
+
+        duracion_orm, json_orm = medir(orm, args.repeticiones)
+        duracion_rapida, json_rapido = medir(rapida, args.repeticiones)
+
+    encoder = "orjson" if serializacion.orjson is not None else "json"
+    print(f"Listado de {args.filas} productos ({args.repeticiones} repeticiones, mediana):")
+    print(f"  orm + ProductResponse   {duracion_orm * 1000:9.2f} ms")
+    print(f"  filas planas + {encoder:<8} {duracion_rapida * 1000:9.2f} ms")
+    print(f"  aceleración             {duracion_orm / duracion_rapida:9.2f}x")
+    print(f"  mismo JSON: {'sí' if json_orm == json_rapido else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
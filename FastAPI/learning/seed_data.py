@@ -1,98 +1,330 @@
 """
-Script para poblar la base de datos con datos de prueba
+Script para poblar la base de datos con un catálogo sintético
+
+Genera N productos deterministas (misma semilla = mismo catálogo) con
+distribuciones realistas de categoría, precio y stock. La generación corre en
+varios procesos por bloques y la carga usa el camino más rápido del dialecto:
+
+- PostgreSQL: ``COPY ... FROM STDIN`` (CSV) con el trigger del registro de
+  cambios desactivado; el registro se escribe una vez al final
+- SQLite: un ``executemany`` por bloque en una sola transacción, con pragmas
+  de carga masiva; el índice FTS y el registro de cambios se escriben una vez al final
+- Otros: ``INSERT`` por lotes con SQLAlchemy
+
+Uso:
+
+    python seed_data.py --filas 1000000 --reemplazar
+    python seed_data.py --filas 5000 --semilla 7 --procesos 2 --fecha-base 2026-06-30
 """
-from app.db import SessionLocal, ProductDB
+import argparse
+import bisect
+import csv
+import io
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Iterator, Optional
+
+from sqlalchemy import Engine, func, insert, select, text, true
+
+# Categoría: (peso relativo, precio mediano, dispersión del precio, productos)
+CATEGORIAS = {
+    "Periféricos": (18, 45, 0.6, ["Teclado", "Mouse", "Webcam", "Alfombrilla", "Joystick"]),
+    "Audio": (12, 60, 0.8, ["Audífonos", "Parlante", "Micrófono", "Barra de sonido"]),
+    "Almacenamiento": (10, 80, 0.7, ["Disco SSD", "Disco duro", "Memoria USB", "Tarjeta microSD"]),
+    "Componentes": (10, 150, 0.9, ["Procesador", "Tarjeta gráfica", "Placa madre", "Memoria RAM", "Fuente de poder"]),
+    "Cables": (9, 12, 0.5, ["Cable HDMI", "Cable USB-C", "Cable de red", "Extensión"]),
+    "Pantallas": (8, 220, 0.5, ["Monitor", "Pantalla", "Proyector"]),
+    "Redes": (7, 70, 0.6, ["Router", "Switch", "Access point", "Adaptador WiFi"]),
+    "Portátiles": (6, 900, 0.4, ["Notebook", "Ultrabook", "Laptop gamer"]),
+    "Energía": (5, 90, 0.7, ["UPS", "Regleta", "Cargador", "Batería externa"]),
+    "Gaming": (5, 70, 0.9, ["Control", "Silla gamer", "Volante"]),
+    "Tablets": (4, 350, 0.5, ["Tablet", "Lector de libros"]),
+    "Impresión": (4, 180, 0.6, ["Impresora", "Tóner", "Escáner"]),
+    "Servidores": (1, 2500, 0.5, ["Servidor rack", "NAS"]),
+}
+MARCAS = ["Nova", "Kron", "Altix", "Vexa", "Lumen", "Orbis", "Tecno", "Zenda", "Pulsar", "Andes"]
+ADJETIVOS = ["inalámbrico", "compacto", "profesional", "ergonómico", "portátil", "silencioso", "de alto rendimiento"]
+
+COLUMNAS = ["nombre", "descripcion", "precio", "categoria", "stock", "created_at", "updated_at"]
+# Fecha desde la que se generan created_at/updated_at (fija, para que el catálogo no
+# dependa del día en que se carga)
+FECHA_BASE = datetime(2026, 1, 1)
+# Filas por bloque: la unidad de trabajo de cada proceso (no depende de --procesos,
+# así el catálogo es el mismo con cualquier cantidad de procesos)
+BLOQUE = 50_000
+
+_NOMBRES_CATEGORIA = list(CATEGORIAS)
+_PESOS_ACUMULADOS = list(accumulate(peso for peso, *_ in CATEGORIAS.values()))
+
+# Pragmas de carga masiva (se restauran al terminar: la conexión vuelve al pool)
+PRAGMAS_SQLITE = {
+    "synchronous": "OFF",
+    "journal_mode": "MEMORY",
+    "temp_store": "MEMORY",
+    "cache_size": "-262144",
+}
+
+
+def _dias(base: datetime) -> list[str]:
+    """Fechas (YYYY-MM-DD) del último año, desde ``base`` hacia atrás"""
+    return [(base - timedelta(days=dias)).strftime("%Y-%m-%d") for dias in range(366)]
+
+def generar_bloque(bloque: int, inicio: int, fin: int, semilla: int, base: datetime, formato: str = "tuplas"):
+    """Generar los productos ``inicio..fin-1`` (corre en un proceso del pool).
+
+    Cada producto es una tupla en el orden de COLUMNAS. El bucle evita
+    ``random.choice`` y ``strftime`` por fila: es lo que domina el tiempo.
+
+    Returns:
+        Lista de tuplas, o el bloque como texto CSV si ``formato == "csv"``
+    """
+    rnd = random.Random(semilla * 1_000_003 + bloque)
+    azar, gauss = rnd.random, rnd.gauss
+    exp, floor, log = math.exp, math.floor, math.log
+    dias = _dias(base)
+    letras = "ABCDEFGHKMRSTX"
+    categorias = [(nombre, log(mediana), dispersion, productos)
+                  for nombre, (_, mediana, dispersion, productos) in CATEGORIAS.items()]
+    total_pesos = _PESOS_ACUMULADOS[-1]
+    log_stock = log(60)
+
+    filas = []
+    for numero in range(inicio, fin):
+        categoria, mu, sigma, productos = categorias[bisect.bisect_right(_PESOS_ACUMULADOS, azar() * total_pesos)]
+        producto = productos[int(azar() * len(productos))]
+        marca = MARCAS[int(azar() * len(MARCAS))]
+
+        precio = min(max(exp(mu + sigma * gauss()), 0.5), 99_999)
+        # La mayoría de los precios terminan en ,99
+        precio = floor(precio) + 0.99 if azar() < 0.6 else precio
+
+        sorteo = azar()
+        if sorteo < 0.05:
+            stock = 0
+        elif sorteo < 0.15:
+            stock = 1 + int(azar() * 10)
+        else:
+            stock = min(int(exp(log_stock + 0.8 * gauss())) + 11, 5000)
+
+        segundos = int(azar() * 86_400)
+        fecha = (f"{dias[int(azar() * 365)]} {segundos // 3600:02d}:{segundos // 60 % 60:02d}:"
+                 f"{segundos % 60:02d}.000000")
+        filas.append((
+            f"{producto} {marca} {letras[int(azar() * 14)]}{numero}",
+            f"{producto} {ADJETIVOS[int(azar() * len(ADJETIVOS))]} de {marca}, "
+            f"garantía de {(6, 12, 24)[int(azar() * 3)]} meses",
+            f"{precio:.2f}",
+            categoria,
+            stock,
+            fecha,
+            fecha,
+        ))
+    if formato != "csv":
+        return filas
+    salida = io.StringIO()
+    csv.writer(salida).writerows(filas)
+    return salida.getvalue()
+
+def _bloques(filas: int, inicio: int) -> list[tuple[int, int, int]]:
+    return [
+        (indice, inicio + desde, inicio + min(desde + BLOQUE, filas))
+        for indice, desde in enumerate(range(0, filas, BLOQUE))
+    ]
+
+def generar_productos(
+    filas: int,
+    semilla: int = 42,
+    procesos: int = 1,
+    formato: str = "tuplas",
+    base: Optional[datetime] = None,
+    inicio: int = 1,
+) -> Iterator:
+    """Generar el catálogo por bloques, en orden, con ``procesos`` procesos.
+
+    Las fechas van hasta un año antes de ``base`` (por defecto ``FECHA_BASE``).
+    """
+    base = base or FECHA_BASE
+    bloques = _bloques(filas, inicio)
+    if procesos <= 1 or len(bloques) == 1:
+        for indice, desde, hasta in bloques:
+            yield generar_bloque(indice, desde, hasta, semilla, base, formato)
+        return
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        yield from pool.map(
+            generar_bloque,
+            *zip(*bloques),
+            [semilla] * len(bloques),
+            [base] * len(bloques),
+            [formato] * len(bloques),
+        )
 
-def seed_database():
-    """Insertar productos de prueba en la base de datos"""
-    db = SessionLocal()
-    
+
+def _cargar_postgresql(engine: Engine, bloques: Iterator[str]):
+    from app.cambios import LOCK_CAMBIOS
+
+    conexion = engine.raw_connection()
     try:
-        # Verificar si ya hay productos
-        count = db.query(ProductDB).count()
-        if count > 0:
-            print(f"La base de datos ya tiene {count} productos.")
-            response = input("¿Deseas eliminar todos y recargar? (s/n): ")
-            if response.lower() == 's':
-                db.query(ProductDB).delete()
-                db.commit()
-                print("✓ Productos eliminados")
-            else:
-                print("Cancelado.")
-                return
-        
-        # Productos de prueba
-        productos = [
-            ProductDB(
-                nombre="Teclado mecánico",
-                descripcion="Teclado mecánico con switches azules y retroiluminación RGB",
-                precio=249.99,
-                categoria="Periféricos",
-                stock=15
-            ),
-            ProductDB(
-                nombre="Mouse inalámbrico",
-                descripcion="Mouse ergonómico inalámbrico con sensor óptico de alta precisión",
-                precio=89.5,
-                categoria="Periféricos",
-                stock=30
-            ),
-            ProductDB(
-                nombre="Monitor 24 pulgadas",
-                descripcion="Monitor Full HD de 24 pulgadas con panel IPS",
-                precio=699.99,
-                categoria="Pantallas",
-                stock=8
-            ),
-            ProductDB(
-                nombre="Disco SSD 1TB",
-                descripcion="Unidad de estado sólido SSD de 1TB para alto rendimiento",
-                precio=459.0,
-                categoria="Almacenamiento",
-                stock=20
-            ),
-            ProductDB(
-                nombre="Audífonos gaming",
-                descripcion="Audífonos gaming con micrófono y sonido envolvente",
-                precio=179.99,
-                categoria="Audio",
-                stock=0  # Producto agotado
-            ),
-            ProductDB(
-                nombre="Laptop Gaming",
-                descripcion="Laptop de alto rendimiento con RTX 4060 y 16GB RAM",
-                precio=1299.99,
-                categoria="Computadoras",
-                stock=5
-            ),
-            ProductDB(
-                nombre="Webcam HD",
-                descripcion="Cámara web Full HD con micrófono incorporado",
-                precio=79.99,
-                categoria="Periféricos",
-                stock=12
+        with conexion.cursor() as cursor:
+            # El trigger diferido del registro de cambios correría una vez por fila al
+            # confirmar, tomando el lock cada vez: se desactiva durante el COPY (en la
+            # misma transacción; ALTER TABLE bloquea la tabla hasta el commit) y el
+            # registro se escribe al final con un solo INSERT ... SELECT, como en SQLite
+            cursor.execute(
+                "SELECT 1 FROM pg_trigger WHERE tgrelid = 'products'::regclass AND tgname = 'products_changes'"
             )
-        ]
-        
-        # Insertar productos
-        db.add_all(productos)
-        db.commit()
-        
-        print(f"✓ Se insertaron {len(productos)} productos exitosamente")
-        
-        # Mostrar productos insertados
-        print("\nProductos en la base de datos:")
-        print("-" * 80)
-        all_products = db.query(ProductDB).all()
-        for p in all_products:
-            print(f"ID: {p.id:2} | {p.nombre:30} | ${p.precio:8.2f} | Stock: {p.stock:3}")
-        
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        db.rollback()
+            cambios = cursor.fetchone() is not None
+            if cambios:
+                cursor.execute("ALTER TABLE products DISABLE TRIGGER products_changes")
+            cursor.execute("SELECT coalesce(max(id), 0) FROM products")
+            ultimo_id = cursor.fetchone()[0]
+            for bloque in bloques:
+                cursor.copy_expert(
+                    f"COPY products ({', '.join(COLUMNAS)}) FROM STDIN WITH (FORMAT csv)", io.StringIO(bloque)
+                )
+            if cambios:
+                cursor.execute("ALTER TABLE products ENABLE TRIGGER products_changes")
+                cursor.execute(LOCK_CAMBIOS)
+                cursor.execute(
+                    "INSERT INTO product_changes (product_id, eliminado) "
+                    "SELECT id, false FROM products WHERE id > %s ORDER BY id",
+                    (ultimo_id,),
+                )
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
     finally:
-        db.close()
+        conexion.close()
+
+def _cargar_sqlite(engine: Engine, bloques: Iterator[list[tuple]], reemplazar: bool = False):
+    conexion = engine.raw_connection()
+    cursor = conexion.cursor()
+    anteriores = {nombre: cursor.execute(f"PRAGMA {nombre}").fetchone()[0] for nombre in PRAGMAS_SQLITE}
+    try:
+        for nombre, valor in PRAGMAS_SQLITE.items():
+            cursor.execute(f"PRAGMA {nombre} = {valor}")
+        # Índices secundarios y triggers de FTS se quitan durante la carga: construir
+        # cada índice una vez al final es mucho más rápido que mantenerlo fila a fila
+        objetos = cursor.execute(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE tbl_name = 'products' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+        ).fetchall()
+        fts = any(tipo == "trigger" and nombre.startswith("products_fts") for tipo, nombre, _ in objetos)
+        # El registro de cambios también se escribe una vez, con INSERT ... SELECT
+        cambios = any(tipo == "trigger" and nombre.startswith("products_changes") for tipo, nombre, _ in objetos)
+        cursor.execute("BEGIN")
+        for tipo, nombre, _ in objetos:
+            cursor.execute(f'DROP {tipo.upper()} "{nombre}"')
+        if reemplazar:
+            if cambios:
+                cursor.execute("INSERT INTO product_changes (product_id, eliminado) SELECT id, 1 FROM products")
+            cursor.execute("DELETE FROM products")
+        ultimo_id = cursor.execute("SELECT coalesce(max(id), 0) FROM products").fetchone()[0]
+        marcadores = ", ".join("?" for _ in COLUMNAS)
+        for bloque in bloques:
+            cursor.executemany(f"INSERT INTO products ({', '.join(COLUMNAS)}) VALUES ({marcadores})", bloque)
+        for _, _, sql in objetos:
+            cursor.execute(sql)
+        if fts:
+            cursor.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+        if cambios:
+            cursor.execute(
+                "INSERT INTO product_changes (product_id, eliminado) SELECT id, 0 FROM products WHERE id > ? ORDER BY id",
+                (ultimo_id,),
+            )
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    finally:
+        for nombre, valor in anteriores.items():
+            cursor.execute(f"PRAGMA {nombre} = {valor}")
+        conexion.close()
+
+def _cargar_generico(engine: Engine, bloques: Iterator[list[tuple]]):
+    from app.db import ProductDB
+
+    with engine.begin() as conn:
+        for bloque in bloques:
+            conn.execute(insert(ProductDB), [dict(zip(COLUMNAS, fila)) for fila in bloque])
+
+def sembrar(
+    engine: Engine,
+    filas: int,
+    semilla: int = 42,
+    procesos: Optional[int] = None,
+    reemplazar: bool = False,
+    fecha_base: Optional[datetime] = None,
+) -> int:
+    """Cargar ``filas`` productos sintéticos y reconstruir las estadísticas.
+
+    Args:
+        engine: Motor de la base de datos destino (las tablas deben existir)
+        filas: Cantidad de productos a generar
+        semilla: Semilla del generador
+        procesos: Procesos de generación (por defecto, uno por CPU)
+        reemplazar: Borrar antes los productos existentes
+        fecha_base: Fecha más reciente de created_at/updated_at (por defecto ``FECHA_BASE``)
+
+    Returns:
+        Cantidad de productos en la tabla al terminar
+    """
+    from app.cambios import LOCK_CAMBIOS
+    from app.db import ProductChangeDB, ProductDB
+    from app.estadisticas import reconstruir
+    from sqlalchemy.orm import Session
+
+    procesos = procesos or os.cpu_count() or 1
+    dialecto = engine.dialect.name
+    with engine.begin() as conn:
+        # En SQLite el borrado va en la misma transacción que la carga, sin triggers
+        if reemplazar and dialecto == "postgresql":
+            # TRUNCATE no dispara los triggers por fila: los tombstones se escriben antes,
+            # con el mismo lock que los triggers para no desordenar los cursores
+            conn.execute(text(LOCK_CAMBIOS))
+            conn.execute(insert(ProductChangeDB).from_select(["product_id", "eliminado"], select(ProductDB.id, true())))
+            conn.execute(text("TRUNCATE products"))
+        elif reemplazar and dialecto != "sqlite":
+            conn.execute(ProductDB.__table__.delete())
+        # Los números de los nombres siguen a los productos existentes
+        inicio = 1 if reemplazar else (conn.scalar(select(func.count()).select_from(ProductDB)) or 0) + 1
+
+    if dialecto == "postgresql":
+        _cargar_postgresql(engine, generar_productos(filas, semilla, procesos, "csv", base=fecha_base, inicio=inicio))
+    elif dialecto == "sqlite":
+        _cargar_sqlite(engine, generar_productos(filas, semilla, procesos, base=fecha_base, inicio=inicio), reemplazar)
+    else:
+        _cargar_generico(engine, generar_productos(filas, semilla, procesos, base=fecha_base, inicio=inicio))
+
+    with Session(engine) as db:
+        reconstruir(db)
+        return db.scalar(select(func.count()).select_from(ProductDB))
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Poblar la base de datos con productos sintéticos")
+    parser.add_argument("--filas", type=int, default=1000, help="Cantidad de productos a generar")
+    parser.add_argument("--semilla", type=int, default=42, help="Misma semilla, mismo catálogo")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos de generación (por defecto, uno por CPU)")
+    parser.add_argument("--reemplazar", action="store_true", help="Borrar los productos existentes antes de cargar")
+    parser.add_argument("--fecha-base", type=datetime.fromisoformat, default=FECHA_BASE,
+                        help=f"Fecha más reciente de los productos, YYYY-MM-DD (por defecto {FECHA_BASE.date()})")
+    args = parser.parse_args(argv)
+
+    from app.db import engine
 
-if __name__ == "__main__":
     print("🌱 Poblando base de datos...")
-    seed_database()
+    inicio = time.perf_counter()
+    total = sembrar(engine, args.filas, args.semilla, args.procesos, args.reemplazar, args.fecha_base)
+    duracion = time.perf_counter() - inicio
+    print(f"✓ Se insertaron {args.filas} productos en {duracion:.1f} s "
+          f"({args.filas / duracion:,.0f} filas/s). Total en la tabla: {total}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,22 @@
+import os
 import pytest
+import pytest_asyncio
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+
+# Los tests consultan /internal/*, que por defecto no se monta
+os.environ.setdefault("INTERNAL_ROUTES", "True")
+
 from app.main import app
-from app.db import Base, get_db
+from app.async_routes import router as async_router
+from app.db import Base, get_db, get_async_db
+from app import cache
+from app.autocompletar import indice as indice_autocompletar
+from app.stock_caliente import registro as registro_stock_caliente
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
@@ -12,6 +25,15 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+@pytest.fixture(autouse=True)
+def limpiar_cache():
+    """Vaciar las caches entre tests (cada test usa una BD nueva)"""
+    cache.productos.clear()
+    cache.respuestas.clear()
+    indice_autocompletar.invalidar()
+    registro_stock_caliente.reiniciar()
+    yield
+
 @pytest.fixture(scope="function")
 def db_session():
     """crea una base de datos de para cada test"""
@@ -34,5 +56,36 @@ def client(db_session):
 
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as test_client:
+        # El arranque construye el índice con DATABASE_URL; los tests usan su propia BD
+        indice_autocompletar.invalidar()
+        yield test_client
+    app.dependency_overrides.clear()
+
+ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test_async.db"
+
+@pytest_asyncio.fixture(scope="function")
+async def async_db_session():
+    """crea una base de datos async para cada test"""
+    async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    async with AsyncTestingSessionLocal() as db:
+        yield db
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await async_engine.dispose()
+
+@pytest_asyncio.fixture(scope="function")
+async def async_client(async_db_session):
+    """Crea un cliente httpx sobre las rutas async con la sesión de prueba"""
+    async_app = FastAPI()
+    async_app.include_router(async_router)
+
+    async def override_get_async_db():
+        yield async_db_session
+
+    async_app.dependency_overrides[get_async_db] = override_get_async_db
+    transport = ASGITransport(app=async_app)
+    async with AsyncClient(transport=transport, base_url="http://test") as test_client:
         yield test_client
-    app.dependency_overrides.clear()
\ No newline at end of file
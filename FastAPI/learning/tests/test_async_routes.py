@@ -0,0 +1,154 @@
+import pytest
+from app.db import ProductDB, async_database_url
+
+
+def test_async_database_url():
+    """Test: elegir el driver async según el esquema de DATABASE_URL"""
+    assert async_database_url("postgresql://u:p@localhost/bd") == "postgresql+asyncpg://u:p@localhost/bd"
+    assert async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    assert async_database_url("sqlite+aiosqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    with pytest.raises(ValueError):
+        async_database_url("mysql://u:p@localhost/bd")
+
+
+@pytest.mark.asyncio
+async def test_async_crear_y_obtener_producto(async_client):
+    """Test: POST y GET /productos/{id} por la ruta async"""
+    nuevo_producto = {
+        "nombre": "Laptop Async",
+        "descripcion": "Laptop de prueba",
+        "precio": 999.99,
+        "categoria": "Electrónica",
+        "stock": 10
+    }
+    response = await async_client.post("/productos", json=nuevo_producto)
+    assert response.status_code == 201
+    producto_id = response.json()["id"]
+
+    response = await async_client.get(f"/productos/{producto_id}")
+    assert response.status_code == 200
+    assert response.json()["nombre"] == "Laptop Async"
+
+    response = await async_client.get("/productos/999")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_async_actualizar_stock_y_eliminar(async_client, async_db_session):
+    """Test: PATCH stock y DELETE por la ruta async"""
+    producto = ProductDB(nombre="Audífonos", precio=50.0, categoria="Audio", stock=10)
+    async_db_session.add(producto)
+    await async_db_session.commit()
+
+    response = await async_client.patch(f"/productos/{producto.id}/actualizar_stock?quantity=-4")
+    assert response.status_code == 200
+    assert response.json()["stock"] == 6
+
+    response = await async_client.patch(f"/productos/{producto.id}/actualizar_stock?quantity=-40")
+    assert response.status_code == 409
+
+    response = await async_client.delete(f"/productos/{producto.id}")
+    assert response.status_code == 204
+
+
+@pytest.mark.asyncio
+async def test_async_productos_stream(async_client, async_db_session):
+    """Test: GET /productos?stream=ndjson por la ruta async"""
+    for i in range(3):
+        async_db_session.add(ProductDB(nombre=f"Producto {i}", precio=10, categoria="Test", stock=1))
+    await async_db_session.commit()
+
+    response = await async_client.get("/productos?stream=ndjson")
+    assert response.status_code == 200
+    assert len(response.text.strip().split("\n")) == 3
+
+
+@pytest.mark.asyncio
+async def test_async_estadisticas(async_client):
+    """Test: las escrituras async mantienen /productos/stats"""
+    response = await async_client.post("/productos", json={"nombre": "A", "precio": 10, "categoria": "Test", "stock": 3})
+    producto_id = response.json()["id"]
+    await async_client.post("/productos", json={"nombre": "B", "precio": 30, "categoria": "Test", "stock": 1})
+    await async_client.patch(f"/productos/{producto_id}/actualizar_stock?quantity=2")
+    await async_client.delete(f"/productos/{producto_id}")
+
+    response = await async_client.get("/productos/stats")
+    assert response.json() == [{
+        "categoria": "Test", "productos": 1, "unidades": 1, "valor_inventario": 30.0,
+        "precio_min": 30.0, "precio_max": 30.0, "precio_promedio": 30.0,
+    }]
+
+
+@pytest.mark.asyncio
+async def test_async_put_con_if_match_y_conflicto(async_client, async_db_session, monkeypatch):
+    """Test: PUT async responde 412 con un If-Match viejo y 409 si otra escritura se adelanta"""
+    from sqlalchemy import update
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from app import async_services
+
+    producto = ProductDB(nombre="Mouse", precio=20, categoria="Accesorios", stock=10)
+    async_db_session.add(producto)
+    await async_db_session.commit()
+    id = producto.id
+    cambios = {"nombre": "Mouse", "precio": 25, "categoria": "Accesorios", "stock": 10}
+
+    response = await async_client.put(f"/productos/{id}", json=cambios, headers={"If-Match": f'"{id}-v1"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'"{id}-v2"'
+    response = await async_client.put(f"/productos/{id}", json=cambios, headers={"If-Match": f'"{id}-v1"'})
+    assert response.status_code == 412
+
+    leer = async_services.buscar_prod_int
+
+    async def leer_y_modificar(db, id):
+        db_product = await leer(db, id)
+        async with AsyncSession(async_db_session.bind) as otra:
+            await otra.execute(update(ProductDB).where(ProductDB.id == id).values(version=ProductDB.version + 1))
+            await otra.commit()
+        return db_product
+
+    monkeypatch.setattr(async_services, "buscar_prod_int", leer_y_modificar)
+    response = await async_client.put(f"/productos/{id}", json={**cambios, "precio": 1})
+    assert response.status_code == 409
+
+
+def test_modo_async_no_quita_rutas():
+    """Test: con ASYNC_DB=True la aplicación tiene las mismas rutas y solo cambian las escrituras"""
+    from fastapi import FastAPI
+    from app.async_routes import ESCRITURAS_ASYNC
+    from app.main import incluir_rutas
+
+    tablas = {}
+    for async_db in (False, True):
+        app = FastAPI()
+        incluir_rutas(app, async_db)
+        tablas[async_db] = {
+            (ruta.path, metodo): ruta.endpoint.__module__
+            for ruta in app.routes if hasattr(ruta, "methods") for metodo in ruta.methods
+        }
+    assert tablas[True].keys() == tablas[False].keys()
+    assert ("/productos/search", "GET") in tablas[True]
+    asincronas = {clave for clave, modulo in tablas[True].items() if modulo == "app.async_routes"}
+    assert asincronas == ESCRITURAS_ASYNC
+
+
+@pytest.mark.asyncio
+async def test_escrituras_async_mantienen_caches_e_indice(async_client):
+    """Test: las escrituras async actualizan la cache, los listados y el autocompletado como las síncronas"""
+    from app import cache
+    from app.autocompletar import indice
+
+    indice.construir([])
+    generacion = cache.generaciones.catalogo()
+    response = await async_client.post(
+        "/productos", json={"nombre": "Parlante", "precio": 40, "categoria": "Audio", "stock": 2}
+    )
+    id = response.json()["id"]
+    assert cache.productos.get(id).nombre == "Parlante"
+    assert cache.generaciones.catalogo() != generacion
+    assert indice.buscar("parl") == [(id, "Parlante")]
+
+    assert (await async_client.delete(f"/productos/{id}")).status_code == 204
+    assert cache.productos.get(id) is None
+    assert indice.buscar("parl") == []
+    indice.invalidar()
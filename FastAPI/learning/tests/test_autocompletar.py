@@ -0,0 +1,74 @@
+import threading
+from app.autocompletar import IndicePrefijos, plegar
+from app.db import ProductDB
+
+
+def test_plegar():
+    """Test: minúsculas, sin acentos y espacios normalizados"""
+    assert plegar("  Audífonos   BLUETOOTH ") == "audifonos bluetooth"
+
+
+def test_indice_prefijos_busca_por_palabra():
+    """Test: el índice encuentra prefijos del nombre y de cada palabra"""
+    indice = IndicePrefijos()
+    indice.construir([(1, "Mouse inalámbrico"), (2, "Teclado inalámbrico"), (3, "Monitor 24")])
+
+    assert indice.buscar("mo") == [(3, "Monitor 24"), (1, "Mouse inalámbrico")]
+    assert {id for id, _ in indice.buscar("INAL")} == {1, 2}
+    assert indice.buscar("inal", k=1) == [(1, "Mouse inalámbrico")]
+    assert indice.buscar("xyz") == []
+
+    indice.agregar(1, "Ratón")
+    assert indice.buscar("mouse") == []
+    assert indice.buscar("raton") == [(1, "Ratón")]
+    indice.quitar(2)
+    assert indice.buscar("inal") == []
+    assert indice.memoria()["productos"] == 2
+
+
+def test_autocompletar_route(client, db_session):
+    """Test: GET /productos/autocompletar se mantiene al día con las escrituras"""
+    db_session.add(ProductDB(nombre="Audífonos gaming", precio=50, categoria="Audio", stock=3))
+    db_session.commit()
+
+    response = client.get("/productos/autocompletar?q=audi")
+    assert [s["nombre"] for s in response.json()] == ["Audífonos gaming"]
+
+    nuevo = {"nombre": "Audio interfaz", "precio": 150, "categoria": "Audio", "stock": 1}
+    nuevo_id = client.post("/productos", json=nuevo).json()["id"]
+    response = client.get("/productos/autocompletar?q=audi")
+    assert [s["nombre"] for s in response.json()] == ["Audífonos gaming", "Audio interfaz"]
+
+    client.delete(f"/productos/{nuevo_id}")
+    response = client.get("/productos/autocompletar?q=gam")
+    assert [s["nombre"] for s in response.json()] == ["Audífonos gaming"]
+    assert client.get("/internal/autocompletar").json()["productos"] == 1
+
+
+def test_construccion_unica_y_escrituras_durante_la_construccion():
+    """Test: una sola construcción a la vez y las altas/bajas que llegan mientras tanto no se pierden"""
+    indice = IndicePrefijos()
+    leyendo = threading.Event()
+    seguir = threading.Event()
+    construcciones = []
+
+    class Db:
+        def execute(self, consulta):
+            construcciones.append(1)
+            leyendo.set()
+            seguir.wait(5)
+            return [(1, "Mouse"), (2, "Monitor")]
+
+    hilos = [threading.Thread(target=indice.asegurar_construido, args=(Db(),)) for _ in range(3)]
+    for hilo in hilos:
+        hilo.start()
+    assert leyendo.wait(5)
+    # Confirmadas después de la lectura de la base
+    indice.agregar(3, "Micrófono")
+    indice.quitar(2)
+    seguir.set()
+    for hilo in hilos:
+        hilo.join()
+
+    assert construcciones == [1]
+    assert indice.buscar("m") == [(3, "Micrófono"), (1, "Mouse")]
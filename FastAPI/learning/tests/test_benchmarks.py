@@ -0,0 +1,49 @@
+from benchmarks.catalogo import catalogo_intacto
+from benchmarks.run import comparar, percentil
+
+
+def _resultado(rps, p95, consultas, errores=0):
+    return {"rps": rps, "p95_ms": p95, "consultas_por_peticion": consultas, "errores": errores}
+
+
+def test_percentil():
+    """Test: percentil por rango más cercano"""
+    valores = list(range(1, 101))
+    assert percentil(valores, 50) == 50
+    assert percentil(valores, 95) == 95
+    assert percentil(valores, 99) == 99
+    assert percentil([], 95) == 0.0
+
+
+def test_comparar_con_baseline():
+    """Test: se reportan peores latencias, menos throughput y más sentencias SQL"""
+    baseline = {"escenarios": {
+        "producto_por_id": _resultado(1000, 10.0, 1.0),
+        "categoria": _resultado(200, 50.0, 1.0),
+    }}
+    actual = {"escenarios": {
+        "producto_por_id": _resultado(950, 11.0, 1.0),
+        "categoria": _resultado(100, 80.0, 2.0),
+        "nuevo": _resultado(10, 1.0, 1.0),
+    }}
+    assert comparar(actual, baseline, tolerancia=0.2) == [
+        "categoria: p95 50.0 ms -> 80.0 ms",
+        "categoria: throughput 200 -> 100 peticiones/s",
+        "categoria: sentencias SQL por petición 1.0 -> 2.0",
+    ]
+
+
+def test_catalogo_modificado_se_regenera(client, db_session):
+    """Test: después de una escritura el catálogo deja de estar intacto"""
+    from seed_data import sembrar
+
+    engine = db_session.get_bind()
+    sembrar(engine, 50, semilla=3, procesos=1)
+    assert catalogo_intacto(engine, 50)
+    assert not catalogo_intacto(engine, 60)
+
+    id = client.get("/productos", params={"limit": 1}).json()[0]["id"]
+    client.patch(f"/productos/{id}/actualizar_stock", params={"quantity": 1})
+    assert not catalogo_intacto(engine, 50)
+    sembrar(engine, 50, semilla=3, procesos=1, reemplazar=True)
+    assert catalogo_intacto(engine, 50)
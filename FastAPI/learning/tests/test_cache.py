@@ -0,0 +1,64 @@
+from app import cache
+from app.cache import LRUTTLCache
+from app.db import ProductDB
+from app.models import Product
+from app.services import obtener_producto, actualizar_stock, actualizar_producto, eliminar_producto
+
+
+class RelojFalso:
+    def __init__(self):
+        self.ahora = 0.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_lru_ttl_cache_expira_y_desaloja():
+    """Test: la cache desaloja el menos usado y expira por TTL"""
+    reloj = RelojFalso()
+    lru = LRUTTLCache(max_entries=2, ttl=10, clock=reloj)
+    lru.set(1, "a")
+    lru.set(2, "b")
+    assert lru.get(1) == "a"
+    lru.set(3, "c")  # desaloja la clave 2 (la menos usada)
+    assert lru.get(2) is None
+    reloj.ahora = 11
+    assert lru.get(1) is None
+
+    stats = lru.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+
+
+def test_lru_ttl_cache_descarta_lectura_vieja():
+    """Test: una lectura iniciada antes de una escritura no se guarda"""
+    lru = LRUTTLCache()
+    token = lru.token()
+    lru.set(1, "nuevo")  # escritura concurrente
+    lru.set(1, "viejo", token)
+    assert lru.get(1) == "nuevo"
+
+
+def test_obtener_producto_usa_cache_e_invalida(db_session):
+    """Test: las lecturas se sirven de la cache y las escrituras la actualizan"""
+    producto = ProductDB(nombre="Mouse", precio=20, categoria="Periféricos", stock=10)
+    db_session.add(producto)
+    db_session.commit()
+
+    hits = cache.productos.stats()["hits"]
+    assert obtener_producto(db_session, producto.id).stock == 10
+    assert obtener_producto(db_session, producto.id).stock == 10
+    assert cache.productos.stats()["hits"] == hits + 1
+
+    actualizar_stock(db_session, producto.id, -3)
+    assert obtener_producto(db_session, producto.id).stock == 7
+
+    actualizar_producto(db_session, producto.id, Product(
+        nombre="Mouse Pro", precio=30, categoria="Periféricos", stock=4
+    ))
+    assert obtener_producto(db_session, producto.id).nombre == "Mouse Pro"
+
+    eliminar_producto(db_session, producto.id)
+    assert obtener_producto(db_session, producto.id) is None
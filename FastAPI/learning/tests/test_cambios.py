@@ -0,0 +1,112 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.cambios import Notificador, compactar, leer_cambios
+from app.db import ProductChangeDB, ProductDB
+from app.models import Product
+from app.services import crear_producto
+
+PRODUCTO = {"nombre": "Lámpara", "precio": 20, "categoria": "Hogar", "stock": 4}
+
+
+def test_feed_con_tombstones_y_paginacion(client, db_session):
+    """Test: el feed devuelve el estado actual de lo que cambió y tombstones de lo borrado"""
+    lampara = client.post("/productos", json=PRODUCTO).json()
+    mesa = client.post("/productos", json={**PRODUCTO, "nombre": "Mesa"}).json()
+    client.patch(f"/productos/{lampara['id']}/actualizar_stock", params={"quantity": -1})
+    client.delete(f"/productos/{mesa['id']}")
+
+    pagina = client.get("/productos/changes").json()
+    assert [(c["id"], c["eliminado"]) for c in pagina["cambios"]] == [(lampara["id"], False), (mesa["id"], True)]
+    assert pagina["cambios"][0]["producto"]["stock"] == 3
+    assert pagina["cambios"][1]["producto"] is None
+    assert pagina["cursor"] == pagina["cambios"][-1]["cursor"] and not pagina["hay_mas"]
+    assert client.get("/productos/changes", params={"since": pagina["cursor"]}).json()["cambios"] == []
+
+    # Cuatro cambios en el registro, de a dos por página
+    primera = client.get("/productos/changes", params={"limit": 2}).json()
+    assert [c["id"] for c in primera["cambios"]] == [lampara["id"], mesa["id"]] and primera["hay_mas"]
+    segunda = client.get("/productos/changes", params={"since": primera["cursor"], "limit": 2}).json()
+    assert [(c["id"], c["eliminado"]) for c in segunda["cambios"]] == [(lampara["id"], False), (mesa["id"], True)]
+    assert not segunda["hay_mas"]
+
+
+def test_compactar_conserva_el_feed(db_session):
+    """Test: compactar deja un cambio por producto y el feed no cambia"""
+    producto = crear_producto(db_session, Product(**PRODUCTO))
+    for nombre in ("Uno", "Dos", "Tres"):
+        db_session.get(ProductDB, producto.id).nombre = nombre
+        db_session.commit()
+    antes = leer_cambios(db_session, 0, 100)
+    assert db_session.query(ProductChangeDB).count() == 4
+
+    assert compactar(db_session) == 3
+    assert db_session.query(ProductChangeDB).count() == 1
+    assert leer_cambios(db_session, 0, 100) == antes
+    assert antes["cambios"][0]["producto"]["nombre"] == "Tres"
+
+
+def test_long_poll_espera_un_cambio(client, db_session):
+    """Test: con wait la petición responde cuando otra transacción confirma un cambio"""
+    cursor = client.get("/productos/changes").json()["cursor"]
+
+    def escribir():
+        time.sleep(0.2)
+        with Session(db_session.get_bind()) as db:
+            crear_producto(db, Product(**PRODUCTO))
+
+    hilo = threading.Thread(target=escribir)
+    hilo.start()
+    inicio = time.monotonic()
+    pagina = client.get("/productos/changes", params={"since": cursor, "wait": 5}).json()
+    hilo.join()
+    assert [c["producto"]["nombre"] for c in pagina["cambios"]] == ["Lámpara"]
+    assert 0.2 <= time.monotonic() - inicio < 5
+
+
+def test_notificador_despierta_desde_otro_hilo():
+    """Test: notificar desde otro hilo despierta la espera; sin commits vence el timeout"""
+    notificador = Notificador()
+
+    async def esperar():
+        threading.Timer(0.05, notificador.notificar).start()
+        despertado = await notificador.esperar(5)
+        return despertado, await notificador.esperar(0.05)
+
+    assert asyncio.run(esperar()) == (True, False)
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL no configurada")
+def test_cursor_sigue_el_orden_de_los_commits_postgresql():
+    """Test: un cambio que se confirma tarde recibe un cursor mayor que los ya servidos
+    (requiere TEST_POSTGRES_URL)"""
+    from app.db import Base
+
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    Base.metadata.create_all(engine)
+    try:
+        with Session(engine) as db:
+            primero = crear_producto(db, Product(**PRODUCTO)).id
+            segundo = crear_producto(db, Product(**{**PRODUCTO, "nombre": "Mesa"})).id
+            cursor = leer_cambios(db, 0, 100)["cursor"]
+            db.rollback()
+
+        with Session(engine) as lenta, Session(engine) as rapida, Session(engine) as lector:
+            # La transacción lenta escribe primero pero confirma al final
+            lenta.get(ProductDB, primero).stock = 1
+            lenta.flush()
+            rapida.get(ProductDB, segundo).stock = 2
+            rapida.commit()
+
+            pagina = leer_cambios(lector, cursor, 100)
+            lector.rollback()
+            assert [c["id"] for c in pagina["cambios"]] == [segundo]
+            lenta.commit()
+            assert [c["id"] for c in leer_cambios(lector, pagina["cursor"], 100)["cambios"]] == [primero]
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
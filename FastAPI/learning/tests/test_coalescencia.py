@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from app.coalescencia import Coalescedor
+
+
+def _concurrentes(coalescedor, funcion, cantidad=8):
+    """Lanzar ``cantidad`` llamadas con la misma clave mientras la líder está bloqueada"""
+    pool = ThreadPoolExecutor(cantidad)
+    futuros = [pool.submit(coalescedor.ejecutar, "clave", funcion) for _ in range(cantidad)]
+    pool.shutdown(wait=False)
+    return futuros
+
+
+def test_llamadas_concurrentes_comparten_una_ejecucion():
+    """Test: las llamadas superpuestas con la misma clave reciben el resultado de la líder"""
+    coalescedor = Coalescedor()
+    liberar = threading.Event()
+    llamadas = []
+
+    def consulta():
+        llamadas.append(1)
+        liberar.wait(5)
+        return {"id": 1}
+
+    futuros = _concurrentes(coalescedor, consulta)
+    while coalescedor.stats()["compartidas"] < 7:
+        threading.Event().wait(0.001)
+    liberar.set()
+
+    resultados = [futuro.result() for futuro in futuros]
+    assert len(llamadas) == 1
+    assert all(resultado is resultados[0] for resultado in resultados)
+    assert coalescedor.stats() == {"en_curso": 0, "ejecuciones": 1, "compartidas": 7, "esperas_vencidas": 0}
+
+    # Una llamada posterior vuelve a ejecutar
+    assert coalescedor.ejecutar("clave", lambda: "nuevo") == "nuevo"
+
+
+def test_error_de_la_lider_se_propaga():
+    """Test: si la líder falla, las que esperaban reciben la misma excepción"""
+    coalescedor = Coalescedor()
+    liberar = threading.Event()
+
+    def consulta():
+        liberar.wait(5)
+        raise RuntimeError("base de datos caída")
+
+    futuros = _concurrentes(coalescedor, consulta, 4)
+    while coalescedor.stats()["compartidas"] < 3:
+        threading.Event().wait(0.001)
+    liberar.set()
+
+    for futuro in futuros:
+        with pytest.raises(RuntimeError, match="caída"):
+            futuro.result()
+    assert coalescedor.stats()["en_curso"] == 0
+
+
+def test_espera_vencida_ejecuta_por_su_cuenta():
+    """Test: si la líder tarda más que espera_maxima, la llamada consulta sola"""
+    coalescedor = Coalescedor(espera_maxima=0.01)
+    liberar = threading.Event()
+    with ThreadPoolExecutor(1) as pool:
+        lider = pool.submit(coalescedor.ejecutar, "clave", lambda: liberar.wait(5) and "lider")
+        while coalescedor.stats()["en_curso"] == 0:
+            threading.Event().wait(0.001)
+        assert coalescedor.ejecutar("clave", lambda: "propio") == "propio"
+        liberar.set()
+        assert lider.result() == "lider"
+    assert coalescedor.stats()["esperas_vencidas"] == 1
+
+
+def test_lectura_posterior_a_una_escritura_no_comparte_la_consulta(db_session, monkeypatch):
+    """Test: obtener_producto no se suma a una consulta empezada antes de una escritura"""
+    from sqlalchemy.orm import Session
+    from app import cache, services
+    from app.models import Product
+
+    producto = services.crear_producto(db_session, Product(nombre="Mouse", precio=20, categoria="Accesorios", stock=1))
+    cache.productos.clear()
+    leyendo = threading.Event()
+    liberar = threading.Event()
+    leer = services.buscar_prod_int
+
+    def leer_lento(db, id):
+        db_product = leer(db, id)
+        if not leyendo.is_set():
+            leyendo.set()
+            liberar.wait(5)
+        return db_product
+
+    monkeypatch.setattr(services, "buscar_prod_int", leer_lento)
+    with ThreadPoolExecutor(1) as pool, Session(db_session.get_bind()) as otra:
+        lider = pool.submit(services.obtener_producto, otra, producto.id)
+        assert leyendo.wait(5)
+        services.actualizar_stock(db_session, producto.id, 5)
+        cache.productos.delete(producto.id)
+        assert services.obtener_producto(db_session, producto.id).stock == 6
+        liberar.set()
+        assert lider.result().stock == 1
+    # La lectura vieja no pisó a la nueva en la cache
+    assert cache.productos.get(producto.id).stock == 6
@@ -0,0 +1,43 @@
+import pytest
+from app.consultas_lentas import normalizar_sql, redactar_parametros, registro
+
+
+@pytest.fixture
+def registro_activo():
+    registro.limpiar()
+    registro.activar(0.000001)
+    yield registro
+    registro.desactivar()
+    registro.limpiar()
+
+
+def test_normalizar_sql():
+    """Test: los valores y las listas IN no cambian la forma de la consulta"""
+    assert normalizar_sql(
+        "SELECT * FROM products\n WHERE lower(nombre) = lower('Mouse') AND id IN (?, ?, ?) LIMIT 10"
+    ) == "SELECT * FROM products WHERE lower(nombre) = lower(?) AND id IN (?...) LIMIT ?"
+    assert normalizar_sql("UPDATE products SET stock=(stock + %(stock_1)s) WHERE products.id = %(id_1)s") == \
+        "UPDATE products SET stock=(stock + ?) WHERE products.id = ?"
+
+
+def test_redactar_parametros():
+    """Test: solo se guardan tipos y largos, nunca los valores"""
+    assert redactar_parametros(("secreto", 5, None)) == ["str(7)", "int", "NoneType"]
+    assert redactar_parametros({"nombre": "x"}) == {"nombre": "str(1)"}
+    assert redactar_parametros([(1,), (2,)], executemany=True) == {"filas": 2, "primera": ["int"]}
+
+
+def test_consultas_lentas_route(client, db_session, registro_activo):
+    """Test: las consultas sobre el umbral se listan con su ruta y su plan"""
+    client.get("/productos/categoria/Audio")
+    registro_activo.esperar()
+
+    datos = client.get("/internal/consultas_lentas").json()
+    assert datos["habilitado"] is True
+    consulta = next(c for c in datos["consultas"] if c["ruta"] == "/productos/categoria/{categoria}")
+    assert "lower(products.categoria) = lower(?)" in consulta["sql"]
+    assert consulta["parametros"] == ["str(5)"]
+    assert any("ix_products_categoria_lower" in paso for paso in consulta["plan"])
+
+    assert client.delete("/internal/consultas_lentas").status_code == 204
+    assert client.get("/internal/consultas_lentas").json()["consultas"] == []
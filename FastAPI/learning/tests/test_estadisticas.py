@@ -0,0 +1,71 @@
+import io
+import json
+from app.estadisticas import DeltaCategorias, obtener_estadisticas, reconstruir
+from app.importacion import importar_archivo
+from app.models import Product
+from app.services import (
+    actualizar_producto,
+    actualizar_stock,
+    crear_producto,
+    eliminar_producto,
+    reservar_stock_lote,
+)
+
+
+def _producto(nombre, precio, categoria, stock):
+    return Product(nombre=nombre, precio=precio, categoria=categoria, stock=stock)
+
+
+def _stats(db):
+    return [stats.model_dump() for stats in obtener_estadisticas(db)]
+
+
+def test_estadisticas_incrementales_coinciden_con_reconstruccion(db_session):
+    """Test: los deltas de cada escritura dejan la misma tabla que una reconstrucción"""
+    mouse = crear_producto(db_session, _producto("Mouse", 20, "Periféricos", 5))
+    teclado = crear_producto(db_session, _producto("Teclado", 45, "Periféricos", 2))
+    monitor = crear_producto(db_session, _producto("Monitor", 300, "Pantallas", 1))
+    crear_producto(db_session, _producto("Parlante", 80, "Audio", 4))
+
+    actualizar_stock(db_session, mouse.id, -3)
+    reservar_stock_lote(db_session, [(teclado.id, 3), (monitor.id, -1)])
+    # Cambio de categoría y de precio (el máximo de Periféricos se va)
+    actualizar_producto(db_session, teclado.id, _producto("Teclado", 60, "Audio", 5))
+    # El único producto de Pantallas se borra: la categoría desaparece
+    eliminar_producto(db_session, monitor.id)
+    lineas = [
+        json.dumps({"nombre": "Mouse", "precio": 10, "categoria": "Periféricos", "stock": 7}),
+        json.dumps({"nombre": "Webcam", "precio": 35, "categoria": "Periféricos", "stock": 1}),
+    ]
+    importar_archivo(db_session, io.StringIO("\n".join(lineas)), "ndjson", upsert=True)
+
+    incrementales = _stats(db_session)
+    assert incrementales == [
+        {"categoria": "Audio", "productos": 2, "unidades": 9, "valor_inventario": 620.0,
+         "precio_min": 60.0, "precio_max": 80.0, "precio_promedio": 70.0},
+        {"categoria": "Periféricos", "productos": 2, "unidades": 8, "valor_inventario": 105.0,
+         "precio_min": 10.0, "precio_max": 35.0, "precio_promedio": 22.5},
+    ]
+    assert reconstruir(db_session) == 2
+    assert _stats(db_session) == incrementales
+
+
+def test_estadisticas_route(client):
+    """Test: GET /productos/stats"""
+    client.post("/productos", json={"nombre": "A", "precio": 10, "categoria": "Test", "stock": 3})
+    client.post("/productos", json={"nombre": "B", "precio": 30, "categoria": "Test", "stock": 1})
+
+    response = client.get("/productos/stats")
+    assert response.status_code == 200
+    assert response.json() == [{
+        "categoria": "Test", "productos": 2, "unidades": 4, "valor_inventario": 60.0,
+        "precio_min": 10.0, "precio_max": 30.0, "precio_promedio": 20.0,
+    }]
+
+
+def test_delta_en_orden_de_categoria_y_sin_upsert():
+    """Test: las filas se actualizan en orden de categoría; sin upsert no hay sentencias"""
+    delta = DeltaCategorias().baja("Pantallas", 300, 1).alta("Audio", 300, 1)
+    upserts = [stmt for stmt in delta.sentencias("sqlite") if stmt.is_insert]
+    assert [stmt.compile().params["categoria"] for stmt in upserts] == ["Audio", "Pantallas"]
+    assert delta.sentencias("mysql") == []
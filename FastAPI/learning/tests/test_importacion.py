@@ -0,0 +1,73 @@
+import io
+import json
+from app.autocompletar import indice
+from app.db import ProductDB
+from app.importacion import importar_archivo
+
+
+def _producto(nombre, precio=10.0, stock=1, categoria="Test"):
+    return {"nombre": nombre, "descripcion": None, "precio": precio, "categoria": categoria, "stock": stock}
+
+
+def test_importar_ndjson_con_errores(db_session):
+    """Test: las filas inválidas se reportan sin abortar la carga"""
+    lineas = [
+        json.dumps(_producto("Producto 1")),
+        json.dumps(_producto("Producto 2", precio=-1)),
+        "{no es json",
+        "",
+        json.dumps(_producto("Producto 3")),
+    ]
+    resumen = importar_archivo(db_session, io.StringIO("\n".join(lineas)), "ndjson", batch_size=2)
+
+    assert resumen.insertados == 2
+    assert resumen.total_errores == 2
+    assert [e.fila for e in resumen.errores] == [2, 3]
+    assert db_session.query(ProductDB).count() == 2
+
+
+def test_importar_csv_upsert(db_session):
+    """Test: con upsert los productos con el mismo nombre se actualizan"""
+    db_session.add(ProductDB(nombre="Mouse", precio=20, categoria="Periféricos", stock=1))
+    db_session.commit()
+
+    archivo = io.StringIO(
+        "nombre,descripcion,precio,categoria,stock\n"
+        "Mouse,,25.5,Periféricos,7\n"
+        "Teclado,\"Mecánico, RGB\",100,Periféricos,3\n"
+        "Teclado,,110,Periféricos,4\n"
+    )
+    resumen = importar_archivo(db_session, archivo, "csv", upsert=True)
+
+    assert resumen.insertados == 1
+    assert resumen.actualizados == 2
+    assert resumen.total_errores == 0
+    productos = {p.nombre: p for p in db_session.query(ProductDB).all()}
+    assert len(productos) == 2
+    assert productos["Mouse"].stock == 7
+    assert productos["Teclado"].stock == 4
+
+
+def test_importar_invalida_autocompletar_una_vez(db_session, monkeypatch):
+    """Test: el índice de autocompletar se invalida una vez por importación, no por lote"""
+    llamadas = []
+    monkeypatch.setattr(indice, "invalidar", lambda: llamadas.append(1))
+    lineas = [json.dumps(_producto(f"Producto {i}")) for i in range(5)]
+    resumen = importar_archivo(db_session, io.StringIO("\n".join(lineas)), "ndjson", batch_size=2)
+
+    assert resumen.insertados == 5
+    assert len(llamadas) == 1
+
+
+def test_importar_upsert_sin_distinguir_mayusculas(db_session):
+    """Test: con upsert "mouse" actualiza el "Mouse" existente en vez de duplicarlo"""
+    db_session.add(ProductDB(nombre="Mouse", precio=20, categoria="Periféricos", stock=1))
+    db_session.commit()
+
+    lineas = [json.dumps(_producto("mouse", stock=9)), json.dumps(_producto("MOUSE PAD"))]
+    resumen = importar_archivo(db_session, io.StringIO("\n".join(lineas)), "ndjson", upsert=True)
+
+    assert resumen.insertados == 1
+    assert resumen.actualizados == 1
+    productos = db_session.query(ProductDB).order_by(ProductDB.id).all()
+    assert [(p.nombre, p.stock) for p in productos] == [("mouse", 9), ("MOUSE PAD", 1)]
@@ -0,0 +1,61 @@
+import os
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.dialects import postgresql
+from app.services import (
+    consulta_prod_bajo_stock,
+    consulta_prod_categoria,
+    consulta_prod_rango_precio,
+    filtro_nombre,
+)
+from app.db import ProductDB
+
+
+def _sql(query, dialect):
+    return str(query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+def _consultas(db):
+    return {
+        "ix_products_nombre_lower": db.query(ProductDB).filter(filtro_nombre("Mouse")),
+        "ix_products_categoria_lower": consulta_prod_categoria(db, "Periféricos"),
+        "ix_products_precio": consulta_prod_rango_precio(db, 10, 20),
+        "ix_products_stock_bajo": consulta_prod_bajo_stock(db, 5),
+    }
+
+
+def test_planes_sqlite_usan_indices(db_session):
+    """Test: EXPLAIN QUERY PLAN de SQLite usa un índice para cada filtro"""
+    for indice, query in _consultas(db_session).items():
+        sql = _sql(query, db_session.get_bind().dialect)
+        plan = " ".join(fila[-1] for fila in db_session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+        assert indice in plan, f"{indice} no aparece en el plan: {plan}"
+
+
+def test_sql_postgresql_coincide_con_indices(db_session):
+    """Test: el SQL para PostgreSQL usa las expresiones de los índices"""
+    dialect = postgresql.dialect()
+    consultas = _consultas(db_session)
+    assert "lower(products.nombre) = lower('Mouse')" in _sql(consultas["ix_products_nombre_lower"], dialect)
+    assert "lower(products.categoria) = lower('Periféricos')" in _sql(consultas["ix_products_categoria_lower"], dialect)
+    assert "products.stock <= 10" in _sql(consultas["ix_products_stock_bajo"], dialect)
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL no configurada")
+def test_planes_postgresql_usan_indices():
+    """Test: EXPLAIN de PostgreSQL usa un índice para cada filtro (requiere TEST_POSTGRES_URL)"""
+    from sqlalchemy.orm import Session
+    from app.db import Base
+
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    Base.metadata.create_all(engine)
+    try:
+        with Session(engine) as db:
+            db.execute(text("SET enable_seqscan = off"))
+            for indice, query in _consultas(db).items():
+                sql = _sql(query, engine.dialect)
+                plan = " ".join(fila[0] for fila in db.execute(text(f"EXPLAIN {sql}")))
+                assert indice in plan, f"{indice} no aparece en el plan: {plan}"
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
@@ -0,0 +1,35 @@
+from app.metricas import BUCKETS_LATENCIA, Histograma, registro
+
+
+def test_histograma_acumulados():
+    """Test: los buckets se exportan acumulados y terminan en +Inf"""
+    histograma = Histograma((0.1, 1.0))
+    for valor in (0.05, 0.1, 0.5, 3.0):
+        histograma.observar(valor)
+    assert histograma.acumulados() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert histograma.total == 4
+
+
+def test_server_timing_y_metrics(client, db_session):
+    """Test: Server-Timing por respuesta y series por plantilla de ruta en /metrics"""
+    registro.reiniciar()
+    producto_id = client.post(
+        "/productos", json={"nombre": "Test", "precio": 10, "categoria": "Test", "stock": 1}
+    ).json()["id"]
+
+    response = client.get(f"/productos/{producto_id}/stock")
+    assert response.status_code == 200
+    assert response.headers["server-timing"].startswith("db;dur=")
+    client.get("/productos/999999")
+
+    texto = client.get("/metrics").text
+    etiquetas = 'method="GET",route="/productos/{id}"'
+    assert f'http_requests_total{{{etiquetas},status="404"}} 1' in texto
+    assert f'http_request_duration_seconds_count{{{etiquetas}}} 1' in texto
+    assert f'http_request_duration_seconds_bucket{{{etiquetas},le="+Inf"}} 1' in texto
+    # Una sola sentencia: la búsqueda por ID
+    assert f'http_request_db_statements_bucket{{{etiquetas},le="0"}} 0' in texto
+    assert f'http_request_db_statements_bucket{{{etiquetas},le="1"}} 1' in texto
+    assert 'route="/productos/999999"' not in texto
+    assert len([l for l in texto.splitlines() if l.startswith("http_request_duration_seconds_bucket")]) == \
+        3 * (len(BUCKETS_LATENCIA) + 1)
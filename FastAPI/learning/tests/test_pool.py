@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.pool import PoolMedido, argumentos_engine, calentar_pool, configuracion_pool, metricas_pool
+
+
+def test_configuracion_pool_por_dialecto(monkeypatch):
+    """Test: valores por defecto por dialecto y variables de entorno"""
+    assert configuracion_pool("postgresql://u:p@localhost/bd")["pool_pre_ping"] is True
+    assert configuracion_pool("sqlite:///./app.db")["pool_pre_ping"] is False
+
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "False")
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "5000")
+    argumentos = argumentos_engine("postgresql://u:p@localhost/bd")
+    assert argumentos["pool_size"] == 20
+    assert argumentos["pool_pre_ping"] is False
+    assert argumentos["poolclass"] is PoolMedido
+    assert argumentos["connect_args"] == {"options": "-c statement_timeout=5000"}
+    assert argumentos_engine("postgresql://u:p@localhost/bd", async_engine=True)["connect_args"] == {
+        "server_settings": {"statement_timeout": "5000"}
+    }
+    # SQLite en memoria conserva su pool por defecto
+    assert argumentos_engine("sqlite://") == {}
+
+
+@pytest.mark.parametrize("variable, valor", [
+    ("DB_POOL_SIZE", "0"),
+    ("DB_MAX_OVERFLOW", "muchas"),
+    ("DB_POOL_TIMEOUT", "-1"),
+    ("DB_POOL_PRE_PING", "si"),
+    ("DB_POOL_WARMUP", "100"),
+])
+def test_configuracion_pool_invalida(monkeypatch, variable, valor):
+    """Test: los valores inválidos se rechazan al crear el motor"""
+    monkeypatch.setenv(variable, valor)
+    with pytest.raises(ValueError):
+        configuracion_pool("postgresql://u:p@localhost/bd")
+
+
+def test_pool_medido(tmp_path):
+    """Test: checkouts, conexiones en uso y timeouts del pool"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=PoolMedido, pool_size=2, max_overflow=0, pool_timeout=0.05,
+    )
+    assert calentar_pool(engine, 2) == 2
+    assert metricas_pool(engine)["libres"] == 2
+
+    with engine.connect(), engine.connect():
+        metricas = metricas_pool(engine)
+        assert metricas["en_uso"] == 2
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+
+    metricas = metricas_pool(engine)
+    assert metricas["en_uso"] == 0
+    assert metricas["checkouts"] == 4
+    assert metricas["timeouts"] == 1
+    engine.dispose()
+
+
+def test_pool_route(client):
+    """Test: GET /internal/pool"""
+    response = client.get("/internal/pool")
+    assert response.status_code == 200
+    assert {"en_uso", "overflow", "espera_maxima_ms", "timeouts"} <= response.json().keys()
+
+
+def test_argumentos_engine_async_sqlite(tmp_path):
+    """Test: el motor async de un archivo SQLite acepta la configuración del pool"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.pool import argumentos_engine
+
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    engine = create_async_engine(url.replace("sqlite://", "sqlite+aiosqlite://"), **argumentos_engine(url, async_engine=True))
+    assert engine.pool.size() == argumentos_engine(url)["pool_size"]
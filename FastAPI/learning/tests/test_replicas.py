@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app import cache
+from app.db import Base, ProductDB
+from app.replicas import COOKIE_PRIMARIA, enrutador
+
+
+@pytest.fixture
+def replicas(tmp_path, db_session):
+    """Dos réplicas SQLite con el mismo producto a distinto precio que la primaria"""
+    db_session.add(ProductDB(id=1, nombre="Mesa", precio=3, categoria="Muebles", stock=5))
+    db_session.commit()
+    urls = []
+    for precio in (1, 2):
+        url = f"sqlite:///{tmp_path / f'replica{precio}.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            db.add(ProductDB(id=1, nombre="Mesa", precio=precio, categoria="Muebles", stock=5))
+            db.commit()
+        engine.dispose()
+        urls.append(url)
+    enrutador.configurar(urls)
+    yield urls
+    enrutador.configurar([])
+
+
+def _precio(client, **kwargs):
+    response = client.get("/productos/buscar/nombre/Mesa", **kwargs)
+    assert response.status_code == 200
+    return response.json()["precio"]
+
+
+def test_lecturas_round_robin_entre_replicas(client, replicas):
+    """Test: las lecturas se reparten entre las réplicas y las escrituras van a la primaria"""
+    assert [_precio(client) for _ in range(4)] == [1, 2, 1, 2]
+    assert [replica["lecturas"] for replica in enrutador.stats()["replicas"]] == [2, 2]
+    assert _precio(client, headers={"X-Read-Primary": "1"}) == 3
+
+    response = client.post("/productos", json={"nombre": "Silla", "precio": 10, "categoria": "Muebles", "stock": 1})
+    assert response.status_code == 201
+    assert COOKIE_PRIMARIA in response.cookies
+    # Con la cookie el cliente lee lo que acaba de escribir
+    assert _precio(client) == 3
+    assert client.get(f"/productos/{response.json()['id']}").status_code == 200
+
+
+def test_replica_reciente_no_llena_la_cache(client, replicas):
+    """Test: tras una escritura, lo leído en una réplica no se guarda en la cache"""
+    client.patch("/productos/1/actualizar_stock", params={"quantity": 1})
+    client.cookies.clear()
+    cache.productos.clear()
+    assert client.get("/productos/1").json()["precio"] == 1
+    assert cache.productos.get(1) is None
+
+
+def test_replica_caida_sale_de_la_rotacion(client, replicas, tmp_path):
+    """Test: una réplica que no responde al chequeo deja de recibir lecturas"""
+    enrutador.configurar([replicas[0], f"sqlite:///{tmp_path / 'no_existe' / 'replica.db'}"])
+    enrutador.verificar()
+    assert [replica["sana"] for replica in enrutador.stats()["replicas"]] == [True, False]
+    assert [_precio(client) for _ in range(3)] == [1, 1, 1]
+
+    enrutador.configurar([f"sqlite:///{tmp_path / 'no_existe' / 'replica.db'}"])
+    enrutador.verificar()
+    assert _precio(client) == 3
+    assert client.get("/internal/replicas").json()["lecturas_primaria"] == 1
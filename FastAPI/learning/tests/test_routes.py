@@ -160,4 +160,395 @@ def test_buscar_por_categoria(client, db_session):
     assert response.status_code == 200
     data = response.json()
     assert len(data) == 2
-    assert all(p["categoria"] == "Computadoras" for p in data)
\ No newline at end of file
+    assert all(p["categoria"] == "Computadoras" for p in data)
+
+def test_paginacion_por_cursor(client, db_session):
+    """Test: GET /productos?limit=&after= - paginación por cursor"""
+    for i in range(5):
+        db_session.add(ProductDB(nombre=f"Producto {i}", precio=10 + i, categoria="Test", stock=i))
+    db_session.commit()
+
+    response = client.get("/productos?limit=2")
+    assert response.status_code == 200
+    data = response.json()
+    assert [p["nombre"] for p in data] == ["Producto 0", "Producto 1"]
+    cursor = response.headers["X-Next-Cursor"]
+    assert 'rel="next"' in response.headers["Link"]
+
+    response = client.get(f"/productos?limit=2&after={cursor}")
+    assert [p["nombre"] for p in response.json()] == ["Producto 2", "Producto 3"]
+
+    response = client.get(f"/productos?limit=2&after={response.headers['X-Next-Cursor']}")
+    assert [p["nombre"] for p in response.json()] == ["Producto 4"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_productos_stream(client, db_session):
+    """Test: GET /productos?stream=json|ndjson - respuesta por bloques"""
+    for i in range(3):
+        db_session.add(ProductDB(nombre=f"Producto {i}", precio=10, categoria="Test", stock=1))
+    db_session.commit()
+
+    response = client.get("/productos?stream=json")
+    assert response.status_code == 200
+    assert [p["nombre"] for p in response.json()] == ["Producto 0", "Producto 1", "Producto 2"]
+
+    response = client.get("/productos?stream=ndjson")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lineas = response.text.strip().split("\n")
+    assert len(lineas) == 3
+
+
+def test_actualizar_stock_insuficiente_e_inexistente(client, db_session):
+    """Test: PATCH /productos/{id}/actualizar_stock distingue 404 de stock insuficiente"""
+    producto = ProductDB(nombre="Cable", precio=5.0, categoria="Accesorios", stock=3)
+    db_session.add(producto)
+    db_session.commit()
+
+    response = client.patch(f"/productos/{producto.id}/actualizar_stock?quantity=-5")
+    assert response.status_code == 409
+
+    response = client.patch("/productos/999/actualizar_stock?quantity=-1")
+    assert response.status_code == 404
+
+
+def test_reservar_stock_lote(client, db_session):
+    """Test: POST /productos/reservar_stock - aplica todos los ajustes juntos"""
+    productos = [
+        ProductDB(nombre="Laptop", precio=1000, categoria="Computadoras", stock=5),
+        ProductDB(nombre="Mouse", precio=20, categoria="Periféricos", stock=10),
+    ]
+    db_session.add_all(productos)
+    db_session.commit()
+    laptop_id, mouse_id = productos[0].id, productos[1].id
+
+    response = client.post("/productos/reservar_stock", json={"items": [
+        {"id": mouse_id, "quantity": -3},
+        {"id": laptop_id, "quantity": -1},
+        {"id": mouse_id, "quantity": -2},
+    ]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["aplicado"] is True
+    assert {p["id"]: p["stock"] for p in data["productos"]} == {laptop_id: 4, mouse_id: 5}
+
+
+def test_reservar_stock_lote_con_errores(client, db_session):
+    """Test: POST /productos/reservar_stock - si un ajuste falla no se aplica ninguno"""
+    producto = ProductDB(nombre="Monitor", precio=200, categoria="Pantallas", stock=2)
+    otro = ProductDB(nombre="Teclado", precio=100, categoria="Periféricos", stock=10)
+    db_session.add_all([producto, otro])
+    db_session.commit()
+
+    response = client.post("/productos/reservar_stock", json={"items": [
+        {"id": otro.id, "quantity": -1},
+        {"id": producto.id, "quantity": -3},
+        {"id": 999, "quantity": -1},
+    ]})
+    assert response.status_code == 409
+    data = response.json()
+    assert data["aplicado"] is False
+    errores = {e["id"]: e for e in data["errores"]}
+    assert errores[producto.id]["error"] == "stock_insuficiente"
+    assert errores[producto.id]["stock_disponible"] == 2
+    assert errores[999]["error"] == "no_encontrado"
+
+    response = client.get(f"/productos/{otro.id}")
+    assert response.json()["stock"] == 10
+
+
+def test_reservar_stock_lote_conflicto_persistente(client, db_session, monkeypatch):
+    """Test: POST /productos/reservar_stock - 409 tras agotar los reintentos si el stock no deja de cambiar"""
+    from app import services
+
+    producto = ProductDB(nombre="Monitor", precio=200, categoria="Pantallas", stock=2)
+    db_session.add(producto)
+    db_session.commit()
+    intentos = []
+
+    def siempre_en_conflicto(db, deltas):
+        intentos.append(deltas)
+        return None
+
+    monkeypatch.setattr(services, "_reservar_stock_lote", siempre_en_conflicto)
+    response = client.post("/productos/reservar_stock", json={"items": [{"id": producto.id, "quantity": -1}]})
+    assert response.status_code == 409
+    assert len(intentos) == services.INTENTOS_RESERVA
+
+
+def test_importar_productos(client):
+    """Test: POST /productos/importar - carga masiva NDJSON"""
+    cuerpo = "\n".join([
+        '{"nombre": "Cámara", "precio": 80, "categoria": "Periféricos", "stock": 4}',
+        '{"nombre": "", "precio": 80, "categoria": "Periféricos", "stock": 4}',
+    ])
+    response = client.post("/productos/importar", content=cuerpo.encode())
+    assert response.status_code == 200
+    data = response.json()
+    assert data["insertados"] == 1
+    assert data["total_errores"] == 1
+    assert data["errores"][0]["fila"] == 2
+
+    response = client.get("/productos")
+    assert [p["nombre"] for p in response.json()] == ["Cámara"]
+
+
+def test_exportacion_catalogo(client, db_session):
+    """Test: POST /exportaciones, consultar estado y descargar el archivo"""
+    import gzip
+    import json
+    import time
+
+    db_session.add_all([
+        ProductDB(nombre="Laptop", precio=1000, categoria="Computadoras", stock=5),
+        ProductDB(nombre="PC", precio=1500, categoria="Computadoras", stock=3),
+        ProductDB(nombre="Mouse", precio=20, categoria="Periféricos", stock=10),
+    ])
+    db_session.commit()
+
+    response = client.post("/exportaciones", json={"categoria": "computadoras", "max_price": 1200})
+    assert response.status_code == 202
+    trabajo_id = response.json()["id"]
+
+    for _ in range(100):
+        estado = client.get(f"/exportaciones/{trabajo_id}").json()
+        if estado["estado"] in ("completado", "error"):
+            break
+        time.sleep(0.05)
+    assert estado["estado"] == "completado"
+    assert estado["filas_exportadas"] == 1
+    assert estado["progreso"] == 1.0
+
+    response = client.get(f"/exportaciones/{trabajo_id}/descarga")
+    assert response.status_code == 200
+    filas = [json.loads(linea) for linea in gzip.decompress(response.content).decode().splitlines()]
+    assert [f["nombre"] for f in filas] == ["Laptop"]
+    assert filas[0]["precio"] == 1000.0
+
+    assert client.get("/exportaciones/no-existe").status_code == 404
+
+
+def test_estadisticas_cache(client, db_session):
+    """Test: GET /internal/cache - contadores de la cache de productos"""
+    producto = ProductDB(nombre="Parlante", precio=40, categoria="Audio", stock=2)
+    db_session.add(producto)
+    db_session.commit()
+
+    antes = client.get("/internal/cache").json()["productos"]
+    client.get(f"/productos/{producto.id}")
+    client.get(f"/productos/{producto.id}/stock")
+    stats = client.get("/internal/cache").json()["productos"]
+    assert stats["misses"] - antes["misses"] == 1
+    assert stats["hits"] - antes["hits"] == 1
+
+
+def test_cache_de_listados_gzip_e_invalidacion(client, db_session):
+    """Test: los listados se sirven comprimidos desde la cache y las escrituras los invalidan"""
+    db_session.add(ProductDB(nombre="Laptop", precio=1000, categoria="Computadoras", stock=5))
+    db_session.commit()
+
+    antes = client.get("/internal/cache").json()["respuestas"]
+    response = client.get("/productos/categoria/computadoras", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert [p["nombre"] for p in response.json()] == ["Laptop"]
+    response = client.get("/productos/categoria/Computadoras", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    client.get("/productos/categoria/computadoras")
+    stats = client.get("/internal/cache").json()["respuestas"]
+    assert stats["hits"] - antes["hits"] == 1
+
+    nuevo = {"nombre": "PC", "precio": 1500, "categoria": "COMPUTADORAS", "stock": 3}
+    assert client.post("/productos", json=nuevo).status_code == 201
+    response = client.get("/productos/categoria/computadoras")
+    assert sorted(p["nombre"] for p in response.json()) == ["Laptop", "PC"]
+
+
+def test_listados_gzip_con_etag_propio(client, db_session):
+    """Test: la variante gzip tiene otro ETag y Accept-Encoding se lee completo"""
+    db_session.add(ProductDB(nombre="Laptop", precio=1000, categoria="Computadoras", stock=5))
+    db_session.commit()
+
+    identidad = client.get("/productos/categoria/computadoras", headers={"Accept-Encoding": "identity"})
+    comprimida = client.get("/productos/categoria/computadoras", headers={"Accept-Encoding": "*;q=0, gzip"})
+    assert comprimida.headers["content-encoding"] == "gzip"
+    assert comprimida.headers["vary"] == "Accept-Encoding"
+    assert identidad.headers["etag"] != comprimida.headers["etag"]
+
+    rechazada = client.get("/productos/categoria/computadoras", headers={"Accept-Encoding": "gzip;q=0, *"})
+    assert "content-encoding" not in rechazada.headers
+
+    gzip_304 = client.get(
+        "/productos/categoria/computadoras",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": comprimida.headers["etag"]},
+    )
+    assert gzip_304.status_code == 304
+    assert gzip_304.headers["vary"] == "Accept-Encoding"
+    cruzada = client.get(
+        "/productos/categoria/computadoras",
+        headers={"Accept-Encoding": "identity", "If-None-Match": comprimida.headers["etag"]},
+    )
+    assert cruzada.status_code == 200
+    assert cruzada.headers["etag"] == identidad.headers["etag"]
+
+
+def test_etag_producto(client, db_session):
+    """Test: GET /productos/{id} con If-None-Match responde 304 hasta que el producto cambia"""
+    producto = ProductDB(nombre="Tablet", precio=300, categoria="Computadoras", stock=4)
+    db_session.add(producto)
+    db_session.commit()
+
+    response = client.get(f"/productos/{producto.id}")
+    etag = response.headers["ETag"]
+    assert response.json()["updated_at"] is not None
+
+    response = client.get(f"/productos/{producto.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    client.patch(f"/productos/{producto.id}/actualizar_stock?quantity=1")
+    response = client.get(f"/productos/{producto.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    last_modified = response.headers["Last-Modified"]
+    response = client.get(f"/productos/{producto.id}", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+
+def test_etag_listado(client, db_session):
+    """Test: los listados responden 304 con o sin la respuesta en cache"""
+    from app import cache
+
+    db_session.add(ProductDB(nombre="Laptop", precio=1000, categoria="Computadoras", stock=5))
+    db_session.commit()
+
+    etag = client.get("/productos").headers["ETag"]
+    assert client.get("/productos", headers={"If-None-Match": etag}).status_code == 304
+
+    cache.respuestas.clear()
+    assert client.get("/productos", headers={"If-None-Match": etag}).status_code == 304
+
+    producto_id = client.get("/productos").json()[0]["id"]
+    client.delete(f"/productos/{producto_id}")
+    response = client.get("/productos", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_etag_listado_cambia_si_cambian_las_filas_de_la_pagina(client, db_session):
+    """Test: borrar una fila de una página llena cambia el ETag aunque la cantidad no cambie"""
+    db_session.add_all([ProductDB(nombre=f"P{i}", precio=10, categoria="Varios", stock=1) for i in range(3)])
+    db_session.commit()
+    primero, segundo, _ = [p["id"] for p in client.get("/productos").json()]
+    # La última modificación es la del segundo, que sigue en la página después del borrado
+    client.patch(f"/productos/{segundo}/actualizar_stock", params={"quantity": 1})
+
+    response = client.get("/productos", params={"limit": 2})
+    etag = response.headers["ETag"]
+    client.delete(f"/productos/{primero}")
+    response = client.get("/productos", params={"limit": 2}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+def test_etag_distinto_para_respuestas_parciales(client, db_session):
+    """Test: con fields el ETag es otro, así el de la representación completa no da 304 en la parcial"""
+    db_session.add(ProductDB(nombre="Tablet", precio=300, categoria="Computadoras", stock=4))
+    db_session.commit()
+
+    completo = client.get("/productos/1").headers["ETag"]
+    parcial = client.get("/productos/1?fields=nombre").headers["ETag"]
+    assert completo == '"1-v1"' and parcial != completo
+    assert client.get("/productos/1?fields=nombre", headers={"If-None-Match": completo}).status_code == 200
+    assert client.get("/productos/1?fields=nombre", headers={"If-None-Match": parcial}).status_code == 304
+    # El ETag parcial identifica la misma versión para un PUT con If-Match
+    cambios = {"nombre": "Tablet", "precio": 350, "categoria": "Computadoras", "stock": 4}
+    assert client.put("/productos/1", json=cambios, headers={"If-Match": parcial}).status_code == 200
+
+    listado = client.get("/productos").headers["ETag"]
+    listado_parcial = client.get("/productos?fields=nombre").headers["ETag"]
+    assert listado_parcial != listado
+    assert client.get("/productos?fields=nombre", headers={"If-None-Match": listado}).status_code == 200
+
+def test_busqueda_texto_completo(client, db_session):
+    """Test: GET /productos/search - búsqueda por prefijos, sin acentos y ordenada por relevancia"""
+    db_session.add_all([
+        ProductDB(nombre="Cable USB", descripcion="Sirve para el teclado inalámbrico", precio=5, categoria="Accesorios", stock=50),
+        ProductDB(nombre="Teclado inalámbrico", descripcion="Teclado compacto", precio=80, categoria="Periféricos", stock=5),
+        ProductDB(nombre="Mouse", descripcion="Mouse óptico", precio=20, categoria="Periféricos", stock=10),
+    ])
+    db_session.commit()
+
+    response = client.get("/productos/search?q=tecl inalambr")
+    assert response.status_code == 200
+    assert [p["nombre"] for p in response.json()] == ["Teclado inalámbrico", "Cable USB"]
+
+    response = client.get("/productos/search?q=tecl&limit=1&offset=1")
+    assert [p["nombre"] for p in response.json()] == ["Cable USB"]
+
+    # El índice se actualiza con las escrituras
+    mouse_id = [p for p in client.get("/productos").json() if p["nombre"] == "Mouse"][0]["id"]
+    client.put(f"/productos/{mouse_id}", json={
+        "nombre": "Mouse gamer", "descripcion": "Óptico", "precio": 25, "categoria": "Periféricos", "stock": 10
+    })
+    assert [p["nombre"] for p in client.get("/productos/search?q=gamer").json()] == ["Mouse gamer"]
+    client.delete(f"/productos/{mouse_id}")
+    assert client.get("/productos/search?q=gamer").json() == []
+    assert client.get("/productos/search?q=%22%2A").json() == []
+
+
+def test_productos_por_lote(client, db_session):
+    """Test: /productos/batch devuelve los productos en el orden pedido con null en los faltantes"""
+    productos = [ProductDB(nombre=f"Lote {i}", precio=i + 1, categoria="Lote", stock=i) for i in range(3)]
+    db_session.add_all(productos)
+    db_session.commit()
+    ids = [p.id for p in productos]
+
+    client.get(f"/productos/{ids[1]}")  # uno ya en la cache
+    response = client.get(f"/productos/batch?ids={ids[2]},999,{ids[0]},{ids[1]},{ids[2]}")
+    assert response.status_code == 200
+    data = response.json()
+    assert [p and p["id"] for p in data["productos"]] == [ids[2], None, ids[0], ids[1], ids[2]]
+    assert data["faltantes"] == [999]
+
+    # POST con más IDs que una consulta IN: se resuelve por bloques
+    response = client.post("/productos/batch", json={"ids": list(range(1200, 0, -1))})
+    data = response.json()
+    assert len(data["productos"]) == 1200
+    assert [p["nombre"] for p in data["productos"][-3:]] == ["Lote 2", "Lote 1", "Lote 0"]
+    assert len(data["faltantes"]) == 1197
+
+    assert client.get("/productos/batch?ids=1,dos").status_code == 422
+    assert client.post("/productos/batch", json={"ids": []}).status_code == 422
+
+
+def test_put_con_if_match(client, db_session):
+    """Test: PUT con If-Match aplica solo sobre la versión vista (412 si cambió)"""
+    producto = ProductDB(nombre="Mouse", precio=20, categoria="Accesorios", stock=10)
+    db_session.add(producto)
+    db_session.commit()
+    cambios = {"nombre": "Mouse", "precio": 25, "categoria": "Accesorios", "stock": 10}
+
+    etag = client.get(f"/productos/{producto.id}").headers["ETag"]
+    response = client.put(f"/productos/{producto.id}", json=cambios, headers={"If-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    assert response.headers["ETag"] != etag
+    assert client.get(f"/productos/{producto.id}").headers["ETag"] == response.headers["ETag"]
+
+    # El ETag viejo, uno débil o el de otro producto ya no coinciden
+    for if_match in (etag, "W/" + response.headers["ETag"], f'"{producto.id + 1}-v2"'):
+        conflicto = client.put(
+            f"/productos/{producto.id}", json={**cambios, "precio": 1}, headers={"If-Match": if_match}
+        )
+        assert conflicto.status_code == 412
+    assert client.get(f"/productos/{producto.id}").json()["precio"] == 25
+
+    # Los ajustes de stock también cambian la versión
+    client.patch(f"/productos/{producto.id}/actualizar_stock?quantity=-1")
+    response = client.put(
+        f"/productos/{producto.id}", json=cambios, headers={"If-Match": f'{etag}, "{producto.id}-v3"'}
+    )
+    assert response.status_code == 200
+    assert client.put(f"/productos/{producto.id}", json=cambios, headers={"If-Match": "*"}).status_code == 200
+    assert client.put("/productos/999", json=cambios, headers={"If-Match": "*"}).status_code == 404
@@ -0,0 +1,45 @@
+from datetime import datetime
+import seed_data
+from app.db import ProductChangeDB, ProductDB
+from app.estadisticas import obtener_estadisticas
+
+
+def test_generacion_determinista(monkeypatch):
+    """Test: misma semilla, mismo catálogo, con cualquier cantidad de procesos"""
+    monkeypatch.setattr(seed_data, "BLOQUE", 40)
+    base = datetime(2026, 1, 1)
+    en_serie = [fila for bloque in seed_data.generar_productos(100, semilla=7, procesos=1, base=base) for fila in bloque]
+    en_paralelo = [fila for bloque in seed_data.generar_productos(100, semilla=7, procesos=2, base=base) for fila in bloque]
+    assert en_serie == en_paralelo
+    assert len(en_serie) == 100
+    assert en_serie != [fila for bloque in seed_data.generar_productos(100, semilla=8, base=base) for fila in bloque]
+
+    # Sin base explícita las fechas parten de FECHA_BASE, no del día de la carga
+    assert seed_data.FECHA_BASE == base
+    assert en_serie == [fila for bloque in seed_data.generar_productos(100, semilla=7) for fila in bloque]
+
+    nombre, _, precio, categoria, stock, _, _ = en_serie[0]
+    assert nombre.endswith("1")
+    assert categoria in seed_data.CATEGORIAS
+    assert float(precio) > 0 and stock >= 0
+
+
+def test_sembrar_sqlite(client, db_session):
+    """Test: la carga masiva deja índices, FTS y estadísticas consistentes"""
+    engine = db_session.get_bind()
+    assert seed_data.sembrar(engine, 300, semilla=3, procesos=1) == 300
+    assert seed_data.sembrar(engine, 200, semilla=3, procesos=1, reemplazar=True) == 200
+
+    assert sum(stats.productos for stats in obtener_estadisticas(db_session)) == 200
+    # Registro de cambios: 300 altas, 300 tombstones del reemplazo y 200 altas
+    cambios = db_session.query(ProductChangeDB.eliminado).order_by(ProductChangeDB.id).all()
+    assert [eliminado for eliminado, in cambios] == [False] * 300 + [True] * 300 + [False] * 200
+    producto = db_session.query(ProductDB).order_by(ProductDB.id).first()
+    marca = producto.nombre.split()[-2]
+    response = client.get("/productos/search", params={"q": marca, "limit": 100})
+    assert producto.id in [p["id"] for p in response.json()]
+    # Los índices y triggers volvieron a crearse
+    client.put(f"/productos/{producto.id}", json={
+        "nombre": "Renombrado único", "precio": 1, "categoria": producto.categoria, "stock": 1,
+    })
+    assert [p["id"] for p in client.get("/productos/search", params={"q": "renombrado"}).json()] == [producto.id]
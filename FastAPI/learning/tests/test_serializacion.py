@@ -0,0 +1,107 @@
+import json
+from datetime import datetime
+import pytest
+from pydantic import TypeAdapter
+from sqlalchemy import event
+from app import serializacion
+from app.db import ProductDB
+from app.models import ProductResponse
+from app.serializacion import consulta_filas, json_producto, json_productos
+
+LISTA = TypeAdapter(list[ProductResponse])
+
+
+@pytest.fixture
+def productos(db_session):
+    db_session.add_all([
+        ProductDB(nombre="Audífonos ñandú", descripcion=None, precio=10, categoria="Audio", stock=0,
+                  created_at=datetime(2026, 1, 1, 12, 0, 0), updated_at=datetime(2026, 1, 2, 8, 30, 0, 250)),
+        ProductDB(nombre='Cable "USB-C"', descripcion="Línea\nnueva", precio=19.99, categoria="Cables", stock=7),
+        ProductDB(nombre="Monitor", descripcion="24 pulgadas", precio=1234.5, categoria="Pantallas", stock=3),
+    ])
+    db_session.commit()
+    return db_session.query(ProductDB).order_by(ProductDB.id)
+
+
+@pytest.mark.parametrize("con_orjson", [True, False])
+def test_json_igual_al_de_product_response(monkeypatch, productos, con_orjson):
+    """Test: la vía rápida produce exactamente el JSON de ProductResponse"""
+    if not con_orjson:
+        monkeypatch.setattr(serializacion, "orjson", None)
+    esperado = LISTA.dump_json(LISTA.validate_python(productos.all(), from_attributes=True))
+    filas = consulta_filas(productos).all()
+
+    assert json_productos(filas) == esperado
+    assert json_producto(filas[0]) == ProductResponse.model_validate(productos.first()).model_dump_json().encode()
+
+
+def test_parsear_campos():
+    """Test: fields se valida, se ordena como ProductResponse e incluye siempre id"""
+    assert serializacion.parsear_campos(None) == serializacion.CAMPOS
+    assert serializacion.parsear_campos("stock, nombre,precio") == ("id", "nombre", "precio", "stock")
+    with pytest.raises(ValueError, match="clave"):
+        serializacion.parsear_campos("nombre,clave")
+    with pytest.raises(ValueError):
+        serializacion.parsear_campos(" , ")
+
+
+def test_modelo_parcial():
+    """Test: el modelo parcial conserva los tipos y se reutiliza"""
+    modelo = serializacion.modelo_parcial(("id", "precio"))
+    assert modelo is serializacion.modelo_parcial(("id", "precio"))
+    assert list(modelo.model_fields) == ["id", "precio"]
+    assert modelo.model_validate({"id": 1, "precio": "2.5"}).precio == 2.5
+    assert serializacion.modelo_parcial(serializacion.CAMPOS) is ProductResponse
+
+
+def test_fields_en_rutas(client, productos):
+    """Test: fields limita las columnas del SELECT y de la respuesta en todas las rutas de lectura"""
+    sentencias = []
+
+    def capturar(conn, cursor, statement, *args):
+        sentencias.append(statement)
+
+    engine = productos.session.get_bind()
+    event.listen(engine, "before_cursor_execute", capturar)
+    try:
+        listado = client.get("/productos?fields=nombre,precio")
+    finally:
+        event.remove(engine, "before_cursor_execute", capturar)
+    assert listado.status_code == 200
+    assert listado.json()[1] == {"id": 2, "nombre": 'Cable "USB-C"', "precio": 19.99}
+    select = [s for s in sentencias if "LIMIT" in s][-1]
+    assert "descripcion" not in select and "products.nombre" in select
+
+    for url in (
+        "/productos?stream=ndjson&fields=stock",
+        "/productos/low_stock?fields=stock",
+        "/productos/categoria/Audio?fields=stock",
+        "/productos/rango_precio/?min_price=0&max_price=20&fields=stock",
+        "/productos/search?q=monitor&fields=stock",
+    ):
+        response = client.get(url)
+        assert response.status_code == 200, url
+        filas = response.json() if "ndjson" not in url else [json.loads(l) for l in response.text.splitlines()]
+        assert filas and all(set(fila) == {"id", "stock"} for fila in filas), url
+
+    uno = client.get("/productos/3?fields=nombre")
+    assert uno.json() == {"id": 3, "nombre": "Monitor"}
+    assert client.get("/productos/3?fields=nombre", headers={"If-None-Match": uno.headers["ETag"]}).status_code == 304
+    assert client.get("/productos/buscar/nombre/monitor?fields=precio").json() == {"id": 3, "precio": 1234.5}
+    assert client.get("/productos/99?fields=nombre").status_code == 404
+
+    invalido = client.get("/productos?fields=nombre,secreto")
+    assert invalido.status_code == 422
+    assert "secreto" in invalido.json()["detail"]
+
+
+def test_openapi_documenta_respuestas_parciales(client):
+    """Test: las rutas con fields documentan productos donde solo id es obligatorio"""
+    openapi = client.get("/openapi.json").json()
+    assert openapi["components"]["schemas"]["ProductoParcial"]["required"] == ["id"]
+    for ruta in ("/productos", "/productos/low_stock", "/productos/search",
+                 "/productos/categoria/{categoria}", "/productos/rango_precio/"):
+        esquema = openapi["paths"][ruta]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert esquema["items"]["$ref"] == "#/components/schemas/ProductoParcial", ruta
+    esquema = openapi["paths"]["/productos/{id}"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert esquema["$ref"] == "#/components/schemas/ProductoParcial"
@@ -1,5 +1,7 @@
 import pytest
-from app.services import buscar_prod_int, crear_producto, actualizar_stock
+from sqlalchemy.orm import Session
+from app import services
+from app.services import buscar_prod_int, crear_producto, actualizar_stock, StockInsuficienteError
 from app.models import Product
 from app.db import ProductDB
 
@@ -75,5 +77,71 @@ def test_actualizar_stock_negativo(db_session):
     db_session.refresh(producto)
     
     # Intentar restar más de lo disponible
-    resultado = actualizar_stock(db_session, producto.id, -20)
-    assert resultado is None  # Debe fallar
\ No newline at end of file
+    with pytest.raises(StockInsuficienteError):
+        actualizar_stock(db_session, producto.id, -20)
+    assert buscar_prod_int(db_session, producto.id).stock == 10
+
+
+def test_actualizar_stock_inexistente(db_session):
+    """Test: actualizar stock de un producto que no existe"""
+    assert actualizar_stock(db_session, 999, 5) is None
+
+
+def test_actualizar_stock_concurrente(db_session):
+    """Test: decrementos sobre el mismo producto desde varias sesiones no pierden actualizaciones"""
+    from concurrent.futures import ThreadPoolExecutor
+    from tests.conftest import TestingSessionLocal
+
+    producto = ProductDB(nombre="Concurrente", precio=10.0, categoria="Test", stock=20)
+    db_session.add(producto)
+    db_session.commit()
+    producto_id = producto.id
+
+    def restar_uno(_):
+        db = TestingSessionLocal()
+        try:
+            return actualizar_stock(db, producto_id, -1) is not None
+        except StockInsuficienteError:
+            return False
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        resultados = list(pool.map(restar_uno, range(30)))
+
+    assert sum(resultados) == 20
+    db_session.expire_all()
+    assert buscar_prod_int(db_session, producto_id).stock == 0
+
+def test_updated_at_se_persiste_en_actualizaciones(db_session):
+    """Test: el UPDATE atómico de stock también actualiza updated_at"""
+    producto = ProductDB(nombre="Reloj", precio=10.0, categoria="Test", stock=5)
+    db_session.add(producto)
+    db_session.commit()
+    creado = producto.updated_at
+    assert creado is not None
+
+    resultado = actualizar_stock(db_session, producto.id, 1)
+    assert resultado.updated_at > creado
+
+
+def test_actualizar_producto_conflicto_concurrente(db_session, monkeypatch):
+    """Test: si otra escritura cambia el producto entre la lectura y el UPDATE, no se pisa"""
+    producto = crear_producto(db_session, Product(nombre="Teclado", precio=30, categoria="Accesorios", stock=5))
+    leer = services.buscar_prod_int
+
+    def leer_y_modificar(db, id):
+        db_product = leer(db, id)
+        with Session(db.get_bind()) as otra:
+            actualizar_stock(otra, id, 3)
+        return db_product
+
+    monkeypatch.setattr(services, "buscar_prod_int", leer_y_modificar)
+    with pytest.raises(services.ConflictoVersionError):
+        services.actualizar_producto(
+            db_session, producto.id, Product(nombre="Teclado", precio=35, categoria="Accesorios", stock=5)
+        )
+    monkeypatch.undo()
+
+    actual = buscar_prod_int(db_session, producto.id)
+    assert (actual.precio, actual.stock, actual.version) == (30, 8, 2)
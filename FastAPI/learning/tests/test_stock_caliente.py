@@ -0,0 +1,183 @@
+import io
+import threading
+import pytest
+from sqlalchemy import delete, update
+from sqlalchemy.exc import OperationalError
+from app.db import ProductDB
+from app.estadisticas import obtener_estadisticas
+from app.models import Product
+from app.services import crear_producto
+from app.stock_caliente import ColaStockLlenaError, RegistroStockCaliente, StockInsuficienteError
+
+
+def _stock(db, id):
+    db.expire_all()
+    product = db.get(ProductDB, id)
+    return product.stock, product.version
+
+
+@pytest.fixture
+def producto(db_session):
+    return crear_producto(db_session, Product(nombre="Consola", precio=500, categoria="Juegos", stock=10))
+
+
+def test_ajustes_en_memoria_y_volcado_por_lotes(db_session, producto):
+    """Test: los ajustes no escriben en la base hasta el volcado, que aplica su suma en un UPDATE"""
+    registro = RegistroStockCaliente(intervalo_ms=60_000)
+    registro.designar(producto.id)
+    try:
+        assert [registro.ajustar(db_session, producto.id, q) for q in (-3, -4, 2)] == [7, 3, 5]
+        with pytest.raises(StockInsuficienteError):
+            registro.ajustar(db_session, producto.id, -6)
+        assert registro.ajustar(db_session, 999, -1) is None
+        assert _stock(db_session, producto.id) == (10, 1)
+
+        assert registro.vaciar()
+        assert _stock(db_session, producto.id) == (5, 2)
+        assert obtener_estadisticas(db_session)[0].unidades == 5
+        stats = registro.stats()
+        resumen = (stats["volcados"], stats["filas_volcadas"], stats["ajustes_volcados"], stats["pendientes"])
+        assert resumen == (1, 1, 3, 0)
+    finally:
+        registro.detener()
+
+
+def test_ajustes_concurrentes_respetan_el_stock(db_session, producto):
+    """Test: con muchos hilos restando a la vez nunca se vende más que el stock"""
+    registro = RegistroStockCaliente(intervalo_ms=1)
+    registro.designar(producto.id)
+    vendidos = []
+
+    def comprar():
+        try:
+            registro.ajustar(db_session, producto.id, -1)
+            vendidos.append(1)
+        except StockInsuficienteError:
+            pass
+
+    registro.ajustar(db_session, producto.id, 0)  # cargar el contador antes de los hilos
+    hilos = [threading.Thread(target=comprar) for _ in range(30)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    registro.detener()
+
+    assert len(vendidos) == 10
+    assert _stock(db_session, producto.id)[0] == 0
+
+
+def test_volcado_sincronico_y_rechazo_cuando_la_cola_se_llena(db_session, producto, monkeypatch):
+    """Test: con la cola llena vuelca quien ajusta, y si la base falla se rechaza sin perder deltas"""
+    registro = RegistroStockCaliente(intervalo_ms=60_000, max_pendientes=2)
+    registro.designar(producto.id)
+    try:
+        registro.ajustar(db_session, producto.id, -1)
+        registro.ajustar(db_session, producto.id, -1)
+        registro.ajustar(db_session, producto.id, -1)
+        assert registro.stats()["volcados_sincronicos"] == 1
+        assert _stock(db_session, producto.id)[0] == 8
+
+        def falla(engine, lote):
+            raise OperationalError("UPDATE", {}, Exception("base caída"))
+
+        monkeypatch.setattr(registro, "_escribir", falla)
+        registro.ajustar(db_session, producto.id, -1)
+        with pytest.raises(ColaStockLlenaError):
+            registro.ajustar(db_session, producto.id, -1)
+        assert registro.stats()["errores"] == 1 and registro.stats()["rechazos"] == 1
+
+        monkeypatch.undo()
+        assert registro.vaciar()
+        assert _stock(db_session, producto.id)[0] == 6
+    finally:
+        registro.detener()
+
+
+def test_volcado_no_deja_stock_negativo_ni_desvia_estadisticas(db_session, producto):
+    """Test: si la base cambió por fuera del contador el volcado no deja stock negativo ni mueve categoria_stats"""
+    otro = crear_producto(db_session, Product(nombre="Joystick", precio=50, categoria="Juegos", stock=4))
+    registro = RegistroStockCaliente(intervalo_ms=60_000)
+    registro.designar(producto.id)
+    registro.designar(otro.id)
+    try:
+        registro.ajustar(db_session, producto.id, -8)
+        registro.ajustar(db_session, otro.id, -1)
+        # Otro proceso vende 5 unidades del primero y borra el segundo sin pasar por los contadores
+        db_session.execute(update(ProductDB).where(ProductDB.id == producto.id).values(stock=5))
+        db_session.execute(delete(ProductDB).where(ProductDB.id == otro.id))
+        db_session.commit()
+        unidades = obtener_estadisticas(db_session)[0].unidades
+
+        assert registro.vaciar()
+        assert _stock(db_session, producto.id) == (5, 1)
+        assert obtener_estadisticas(db_session)[0].unidades == unidades
+        stats = registro.stats()
+        assert (stats["volcados_rechazados"], stats["productos"], stats["pendientes"]) == (2, [], 0)
+        # El contador se vuelve a leer de la base
+        assert registro.ajustar(db_session, producto.id, -5) == 0
+    finally:
+        registro.detener()
+
+def test_rutas_con_producto_caliente(client, db_session, producto):
+    """Test: /actualizar_stock usa el contador y las demás escrituras vuelcan antes de escribir"""
+    id = producto.id
+    assert client.put(f"/internal/stock_caliente/{id}").status_code == 204
+    response = client.patch(f"/productos/{id}/actualizar_stock?quantity=-4")
+    assert response.status_code == 200
+    assert response.json()["stock"] == 6
+    assert client.patch(f"/productos/{id}/actualizar_stock?quantity=-7").status_code == 409
+
+    # El PUT vuelca los -4 pendientes y después reemplaza el stock
+    cambios = {"nombre": "Consola", "precio": 500, "categoria": "Juegos", "stock": 20}
+    # Los tests comparten la sesión entre peticiones: que no use la versión que ya tenía cargada
+    db_session.expire_all()
+    assert client.put(f"/productos/{id}", json=cambios).status_code == 200
+    assert client.patch(f"/productos/{id}/actualizar_stock?quantity=-5").json()["stock"] == 15
+
+    stats = client.get("/internal/stock_caliente").json()
+    assert stats["designados"] == [id]
+    assert client.delete(f"/internal/stock_caliente/{id}").status_code == 204
+    assert _stock(db_session, id)[0] == 15
+    assert client.get("/internal/stock_caliente").json()["productos"] == []
+
+
+def test_importacion_upsert_con_producto_caliente(db_session, producto, monkeypatch):
+    """Test: el upsert lee la versión después de volcar el stock caliente y guarda el lote entero"""
+    from app import importacion
+    from app.stock_caliente import registro as registro_global
+
+    otro = crear_producto(db_session, Product(nombre="Control", precio=50, categoria="Juegos", stock=3))
+    registro_global.designar(producto.id)
+    registro_global.ajustar(db_session, producto.id, -2)
+    llamadas = []
+    original = importacion._guardar_lote
+
+    def guardar_lote(db, lote, upsert):
+        llamadas.append(len(lote))
+        return original(db, lote, upsert)
+
+    monkeypatch.setattr(importacion, "_guardar_lote", guardar_lote)
+
+    archivo = io.StringIO(
+        '{"nombre": "Consola", "precio": 450, "categoria": "Juegos", "stock": 7}\n'
+        '{"nombre": "Control", "precio": 40, "categoria": "Juegos", "stock": 9}\n'
+    )
+    resumen = importacion.importar_archivo(db_session, archivo, "ndjson", True)
+    assert (resumen.actualizados, resumen.total_errores, llamadas) == (2, 0, [2])
+    assert _stock(db_session, producto.id) == (7, 3)
+    assert _stock(db_session, otro.id) == (9, 2)
+
+
+def test_rutas_internas_solo_con_internal_routes():
+    """Test: /internal/* (con PUT y DELETE de stock caliente) no se monta sin INTERNAL_ROUTES"""
+    from fastapi import FastAPI
+    from app.main import incluir_rutas_internas
+
+    rutas = {}
+    for habilitadas in (False, True):
+        app = FastAPI()
+        incluir_rutas_internas(app, habilitadas)
+        rutas[habilitadas] = {ruta.path for ruta in app.routes if ruta.path.startswith("/internal")}
+    assert rutas[False] == set()
+    assert "/internal/stock_caliente/{id}" in rutas[True]